@@ -15,24 +15,79 @@ API_DESCRIPTION = "AI-powered news scraping and analysis"
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", "gpt-4.1-nano")  # First routing tier - set to OPENAI_MODEL to disable routing
+ROUTER_MIN_CONFIDENCE = int(os.getenv("ROUTER_MIN_CONFIDENCE", "7"))  # Fast-tier answers below this escalate to OPENAI_MODEL
+MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "5"))  # Starting concurrent LLM calls (adapts at runtime)
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "30"))  # Seconds - slower calls count as congestion
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "5"))  # Retries after 429s and timeouts
+ANALYSIS_TOKEN_BUDGET = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "3500"))  # Max article tokens sent for analysis
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "1000"))  # Requests per Batch API input file
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "60"))  # Seconds between batch status checks
 
 # Supabase
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+DB_IN_CHUNK_SIZE = int(os.getenv("DB_IN_CHUNK_SIZE", "100"))  # Max values per `in_` filter
+DB_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "1000"))  # Rows per request when reading large result sets
 
 # Email (Brevo)
 BREVO_API_KEY = os.getenv("BREVO_API_KEY")
 EMAIL_FROM_ADDRESS = os.getenv("EMAIL_FROM_ADDRESS", "noreply@yourdomain.com")
+BREVO_RATE_LIMIT = float(os.getenv("BREVO_RATE_LIMIT", "50"))  # Transactional API calls per second
+BREVO_BATCH_SIZE = int(os.getenv("BREVO_BATCH_SIZE", "500"))  # Message versions per Brevo request
+EMAIL_FRAGMENT_CACHE_SIZE = int(os.getenv("EMAIL_FRAGMENT_CACHE_SIZE", "500"))  # Rendered article cards, and alert email bodies built from them, kept in memory (each)
+BREVO_BATCH_LINGER = float(os.getenv("BREVO_BATCH_LINGER", "0.05"))  # Seconds to collect same-template emails before sending
+
+# Notification outbox
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "256"))  # Deliveries in progress while draining (incl. waiting on rate limits)
+EMAIL_CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "8"))  # Parallel Brevo requests
+SLACK_CONCURRENCY = int(os.getenv("SLACK_CONCURRENCY", "8"))  # Parallel Slack requests
+SLACK_CHANNEL_RATE = float(os.getenv("SLACK_CHANNEL_RATE", "1"))  # Messages per second per channel
+SLACK_CONNECTION_TTL = float(os.getenv("SLACK_CONNECTION_TTL", "300"))  # Seconds a loaded Slack connection is reused
+SLACK_CONNECTION_CACHE_SIZE = int(os.getenv("SLACK_CONNECTION_CACHE_SIZE", "10000"))
+SLACK_WORKSPACE_RATE = float(os.getenv("SLACK_WORKSPACE_RATE", "5"))  # Messages per second per workspace
+SLACK_DIGEST_WINDOW = float(os.getenv("SLACK_DIGEST_WINDOW", "60"))  # Seconds Slack alerts wait to be merged into one message (0 = one per article)
+SLACK_BATCH_LINGER = float(os.getenv("SLACK_BATCH_LINGER", "0.05"))  # Seconds to collect a channel's due alerts before posting
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))  # Then a delivery is marked failed
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "14"))  # Finished deliveries kept for idempotency
+OUTBOX_DRAIN_INTERVAL = int(os.getenv("OUTBOX_DRAIN_INTERVAL", "60"))  # Seconds between retry sweeps
+WEEKLY_DIGEST_SIZE = int(os.getenv("WEEKLY_DIGEST_SIZE", "10"))  # Top articles kept per weekly digest
+DIGEST_RETENTION_WEEKS = int(os.getenv("DIGEST_RETENTION_WEEKS", "4"))  # Weeks of digests kept after sending
 
 # Scraping
 HACKERNEWS_URL = "https://thehackernews.com/"
 SCRAPE_INTERVAL_HOURS = int(os.getenv("SCRAPE_INTERVAL_HOURS", "1"))
 REQUEST_DELAY = float(os.getenv("REQUEST_DELAY", "1.5"))
+FETCH_CONCURRENCY_PER_HOST = int(os.getenv("FETCH_CONCURRENCY_PER_HOST", "4"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "30"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")  # "lxml" or "bs4"
+SEEN_URL_CACHE_SIZE = int(os.getenv("SEEN_URL_CACHE_SIZE", "5000"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "10"))  # Max articles waiting between scrape stages
+
+# Local caches (HTTP responses, LLM analyses)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache"))
+HTTP_CACHE_DIR = os.path.join(CACHE_DIR, "http")
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "500"))
+ANALYSIS_CACHE_DIR = os.path.join(CACHE_DIR, "analyses")
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+BATCH_DIR = os.path.join(CACHE_DIR, "batches")  # OpenAI Batch API input files and run state
+OUTBOX_PATH = os.path.join(CACHE_DIR, "outbox.sqlite3")  # Pending/sent notification deliveries
+DIGEST_PATH = os.path.join(CACHE_DIR, "digests.sqlite3")  # Running weekly digests
+DEDUP_INDEX_PATH = os.path.join(CACHE_DIR, "minhash_index.json")  # Near-duplicate (MinHash/LSH) index
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "5000"))  # Most recent articles kept in the index
+DEDUP_DUPLICATE_THRESHOLD = float(os.getenv("DEDUP_DUPLICATE_THRESHOLD", "0.85"))  # Similarity to reuse an existing analysis
+DEDUP_FOLLOWUP_THRESHOLD = float(os.getenv("DEDUP_FOLLOWUP_THRESHOLD", "0.5"))  # Similarity to mark an article as a follow-up
+DEDUP_SEED_DAYS = int(os.getenv("DEDUP_SEED_DAYS", "14"))  # An empty index is seeded from articles this recent...
+DEDUP_SEED_LIMIT = int(os.getenv("DEDUP_SEED_LIMIT", "1000"))  # ...at most this many (each costs a MinHash signature)
 
 # Slack OAuth
 SLACK_CLIENT_ID = os.getenv("SLACK_CLIENT_ID")
 SLACK_CLIENT_SECRET = os.getenv("SLACK_CLIENT_SECRET")
 SLACK_REDIRECT_URI = os.getenv("SLACK_REDIRECT_URI", "http://localhost:8000/slack/callback")
+SLACK_CLIENT_POOL_SIZE = int(os.getenv("SLACK_CLIENT_POOL_SIZE", "500"))  # Pooled Slack clients (one per bot token)
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
 # JWT Secret for Slack OAuth State
@@ -2,13 +2,37 @@
 Supabase database client
 """
 
-from typing import Optional
+import threading
+from typing import Any, Callable, Iterator, List, Optional
 from supabase import create_client, Client
-from .config import SUPABASE_URL, SUPABASE_KEY
+from .config import SUPABASE_URL, SUPABASE_KEY, DB_PAGE_SIZE
 
 _supabase: Optional[Client] = None
 
 
+class RoundTrips:
+    """Counts Supabase requests by kind, so jobs can report how chatty they were"""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def read(self, n: int = 1):
+        with self._lock:
+            self.reads += n
+
+    def write(self, n: int = 1):
+        with self._lock:
+            self.writes += n
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "writes": self.writes}
+
+
+round_trips = RoundTrips()
+
+
 def get_supabase() -> Client:
     """Get or create Supabase client (singleton)"""
     global _supabase
@@ -18,3 +42,61 @@ def get_supabase() -> Client:
         _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
     return _supabase
 
+
+
+def iter_pages(
+    table: str,
+    columns: str = "id",
+    key: str = "id",
+    where: Optional[Callable[[Any], Any]] = None,
+    page_size: int = DB_PAGE_SIZE,
+    client: Optional[Client] = None,
+) -> Iterator[List[dict]]:
+    """
+    Read a table a page at a time, in `key` order.
+    Pages continue after the last key seen (keyset pagination), so each request
+    is an index range scan however deep into the table it is, and only one
+    page is held at a time. `key` must be unique and is added to `columns`
+    if missing. `where` adds filters, e.g. lambda q: q.gte("analyzed_at", since).
+    """
+    client = client or get_supabase()
+    if columns != "*" and key not in (c.strip() for c in columns.split(",")):
+        columns = f"{columns}, {key}"
+
+    last = None
+    while True:
+        query = client.table(table).select(columns)
+        if where is not None:
+            query = where(query)
+        if last is not None:
+            query = query.gt(key, last)
+        rows = query.order(key).limit(page_size).execute().data or []
+        round_trips.read()
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1][key]
+
+
+def iter_rows(
+    table: str,
+    columns: str = "id",
+    key: str = "id",
+    where: Optional[Callable[[Any], Any]] = None,
+    page_size: int = DB_PAGE_SIZE,
+    client: Optional[Client] = None,
+) -> Iterator[dict]:
+    """Stream the rows of a table with a column projection (see iter_pages)"""
+    for page in iter_pages(table, columns, key, where, page_size, client):
+        yield from page
+
+
+def count_rows(table: str, where: Optional[Callable[[Any], Any]] = None, client: Optional[Client] = None) -> int:
+    """Exact row count, without transferring any rows"""
+    query = (client or get_supabase()).table(table).select("id", count="exact", head=True)
+    if where is not None:
+        query = where(query)
+    result = query.execute()
+    round_trips.read()
+    return result.count or 0
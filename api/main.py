@@ -12,11 +12,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
-from .config import API_TITLE, API_VERSION, API_DESCRIPTION, SCRAPE_INTERVAL_HOURS
+from .config import API_TITLE, API_VERSION, API_DESCRIPTION, SCRAPE_INTERVAL_HOURS, OUTBOX_DRAIN_INTERVAL
 from .routers import articles_router, analysis_router, scheduler_router, company_router, notifications_router, slack_router, share_router
 from .routers.scheduler import set_scheduler
-from .services.scraper import scrape_and_save
-from .services.notifier import send_weekly_summaries
+from .services.jobs import start_scrape_job, run_scrape_job, cancel_jobs
+from .services.fetcher import close_fetcher
+from .services.slack import close_slack_clients
+from .services.notifier import send_weekly_summaries, drain_notifications, set_scheduler as set_notifier_scheduler
 
 # Configure logging
 logging.basicConfig(
@@ -32,12 +34,13 @@ scheduler = AsyncIOScheduler()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    # Set scheduler for router
+    # Set scheduler for router and notifier
     set_scheduler(scheduler)
+    set_notifier_scheduler(scheduler)
     
     # Start scheduler
     scheduler.add_job(
-        scrape_and_save,
+        run_scrape_job,
         IntervalTrigger(hours=SCRAPE_INTERVAL_HOURS),
         id="scrape_hackernews",
         name="Scrape The Hacker News",
@@ -56,17 +59,31 @@ async def lifespan(app: FastAPI):
         replace_existing=True
     )
     
+    # Notification outbox - retries and anything queued outside a scrape
+    scheduler.add_job(
+        drain_notifications,
+        IntervalTrigger(seconds=OUTBOX_DRAIN_INTERVAL),
+        id="drain_notifications",
+        name="Deliver Queued Notifications",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    
     scheduler.start()
     logger.info(f"🚀 Scheduler started - scraping every {SCRAPE_INTERVAL_HOURS} hour(s)")
     
-    # Run initial scrape on startup
-    logger.info("Running initial scrape...")
-    scrape_and_save()
+    # Run initial scrape in the background so startup isn't held up
+    logger.info("Starting initial scrape...")
+    start_scrape_job("startup")
     
     yield
     
     # Shutdown
     scheduler.shutdown()
+    await cancel_jobs()
+    await close_fetcher()
+    await close_slack_clients()
     logger.info("Scheduler stopped")
 
 
@@ -3,7 +3,7 @@ API Request/Response Schemas
 """
 
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 
@@ -113,6 +113,14 @@ class ScrapeResult(BaseModel):
     analyzed: int = 0
     skipped: int
     errors: int
+    duplicates: int = 0  # Near-duplicates that reused an existing analysis
+    follow_ups: int = 0  # Analyzed articles similar to an earlier one
+    homepage_unchanged: bool = False
+    cache_hits: int = 0
+    cache_misses: int = 0
+    db_reads: int = 0  # Supabase round trips made by the run
+    db_writes: int = 0
+    stages: Dict[str, Dict[str, float]] = {}  # Per-stage processed/failed/max_queue_depth/busy_seconds
     timestamp: str
     
     model_config = ConfigDict(
@@ -122,12 +130,53 @@ class ScrapeResult(BaseModel):
                 "analyzed": 5,
                 "skipped": 7,
                 "errors": 0,
+                "duplicates": 1,
+                "follow_ups": 0,
+                "homepage_unchanged": False,
+                "cache_hits": 1,
+                "cache_misses": 6,
+                "db_reads": 3,
+                "db_writes": 3,
+                "stages": {
+                    "fetch": {"processed": 5, "failed": 0, "max_queue_depth": 5, "busy_seconds": 3.2},
+                    "save": {"processed": 5, "failed": 0, "max_queue_depth": 2, "busy_seconds": 0.3},
+                    "analyze": {"processed": 5, "failed": 0, "max_queue_depth": 3, "busy_seconds": 41.5},
+                    "store": {"processed": 5, "failed": 0, "max_queue_depth": 2, "busy_seconds": 0.2},
+                    "notify": {"processed": 5, "failed": 0, "max_queue_depth": 2, "busy_seconds": 1.1}
+                },
                 "timestamp": "2025-11-29T12:00:00Z"
             }
         }
     )
 
 
+class ScrapeJob(BaseModel):
+    """Background scrape job"""
+    job_id: str
+    status: str  # queued, running, succeeded, failed, cancelled
+    trigger: str  # startup, scheduled, manual
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    result: Optional[ScrapeResult] = None
+    error: Optional[str] = None
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "job_id": "3f2b9c1e8d7a4b6c9e0f1a2b3c4d5e6f",
+                "status": "running",
+                "trigger": "manual",
+                "created_at": "2025-11-29T12:00:00",
+                "started_at": "2025-11-29T12:00:00",
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+        }
+    )
+
+
 class SchedulerStatus(BaseModel):
     """Scheduler status"""
     running: bool
@@ -8,7 +8,8 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, ConfigDict, Field
 
 from ..database import get_supabase
-from ..services.analyzer import analyze_and_save, get_all_analyses, get_analysis_by_url
+from ..services.analyzer import analyze_and_save, get_all_analyses, get_analysis_by_url, get_analysis_cache, get_router
+from ..services.notifier import track_weekly_digests
 from ..services.slack import format_slack_message, format_slack_text
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
@@ -20,7 +21,7 @@ class AnalyzeRequest(BaseModel):
     content: str = Field(..., description="Full article text content")
     url: str = Field(default="", description="Article URL (optional)")
     is_sponsored: bool = Field(default=False, description="Whether the article is sponsored")
-    model: str = Field(default="gpt-4o-mini", description="OpenAI model to use")
+    model: Optional[str] = Field(default=None, description="OpenAI model to use (default: tiered routing, cheapest model first)")
     force: bool = Field(default=False, description="Re-analyze even if already exists")
     
     model_config = ConfigDict(
@@ -30,7 +31,7 @@ class AnalyzeRequest(BaseModel):
                 "content": "Security researchers at XYZ Labs have discovered a critical zero-day vulnerability (CVE-2025-9999) affecting millions of websites running the popular CMS platform. The vulnerability allows remote code execution without authentication. Organizations are urged to apply the emergency patch immediately. The flaw was found in the file upload functionality and has already been exploited in the wild by threat actors...",
                 "url": "https://thehackernews.com/2025/11/critical-zero-day.html",
                 "is_sponsored": False,
-                "model": "gpt-4o-mini",
+                "model": None,
                 "force": False
             }
         }
@@ -69,6 +70,25 @@ async def get_analysis_for_url(
     return result
 
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Analysis cache hit/miss counters since startup and the current prompt version"""
+    return get_analysis_cache().stats()
+
+
+@router.get("/router/stats")
+async def get_router_stats():
+    """Which model tier answered how many analyses since startup, and why answers were escalated"""
+    return get_router().stats()
+
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop every cached analysis so the next analysis of any article calls the LLM"""
+    removed = get_analysis_cache().clear()
+    return {"removed": removed}
+
+
 @router.get("/{analysis_id}")
 async def get_analysis(analysis_id: str):
     """Get analysis by ID"""
@@ -98,6 +118,8 @@ async def create_analysis(request: AnalyzeRequest):
             model=request.model,
             force=request.force
         )
+        if analysis is not None and saved:
+            track_weekly_digests([saved])
         
         return {
             "new": analysis is not None,
@@ -110,14 +132,14 @@ async def create_analysis(request: AnalyzeRequest):
 @router.post("/article/{article_id}")
 async def analyze_article_by_id(
     article_id: int,
-    model: str = Query(default="gpt-4o-mini", description="OpenAI model to use", example="gpt-4o-mini"),
+    model: Optional[str] = Query(default=None, description="OpenAI model to use (default: tiered routing)", example="gpt-4o-mini"),
     force: bool = Query(default=False, description="Re-analyze even if already exists", example=False)
 ):
     """
     Analyze an article from the database by ID.
     
     - **article_id**: Database ID of the article to analyze
-    - **model**: OpenAI model (gpt-4o-mini, gpt-4o, gpt-4-turbo)
+    - **model**: OpenAI model (gpt-4o-mini, gpt-4o, gpt-4-turbo); omit to route fast model first
     - **force**: Set to true to re-analyze even if analysis already exists
     """
     try:
@@ -138,6 +160,8 @@ async def analyze_article_by_id(
             model=model,
             force=force
         )
+        if analysis is not None and saved:
+            track_weekly_digests([saved])
         
         return {
             "new": analysis is not None,
@@ -3,12 +3,14 @@ Articles Router
 CRUD operations for raw articles
 """
 
+import asyncio
+from collections import Counter
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 
-from ..database import get_supabase
-from ..models.schemas import Article, ScrapeResult, StatsResponse
-from ..services.scraper import scrape_and_save
+from ..database import get_supabase, iter_rows, count_rows
+from ..models.schemas import Article, ScrapeJob, StatsResponse
+from ..services.jobs import start_scrape_job, get_job
 
 router = APIRouter(prefix="/articles", tags=["articles"])
 
@@ -56,11 +58,24 @@ async def get_article(article_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/scrape", response_model=ScrapeResult)
+@router.post("/scrape", response_model=ScrapeJob, status_code=202)
 async def trigger_scrape():
-    """Manually trigger a scrape job"""
-    result = scrape_and_save()
-    return ScrapeResult(**result)
+    """
+    Manually trigger a scrape job.
+    
+    The scrape runs in the background - poll `/articles/scrape/{job_id}` for its result.
+    If a scrape is already running, that job is returned instead of starting another.
+    """
+    return start_scrape_job("manual")
+
+
+@router.get("/scrape/{job_id}", response_model=ScrapeJob)
+async def get_scrape_job(job_id: str):
+    """Get the status (and result, once finished) of a scrape job"""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scrape job not found")
+    return job
 
 
 @router.get("/stats/summary", response_model=StatsResponse)
@@ -71,30 +86,25 @@ async def get_stats():
     Returns counts of articles, analyses, and top tags.
     """
     try:
-        supabase = get_supabase()
-        
-        articles = supabase.table("news_articles").select("id", count="exact").execute()
-        total_articles = len(articles.data)
-        
-        analyses = supabase.table("article_analyses").select("id", count="exact").execute()
-        total_analyses = len(analyses.data)
-        
-        tags_result = supabase.table("news_articles").select("tags").execute()
-        tag_counts = {}
-        for row in tags_result.data:
-            if row.get("tags"):
-                for tag in row["tags"].split(" / "):
-                    tag = tag.strip()
-                    tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        
-        top_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return {
-            "total_articles": total_articles,
-            "total_analyses": total_analyses,
-            "pending_analyses": total_articles - total_analyses,
-            "top_tags": dict(top_tags)
-        }
+        return await asyncio.to_thread(_collect_stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _collect_stats() -> dict:
+    # Counts come from the server; tags are streamed a page at a time
+    total_articles = count_rows("news_articles")
+    total_analyses = count_rows("article_analyses")
+    
+    tag_counts = Counter()
+    for row in iter_rows("news_articles", "id, tags"):
+        if row.get("tags"):
+            tag_counts.update(tag.strip() for tag in row["tags"].split(" / "))
+    
+    return {
+        "total_articles": total_articles,
+        "total_analyses": total_analyses,
+        "pending_analyses": total_articles - total_analyses,
+        "top_tags": dict(tag_counts.most_common(10))
+    }
+
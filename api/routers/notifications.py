@@ -5,7 +5,8 @@ Notifications Router
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
 
-from ..services.notifier import send_email
+from ..services.notifier import send_email, dispatcher
+from ..services.outbox import get_outbox
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -37,3 +38,13 @@ async def test_email(request: TestEmailRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.get("/outbox/stats")
+async def outbox_stats():
+    """
+    Notification outbox metrics: queue depth by status, age of the oldest
+    pending delivery, delivery latency (enqueue to sent) since startup, and
+    the dispatcher's rate limits.
+    """
+    return {**get_outbox().stats(), "rate_limits": dispatcher.stats()}
@@ -24,6 +24,7 @@ from ..config import (
 )
 from ..database import get_supabase
 from ..services.slack import exchange_code_for_token, list_user_channels
+from ..services.notifier import invalidate_slack_connection
 
 logger = logging.getLogger(__name__)
 
@@ -166,6 +167,7 @@ async def slack_callback(
             "updated_at": datetime.utcnow().isoformat(),
         }, on_conflict="user_id").execute()
         
+        invalidate_slack_connection(user_id)
         logger.info(f"Slack connected for user {user_id} to team {token_data.get('team_name')}")
         
     except Exception as e:
@@ -265,6 +267,7 @@ async def set_channel(
             }) \
             .eq("user_id", user_id) \
             .execute()
+        invalidate_slack_connection(user_id)
         
         return {"success": True, "channel_name": request.channel_name}
     except Exception as e:
@@ -286,6 +289,7 @@ async def disconnect_slack(authorization: str = Header(None)):
             .delete() \
             .eq("user_id", user_id) \
             .execute()
+        invalidate_slack_connection(user_id)
         
         return {"success": True}
     except Exception as e:
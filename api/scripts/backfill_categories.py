@@ -5,19 +5,24 @@ Scrapes articles from specific category pages with pagination support
 """
 
 import os
-import re
 import asyncio
 import logging
 from datetime import datetime
 from typing import Optional
-from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
-import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from api.config import DB_IN_CHUNK_SIZE
+from api.database import iter_rows
+from api.services.analyzer import Analyzer, get_analyzer, copy_analysis, get_analysis_by_url
+from api.services.dedup import get_dedup_index, seed_dedup_index
+from api.services.digests import mark_digests_stale
+from api.services.fetcher import Fetcher
+from api.services.openai_batch import BatchRun, resume_unfinished
+from api.services.parser import get_parser
+
 # Load environment variables
 load_dotenv()
 
@@ -43,12 +48,15 @@ CATEGORY_URLS = {
 DEFAULT_PAGES_PER_CATEGORY = 10
 
 # Concurrent workers
-MAX_SCRAPE_WORKERS = 3
-MAX_ANALYZE_WORKERS = 5
+MAX_SCRAPE_WORKERS = 3  # Parallel connections to thehackernews.com
+# Analysis concurrency adapts to OpenAI rate limits (MAX_CONCURRENT / LLM_*_CONCURRENCY env vars)
 
-# Delay between requests (be nice to the server)
+# Delay between requests on each connection (be nice to the server)
 REQUEST_DELAY = 1.0
 
+# Columns --recent loads for the articles it analyzes
+RECENT_ARTICLE_COLUMNS = "id, url, title, text, is_sponsored"
+
 # ============================================================================
 # SUPABASE CLIENT
 # ============================================================================
@@ -67,154 +75,28 @@ def get_supabase() -> Client:
     return _supabase
 
 
-# ============================================================================
-# LLM ANALYSIS
-# ============================================================================
-
-def get_llm():
-    """Get LangChain ChatOpenAI with structured output"""
-    from langchain_openai import ChatOpenAI
-    from Article import ArticleAnalysis  # Import from root Article.py
-    
-    return ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-        temperature=0.3,
-        api_key=os.getenv("OPENAI_API_KEY")
-    ).with_structured_output(ArticleAnalysis)
-
-
-SYSTEM_PROMPT = """You are an expert news analyst. Analyze articles and provide structured summaries for busy professionals.
-
-You handle ALL types of news: technology, AI, security, business, programming, tutorials, product launches, and more.
-
-Guidelines:
-- Be concise but comprehensive
-- Prioritize actionable insights
-- Rate priority: critical (breaking/urgent), high (important), medium (worth knowing), low (nice to know), info (reference)
-- Assign up to 3 relevant categories
-- relevance_score (1-10): practical value to readers
-- confidence_score (1-10): how well you understood the content
-- Mark highlight=True for most critical takeaways
-- Mark is_technical=True for technical points
-- short_summary: 1-2 sentences
-- long_summary: 3-5 sentences
-- headline: catchy, max 100 chars
-
-IMPORTANT for regions:
-- If specific countries or regions are mentioned, include them in the regions array
-- Each region should have both the region code AND the flag emoji
-- Example: {{"region": "south_korea", "flag": "🇰🇷"}}
-- Common flags: 🇺🇸 USA, 🇬🇧 UK, 🇨🇳 China, 🇷🇺 Russia, 🇰🇷 South Korea, 🇰🇵 North Korea, 🇺🇦 Ukraine, 🇮🇷 Iran, 🇮🇱 Israel, 🌍 Global"""
-
-
 # ============================================================================
 # SCRAPING FUNCTIONS
 # ============================================================================
 
-def get_page_articles(page_url: str) -> tuple[list[str], Optional[str]]:
+async def get_page_articles(fetcher: Fetcher, page_url: str) -> tuple[list[str], Optional[str]]:
     """
     Scrape a single page for article URLs.
     Returns: (list of article URLs, next page URL or None)
     """
     try:
-        resp = requests.get(page_url, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
-        # Extract article URLs
-        article_containers = soup.select(".blog-posts > .body-post")
-        urls = []
-        for container in article_containers:
-            link_element = container.select_one(".story-link")
-            if link_element and link_element.has_attr("href"):
-                urls.append(link_element["href"])
-        
-        # Find "Next Page" link
-        next_page_url = None
-        next_link = soup.select_one('a.blog-pager-older-link-mobile')
-        if next_link and next_link.has_attr("href"):
-            next_page_url = next_link["href"]
-        else:
-            next_link = soup.select_one('a.blog-pager-older-link')
-            if next_link and next_link.has_attr("href"):
-                next_page_url = next_link["href"]
-        
-        return urls, next_page_url
-        
+        html = await fetcher.get_text(page_url)
+        return get_parser().parse_listing(html)
     except Exception as e:
         logger.error(f"Error fetching page {page_url[:60]}: {e}")
         return [], None
 
 
-def extract_article_data(article_url: str) -> Optional[dict]:
+async def extract_article_data(fetcher: Fetcher, article_url: str) -> Optional[dict]:
     """Extract full article data from a single article page."""
     try:
-        resp = requests.get(article_url, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        article_data = {}
-
-        # Title and URL
-        title_link = soup.select_one('.story-title a')
-        if title_link:
-            article_data["title"] = title_link.get_text(strip=True)
-            article_data["url"] = title_link.get("href", article_url)
-        else:
-            h1 = soup.select_one("h1.story-title")
-            article_data["title"] = h1.get_text(strip=True) if h1 else "N/A"
-            article_data["url"] = article_url
-
-        # Thumbnail
-        thumbnail_meta = soup.select_one('div[itemprop="image"] meta[itemprop="url"]')
-        if thumbnail_meta:
-            article_data["thumbnail"] = thumbnail_meta.get("content", "")
-        else:
-            article_body_img = soup.select_one("#articlebody img")
-            article_data["thumbnail"] = article_body_img["src"] if article_body_img and article_body_img.has_attr("src") else ""
-
-        # Metadata
-        postmeta_element = soup.select_one('.postmeta')
-        post_head_tags = []
-        if postmeta_element:
-            date_element = postmeta_element.select_one('.p-author .author')
-            article_data["timestamp"] = date_element.get_text(strip=True) if date_element else None
-            
-            author_meta = soup.select_one('div[itemprop="author"] meta[itemprop="name"]')
-            if author_meta and author_meta.has_attr("content"):
-                article_data["author"] = author_meta["content"]
-            else:
-                authors = postmeta_element.select('.author')
-                article_data["author"] = authors[1].get_text(strip=True) if len(authors) > 1 else None
-            
-            tags_meta = postmeta_element.select_one('.p-tags')
-            if tags_meta:
-                post_head_tags = [t.strip() for t in tags_meta.text.strip().split(' / ') if t.strip()]
-
-        # Article body
-        article_body = soup.find(id="articlebody")
-        if article_body:
-            body_clone = BeautifulSoup(str(article_body), "html.parser")
-            for selector in ['.separator', '.dog_two', '.cf.note-b']:
-                for el in body_clone.select(selector):
-                    el.decompose()
-            full_text = body_clone.get_text("\n", strip=True)
-            full_text = re.sub(r"\n\s*\n", "\n\n", full_text).strip()
-            article_data["text"] = full_text
-        else:
-            article_data["text"] = ""
-
-        # Tags
-        detailed_tags_element = soup.select_one('.tags .categ')
-        if detailed_tags_element:
-            section_spans = detailed_tags_element.select('a span[itemprop="articleSection"]')
-            article_data["tags"] = " / ".join([span.get_text(strip=True) for span in section_spans])
-        else:
-            article_data["tags"] = " / ".join(post_head_tags)
-
-        article_data["is_sponsored"] = "sponsored" in article_data.get("tags", "").lower()
-        
-        return article_data
-        
+        html = await fetcher.get_text(article_url)
+        return get_parser().parse_article(html, article_url)
     except Exception as e:
         logger.error(f"Error extracting {article_url[:50]}: {e}")
         return None
@@ -227,9 +109,7 @@ def extract_article_data(article_url: str) -> Optional[dict]:
 def get_existing_urls() -> set[str]:
     """Get all existing article URLs from database"""
     try:
-        supabase = get_supabase()
-        result = supabase.table("news_articles").select("url").execute()
-        return {row["url"] for row in result.data}
+        return {row["url"] for row in iter_rows("news_articles", "id, url", client=get_supabase())}
     except Exception as e:
         logger.error(f"Error fetching existing URLs: {e}")
         return set()
@@ -238,9 +118,7 @@ def get_existing_urls() -> set[str]:
 def get_analyzed_urls() -> set[str]:
     """Get all analyzed article URLs from database"""
     try:
-        supabase = get_supabase()
-        result = supabase.table("article_analyses").select("article_url").execute()
-        return {row["article_url"] for row in result.data}
+        return {row["article_url"] for row in iter_rows("article_analyses", "id, article_url", client=get_supabase())}
     except Exception as e:
         logger.error(f"Error fetching analyzed URLs: {e}")
         return set()
@@ -305,11 +183,13 @@ def save_analysis(article_data: dict, article_id: int, analysis) -> bool:
             "model_used": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
         }
         
-        supabase.table("article_analyses").upsert(
+        result = supabase.table("article_analyses").upsert(
             data,
             on_conflict="article_url"
         ).execute()
         
+        # Written outside the pipeline - the weekly job rebuilds this week's digests
+        mark_digests_stale(result.data or [data])
         return True
     except Exception as e:
         logger.error(f"Error saving analysis: {e}")
@@ -325,7 +205,7 @@ async def scrape_category_async(
     start_url: str,
     num_pages: int,
     existing_urls: set[str],
-    executor: ThreadPoolExecutor
+    fetcher: Fetcher
 ) -> list[dict]:
     """
     Async scrape a single category.
@@ -333,7 +213,6 @@ async def scrape_category_async(
     """
     logger.info(f"\n📂 Category: {category_name}")
     
-    loop = asyncio.get_event_loop()
     all_urls = []
     current_url = start_url
     
@@ -343,39 +222,25 @@ async def scrape_category_async(
         
         logger.info(f"  📄 Page {page_num}/{num_pages}")
         
-        # Fetch page in thread pool
-        urls, next_url = await loop.run_in_executor(
-            executor,
-            get_page_articles,
-            current_url
-        )
+        urls, next_url = await get_page_articles(fetcher, current_url)
         
         all_urls.extend(urls)
         current_url = next_url
-        
-        # Small delay
-        await asyncio.sleep(0.5)
     
-    # Deduplicate
-    new_urls = [url for url in all_urls if url not in existing_urls]
+    # Deduplicate (category pages overlap, so keep first occurrence only)
+    new_urls = [url for url in dict.fromkeys(all_urls) if url not in existing_urls]
     logger.info(f"  📊 Found {len(all_urls)} URLs, {len(new_urls)} new")
     
-    # Fetch article details
+    # Fetch article details concurrently (the fetcher enforces per-host politeness)
+    fetched = await asyncio.gather(*(extract_article_data(fetcher, url) for url in new_urls))
+    
     articles = []
-    for i, url in enumerate(new_urls):
-        article_data = await loop.run_in_executor(
-            executor,
-            extract_article_data,
-            url
-        )
-        
+    for i, (url, article_data) in enumerate(zip(new_urls, fetched)):
         if article_data:
             articles.append(article_data)
             logger.info(f"  [{i+1}/{len(new_urls)}] ✅ {article_data.get('title', 'Unknown')[:40]}...")
         else:
             logger.error(f"  [{i+1}/{len(new_urls)}] ❌ Failed: {url[:50]}")
-        
-        await asyncio.sleep(0.3)
     
     return articles
 
@@ -383,75 +248,45 @@ async def scrape_category_async(
 async def analyze_article_async(
     article_data: dict,
     article_id: int,
-    llm,
-    semaphore: asyncio.Semaphore,
-    executor: ThreadPoolExecutor
+    analyzer: Analyzer
 ) -> tuple[bool, str]:
     """
     Analyze a single article asynchronously.
     Returns (success, message)
     """
-    async with semaphore:
-        try:
-            from langchain_core.prompts import ChatPromptTemplate
-            
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", SYSTEM_PROMPT),
-                ("human", """Analyze this article:
-
-Title: {title}
-URL: {url}
-Is Sponsored: {is_sponsored}
-
-Content:
-{content}
-
-Provide a comprehensive structured analysis.""")
-            ])
-            
-            chain = prompt | llm
-            loop = asyncio.get_event_loop()
-            
-            analysis = await loop.run_in_executor(
-                executor,
-                lambda: chain.invoke({
-                    "title": article_data.get("title", ""),
-                    "url": article_data.get("url", ""),
-                    "is_sponsored": article_data.get("is_sponsored", False),
-                    "content": article_data.get("text", "")[:15000]
-                })
-            )
-            
-            analysis.is_sponsored = article_data.get("is_sponsored", False)
-            
-            if save_analysis(article_data, article_id, analysis):
-                return (True, f"✅ {analysis.headline[:40]}...")
-            else:
-                return (False, f"❌ Save failed: {article_data.get('title', 'Unknown')[:30]}")
-            
-        except Exception as e:
-            return (False, f"❌ {article_data.get('title', 'Unknown')[:30]}: {str(e)[:30]}")
+    try:
+        analysis = await analyzer.ainvoke(
+            title=article_data.get("title", ""),
+            content=article_data.get("text", ""),
+            url=article_data.get("url", ""),
+            is_sponsored=article_data.get("is_sponsored", False)
+        )
+        
+        if await asyncio.to_thread(save_analysis, article_data, article_id, analysis):
+            return (True, f"✅ {analysis.headline[:40]}...")
+        else:
+            return (False, f"❌ Save failed: {article_data.get('title', 'Unknown')[:30]}")
+        
+    except Exception as e:
+        return (False, f"❌ {article_data.get('title', 'Unknown')[:30]}: {str(e)[:30]}")
 
 
 async def batch_analyze_async(
-    articles: list[tuple[dict, int]],  # (article_data, article_id)
-    max_concurrent: int = MAX_ANALYZE_WORKERS
+    articles: list[tuple[dict, int]]  # (article_data, article_id)
 ) -> tuple[int, int]:
     """
     Analyze multiple articles concurrently.
+    Concurrency adapts to OpenAI rate limits (see AdaptiveLimiter).
     Returns (success_count, error_count)
     """
     if not articles:
         return 0, 0
     
-    logger.info(f"\n🤖 Analyzing {len(articles)} articles (max {max_concurrent} concurrent)...")
-    
-    semaphore = asyncio.Semaphore(max_concurrent)
-    executor = ThreadPoolExecutor(max_workers=max_concurrent)
-    llm = get_llm()
+    analyzer = get_analyzer()
+    logger.info(f"\n🤖 Analyzing {len(articles)} articles (starting at {int(analyzer.limiter.limit)} concurrent)...")
     
     tasks = [
-        analyze_article_async(article_data, article_id, llm, semaphore, executor)
+        analyze_article_async(article_data, article_id, analyzer)
         for article_data, article_id in articles
     ]
     
@@ -473,10 +308,46 @@ async def batch_analyze_async(
                 error_count += 1
                 logger.error(f"[{i+1}/{len(results)}] {message}")
     
-    executor.shutdown(wait=False)
+    logger.info(f"LLM concurrency: {analyzer.limiter.stats()}")
+    logger.info(f"Input tokens: {analyzer.input_tokens} ({analyzer.tokens_saved} saved by preprocessing)")
     return success_count, error_count
 
 
+async def batch_api_analyze(articles: list[tuple[dict, int]]) -> tuple[int, int]:
+    """
+    Analyze through the OpenAI Batch API instead of live calls.
+    Runs left unfinished by an interrupted backfill are completed first.
+    Returns (success_count, error_count)
+    """
+    success, errors = await resume_unfinished()
+    
+    run = BatchRun.create([{**article_data, "id": article_id} for article_data, article_id in articles])
+    run_success, run_errors = await run.run()
+    return success + run_success, errors + run_errors
+
+
+def reuse_duplicate_analyses(duplicates: list[tuple[dict, int, str]]) -> tuple[int, list[tuple[dict, int]]]:
+    """
+    Copy the analysis of each near-duplicate's original.
+    Returns (copied, articles whose original has no analysis and still need one)
+    """
+    copied = 0
+    missing = []
+    for article_data, article_id, original_url in duplicates:
+        original = get_analysis_by_url(original_url)
+        if not original:
+            missing.append((article_data, article_id))
+            continue
+        try:
+            mark_digests_stale([copy_analysis(original, article_data.get("url"), article_data.get("title"), article_id)])
+            copied += 1
+            logger.info(f"♻️ {article_data.get('title', 'Unknown')[:40]}... reused analysis of {original_url}")
+        except Exception as e:
+            logger.error(f"❌ Copying analysis failed for {article_data.get('url')}: {e}")
+            missing.append((article_data, article_id))
+    return copied, missing
+
+
 # ============================================================================
 # MAIN BACKFILL FUNCTION
 # ============================================================================
@@ -484,7 +355,8 @@ async def batch_analyze_async(
 async def backfill_categories(
     categories: dict[str, str] = CATEGORY_URLS,
     pages_per_category: int = DEFAULT_PAGES_PER_CATEGORY,
-    analyze: bool = True
+    analyze: bool = True,
+    use_batch_api: bool = False
 ) -> dict:
     """
     Backfill articles from multiple categories with async analysis.
@@ -496,7 +368,7 @@ async def backfill_categories(
     logger.info("=" * 70)
     logger.info(f"Categories: {', '.join(categories.keys())}")
     logger.info(f"Pages per category: {pages_per_category}")
-    logger.info(f"Analyze: {analyze}")
+    logger.info(f"Analyze: {analyze}{' (Batch API)' if analyze and use_batch_api else ''}")
     logger.info("=" * 70)
     
     # Get existing data
@@ -509,11 +381,17 @@ async def backfill_categories(
     total_scraped = 0
     total_saved = 0
     total_analyzed = 0
+    total_duplicates = 0
     total_errors = 0
     
+    # Near-duplicate index (the same story is often listed under several categories)
+    dedup_index = get_dedup_index()
+    seed_dedup_index()
+    
     # Scrape all categories
     all_articles = []  # List of (article_data, article_id) tuples
-    executor = ThreadPoolExecutor(max_workers=MAX_SCRAPE_WORKERS)
+    duplicates = []  # List of (article_data, article_id, original_url) tuples
+    fetcher = Fetcher(delay=REQUEST_DELAY, concurrency_per_host=MAX_SCRAPE_WORKERS)
     
     for category_name, category_url in categories.items():
         articles = await scrape_category_async(
@@ -521,7 +399,7 @@ async def backfill_categories(
             start_url=category_url,
             num_pages=pages_per_category,
             existing_urls=existing_urls,
-            executor=executor
+            fetcher=fetcher
         )
         
         total_scraped += len(articles)
@@ -531,23 +409,47 @@ async def backfill_categories(
             result = save_article(article_data)
             if result:
                 total_saved += 1
-                existing_urls.add(article_data.get("url"))
+                url = article_data.get("url")
+                existing_urls.add(url)
+                match = dedup_index.query(article_data.get("text", ""), exclude=url)
+                dedup_index.add(url, article_data.get("text", ""), result.get("id"))
                 
                 # Check if needs analysis
-                if analyze and article_data.get("url") not in analyzed_urls:
-                    all_articles.append((article_data, result.get("id")))
+                if analyze and url not in analyzed_urls:
+                    if match and match.is_duplicate:
+                        duplicates.append((article_data, result.get("id"), match.url))
+                    else:
+                        all_articles.append((article_data, result.get("id")))
             else:
                 total_errors += 1
     
-    executor.shutdown(wait=False)
+    await fetcher.aclose()
+    dedup_index.save()
+    
+    # Near-duplicates of already-analyzed articles skip the LLM; the rest wait
+    # until their originals from this run are analyzed
+    if duplicates:
+        total_duplicates, duplicates = reuse_duplicate_analyses(duplicates)
     
     # Analyze new articles
     if analyze and all_articles:
         logger.info(f"\n📊 {len(all_articles)} articles need analysis")
-        analyzed, analysis_errors = await batch_analyze_async(all_articles)
+        if use_batch_api:
+            analyzed, analysis_errors = await batch_api_analyze(all_articles)
+        else:
+            analyzed, analysis_errors = await batch_analyze_async(all_articles)
         total_analyzed = analyzed
         total_errors += analysis_errors
     
+    # Originals are analyzed now - copy their analyses; duplicates of failed originals get their own
+    if duplicates:
+        copied, missing = reuse_duplicate_analyses(duplicates)
+        total_duplicates += copied
+        if missing:
+            analyzed, analysis_errors = await batch_analyze_async(missing)
+            total_analyzed += analyzed
+            total_errors += analysis_errors
+    
     # Summary
     elapsed = (datetime.now() - start_time).total_seconds()
     
@@ -558,6 +460,7 @@ async def backfill_categories(
     logger.info(f"Articles scraped:   {total_scraped}")
     logger.info(f"Articles saved:     {total_saved}")
     logger.info(f"Articles analyzed:  {total_analyzed}")
+    logger.info(f"Near-duplicates:    {total_duplicates} (analysis reused)")
     logger.info(f"Errors:             {total_errors}")
     logger.info(f"Time elapsed:       {elapsed:.1f}s")
     if total_analyzed > 0:
@@ -569,6 +472,7 @@ async def backfill_categories(
         "scraped": total_scraped,
         "saved": total_saved,
         "analyzed": total_analyzed,
+        "duplicates": total_duplicates,
         "errors": total_errors,
         "elapsed_seconds": elapsed
     }
@@ -593,20 +497,28 @@ def get_recent_unanalyzed_articles(minutes: int = 15) -> list[tuple[dict, int]]:
     
     logger.info(f"Looking for articles since: {cutoff_iso}")
     
-    # Get recent articles
-    articles_result = supabase.table("news_articles").select("*").gte(
-        "created_at", cutoff_iso
-    ).execute()
-    
-    recent_articles = articles_result.data
+    # Get recent articles - just the columns the analysis needs
+    recent_articles = list(iter_rows(
+        "news_articles",
+        RECENT_ARTICLE_COLUMNS,
+        where=lambda q: q.gte("created_at", cutoff_iso),
+        client=supabase,
+    ))
     logger.info(f"Found {len(recent_articles)} articles in last {minutes} minutes")
     
     if not recent_articles:
         return []
     
-    # Get already analyzed URLs
-    analyzed_result = supabase.table("article_analyses").select("article_url").execute()
-    analyzed_urls = {row["article_url"] for row in analyzed_result.data}
+    # Get which of them are already analyzed
+    urls = [article["url"] for article in recent_articles if article.get("url")]
+    analyzed_urls = set()
+    for start in range(0, len(urls), DB_IN_CHUNK_SIZE):
+        chunk = urls[start:start + DB_IN_CHUNK_SIZE]
+        analyzed_urls.update(
+            row["article_url"] for row in iter_rows(
+                "article_analyses", "id, article_url", where=lambda q: q.in_("article_url", chunk), client=supabase
+            )
+        )
     
     # Filter to unanalyzed
     unanalyzed = [
@@ -701,6 +613,11 @@ if __name__ == "__main__":
         action="store_true",
         help="Skip LLM analysis (only scrape and save)"
     )
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Analyze via the OpenAI Batch API (half price, results within 24h, resumable)"
+    )
     parser.add_argument(
         "--categories", "-c",
         nargs="+",
@@ -736,7 +653,8 @@ if __name__ == "__main__":
         result = asyncio.run(backfill_categories(
             categories=categories,
             pages_per_category=args.pages,
-            analyze=not args.no_analyze
+            analyze=not args.no_analyze,
+            use_batch_api=args.batch_api
         ))
     
     print(f"\n✅ Done! Saved {result['saved']}, analyzed {result['analyzed']} articles.")
@@ -11,8 +11,6 @@ from typing import Optional
 
 from dotenv import load_dotenv
 from supabase import create_client
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
 
 # Load environment variables
 load_dotenv()
@@ -31,31 +29,13 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "5"))  # Limit concurrent API calls
 
-# Import the ArticleAnalysis model
+# Import the ArticleAnalysis model and the shared analysis chain
+from api.config import DB_IN_CHUNK_SIZE
+from api.database import iter_rows
 from api.models.article import ArticleAnalysis
-
-SYSTEM_PROMPT = """You are an expert news analyst. Analyze articles and provide structured summaries for busy professionals.
-
-You handle ALL types of news: technology, AI, security, business, programming, tutorials, product launches, and more.
-
-Guidelines:
-- Be concise but comprehensive
-- Prioritize actionable insights
-- Rate priority: critical (breaking/urgent), high (important), medium (worth knowing), low (nice to know), info (reference)
-- Assign up to 3 relevant categories
-- relevance_score (1-10): practical value to readers
-- confidence_score (1-10): how well you understood the content
-- Mark highlight=True for most critical takeaways
-- Mark is_technical=True for technical points
-- short_summary: 1-2 sentences
-- long_summary: 3-5 sentences
-- headline: catchy, max 100 chars
-
-IMPORTANT for regions:
-- If specific countries or regions are mentioned, include them in the regions array
-- Each region should have both the region code AND the flag emoji
-- Example: {{"region": "south_korea", "flag": "🇰🇷"}}
-- Common flags: 🇺🇸 USA, 🇬🇧 UK, 🇨🇳 China, 🇷🇺 Russia, 🇰🇷 South Korea, 🇰🇵 North Korea, 🇺🇦 Ukraine, 🇮🇷 Iran, 🇮🇱 Israel, 🌍 Global"""
+from api.services.analyzer import Analyzer, get_analyzer
+from api.services.digests import mark_digests_stale
+from api.services.openai_batch import BatchRun, resume_unfinished
 
 
 def get_supabase():
@@ -63,13 +43,8 @@ def get_supabase():
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-def get_llm() -> ChatOpenAI:
-    """Get LangChain ChatOpenAI instance with structured output"""
-    return ChatOpenAI(
-        model=OPENAI_MODEL,
-        temperature=0.3,
-        api_key=OPENAI_API_KEY
-    ).with_structured_output(ArticleAnalysis)
+# What analysis reads from a news_articles row
+ARTICLE_COLUMNS = "id, url, title, text, is_sponsored"
 
 
 def get_unanalyzed_articles() -> list[dict]:
@@ -77,66 +52,48 @@ def get_unanalyzed_articles() -> list[dict]:
     supabase = get_supabase()
     
     # Get all article URLs that have been analyzed
-    analyzed = supabase.table("article_analyses").select("article_url").execute()
-    analyzed_urls = {row["article_url"] for row in analyzed.data}
+    analyzed_urls = {row["article_url"] for row in iter_rows("article_analyses", "id, article_url", client=supabase)}
     
-    # Get all articles
-    articles = supabase.table("news_articles").select("*").execute()
+    # Find the unanalyzed articles by URL alone, then load full text just for them
+    total = 0
+    unanalyzed_ids = []
+    for row in iter_rows("news_articles", "id, url", client=supabase):
+        total += 1
+        if row["url"] not in analyzed_urls:
+            unanalyzed_ids.append(row["id"])
     
-    # Filter out already analyzed
-    unanalyzed = [a for a in articles.data if a["url"] not in analyzed_urls]
+    unanalyzed = []
+    for start in range(0, len(unanalyzed_ids), DB_IN_CHUNK_SIZE):
+        chunk = unanalyzed_ids[start:start + DB_IN_CHUNK_SIZE]
+        result = supabase.table("news_articles").select(ARTICLE_COLUMNS).in_("id", chunk).order("id").execute()
+        unanalyzed.extend(result.data)
     
-    logger.info(f"Found {len(unanalyzed)} unanalyzed articles out of {len(articles.data)} total")
+    logger.info(f"Found {len(unanalyzed)} unanalyzed articles out of {total} total")
     return unanalyzed
 
 
 async def analyze_article_async(
     article: dict,
-    semaphore: asyncio.Semaphore,
-    llm: ChatOpenAI
+    analyzer: Analyzer
 ) -> tuple[dict, Optional[ArticleAnalysis], Optional[str]]:
     """
     Analyze a single article asynchronously.
     Returns (article, analysis, error)
     """
-    async with semaphore:
-        try:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", SYSTEM_PROMPT),
-                ("human", """Analyze this article:
-
-Title: {title}
-URL: {url}
-Is Sponsored: {is_sponsored}
-
-Content:
-{content}
-
-Provide a comprehensive structured analysis.""")
-            ])
-            
-            chain = prompt | llm
-            
-            # Run in thread pool since langchain isn't fully async
-            loop = asyncio.get_event_loop()
-            analysis = await loop.run_in_executor(
-                None,
-                lambda: chain.invoke({
-                    "title": article.get("title", ""),
-                    "url": article.get("url", ""),
-                    "is_sponsored": article.get("is_sponsored", False),
-                    "content": article.get("text", "")[:15000]  # Limit content length
-                })
-            )
-            
-            # Set is_sponsored from article
-            analysis.is_sponsored = article.get("is_sponsored", False)
-            
-            return (article, analysis, None)
-            
-        except Exception as e:
-            logger.error(f"Error analyzing {article.get('url', 'unknown')}: {e}")
-            return (article, None, str(e))
+    try:
+        # The analyzer's adaptive limiter decides how many calls run at once
+        analysis = await analyzer.ainvoke(
+            title=article.get("title", ""),
+            content=article.get("text", ""),  # Fitted to ANALYSIS_TOKEN_BUDGET by the analyzer
+            url=article.get("url", ""),
+            is_sponsored=article.get("is_sponsored", False)
+        )
+        
+        return (article, analysis, None)
+        
+    except Exception as e:
+        logger.error(f"Error analyzing {article.get('url', 'unknown')}: {e}")
+        return (article, None, str(e))
 
 
 def save_analysis(article: dict, analysis: ArticleAnalysis) -> bool:
@@ -171,29 +128,31 @@ def save_analysis(article: dict, analysis: ArticleAnalysis) -> bool:
             "model_used": OPENAI_MODEL,
         }
         
-        supabase.table("article_analyses").upsert(
+        result = supabase.table("article_analyses").upsert(
             data,
             on_conflict="article_url"
         ).execute()
         
+        # Written outside the pipeline - the weekly job rebuilds this week's digests
+        mark_digests_stale(result.data or [data])
         return True
     except Exception as e:
         logger.error(f"Error saving analysis for {article.get('url')}: {e}")
         return False
 
 
-async def batch_analyze(articles: list[dict], max_concurrent: int = MAX_CONCURRENT):
+async def batch_analyze(articles: list[dict]):
     """
     Analyze multiple articles concurrently.
+    Concurrency starts at MAX_CONCURRENT and adapts to OpenAI rate limits.
     """
-    semaphore = asyncio.Semaphore(max_concurrent)
-    llm = get_llm()
+    analyzer = get_analyzer(OPENAI_MODEL)
     
-    logger.info(f"Starting batch analysis of {len(articles)} articles (max {max_concurrent} concurrent)")
+    logger.info(f"Starting batch analysis of {len(articles)} articles (starting at {int(analyzer.limiter.limit)} concurrent)")
     
     # Create tasks
     tasks = [
-        analyze_article_async(article, semaphore, llm)
+        analyze_article_async(article, analyzer)
         for article in articles
     ]
     
@@ -217,10 +176,35 @@ async def batch_analyze(articles: list[dict], max_concurrent: int = MAX_CONCURRE
             error_count += 1
             logger.error(f"[{i+1}/{total}] ❌ Failed: {article.get('title', 'Unknown')[:50]} - {error}")
     
+    logger.info(f"LLM concurrency: {analyzer.limiter.stats()}")
+    logger.info(f"Input tokens: {analyzer.input_tokens} ({analyzer.tokens_saved} saved by preprocessing)")
     return success_count, error_count
 
 
-async def main():
+async def batch_api_analyze(articles: list[dict], resume: Optional[str] = None, poll_interval: Optional[float] = None) -> tuple[int, int]:
+    """
+    Analyze through the OpenAI Batch API.
+    Unfinished runs from earlier (interrupted) invocations are completed first.
+    """
+    kwargs = {"poll_interval": poll_interval} if poll_interval else {}
+    
+    if resume:
+        return await BatchRun.load(resume).run(**kwargs)
+    
+    success, errors = await resume_unfinished(**kwargs)
+    
+    # Resumed runs may have covered some of the articles
+    if success or errors:
+        articles = get_unanalyzed_articles()
+    if articles:
+        run_success, run_errors = await BatchRun.create(articles, model=OPENAI_MODEL).run(**kwargs)
+        success += run_success
+        errors += run_errors
+    
+    return success, errors
+
+
+async def main(mode: str = "sync", resume: Optional[str] = None, poll_interval: Optional[float] = None):
     """Main entry point"""
     start_time = datetime.now()
     
@@ -238,17 +222,22 @@ async def main():
         return
     
     logger.info(f"Model: {OPENAI_MODEL}")
-    logger.info(f"Max concurrent: {MAX_CONCURRENT}")
+    logger.info(f"Mode: {mode}")
+    if mode == "sync":
+        logger.info(f"Starting concurrency: {MAX_CONCURRENT} (adaptive)")
     
     # Get unanalyzed articles
-    articles = get_unanalyzed_articles()
+    articles = get_unanalyzed_articles() if not resume else []
     
-    if not articles:
+    if not articles and mode == "sync":
         logger.info("✨ All articles have been analyzed!")
         return
     
     # Run batch analysis
-    success, errors = await batch_analyze(articles)
+    if mode == "batch":
+        success, errors = await batch_api_analyze(articles, resume=resume, poll_interval=poll_interval)
+    else:
+        success, errors = await batch_analyze(articles)
     
     # Summary
     elapsed = (datetime.now() - start_time).total_seconds()
@@ -262,5 +251,26 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Analyze every unanalyzed article in the database")
+    parser.add_argument(
+        "--mode", "-m",
+        choices=["sync", "batch"],
+        default="sync",
+        help="sync: concurrent chat calls; batch: OpenAI Batch API, half price, results within 24h (default: sync)"
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Batch mode: resume a specific run from api/.cache/batches instead of starting a new one"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        help="Batch mode: seconds between batch status checks (default: BATCH_POLL_INTERVAL)"
+    )
+    
+    args = parser.parse_args()
+    asyncio.run(main(mode=args.mode, resume=args.resume, poll_interval=args.poll_interval))
 
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Subscription Matcher Benchmark
+Matches a burst of analyzed articles against synthetic subscriptions, comparing
+the old per-(subscription x article) match_subscription loop with the compiled
+SubscriptionMatcher. Both must produce identical matches.
+"""
+
+import time
+import random
+import logging
+
+from api.services.matching import SubscriptionMatcher
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_SUBSCRIPTIONS = 100_000
+DEFAULT_ARTICLES = 20
+SEED = 42
+
+PRIORITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFO"]
+CATEGORIES = ["security", "vulnerability", "malware", "ai", "cloud", "privacy", "devops", "programming"]
+TECHNOLOGIES = [f"Tech{i}" for i in range(300)] + ["Python", "AWS", "Kubernetes", "Windows", "Linux", "Chrome"]
+ENTITIES = [f"Company{i}" for i in range(1000)] + ["Google", "Microsoft", "Apple", "Cisco", "Fortinet"]
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def synthetic_subscription(rng: random.Random, i: int) -> dict:
+    """Mostly tech-stack subscriptions, some entity watchlists, a few priority/threshold-only"""
+    filters = {"alertThreshold": rng.choice([0, 0, 30, 50, 70, 90])}
+    kind = rng.random()
+    if kind < 0.2:
+        filters["targetedEntities"] = rng.sample(ENTITIES, rng.randint(1, 5))
+    if kind < 0.85:
+        filters["techStack"] = rng.sample(TECHNOLOGIES + CATEGORIES, rng.randint(1, 6))
+    if rng.random() < 0.5:
+        filters["priority"] = rng.sample(PRIORITIES, rng.randint(1, 3))
+    return {"id": i, "name": f"sub-{i}", "channels": ["email"], "filters": filters}
+
+
+def synthetic_article(rng: random.Random, i: int) -> dict:
+    return {
+        "id": i,
+        "headline": f"Article {i}",
+        "priority": rng.choices(PRIORITIES, weights=[1, 3, 4, 2, 1])[0].lower(),
+        "relevance_score": rng.randint(1, 10),
+        "categories": rng.sample(CATEGORIES, rng.randint(1, 3)),
+        "mentioned_technologies": rng.sample(TECHNOLOGIES, rng.randint(0, 5)),
+        "affected_entities": [{"entity_type": "company", "name": n} for n in rng.sample(ENTITIES, rng.randint(0, 3))],
+    }
+
+
+# ============================================================================
+# CANDIDATES
+# ============================================================================
+
+def legacy_match_subscription(article: dict, filters: dict) -> bool:
+    """match_subscription as it was before filters were compiled - run per pair"""
+    try:
+        threshold = filters.get("alertThreshold", 0)
+        if (article.get("relevance_score", 0) * 10) < threshold:
+            return False
+
+        priorities = filters.get("priority", [])
+        article_priority = article.get("priority", "").upper()
+        if priorities:
+            normalized_priorities = [p.upper() for p in priorities]
+            if article_priority not in normalized_priorities:
+                return False
+
+        targeted = filters.get("targetedEntities", [])
+        if targeted:
+            article_entities = [e.get("name", "").lower() for e in article.get("affected_entities", [])]
+            if not any(t.lower() in article_entities for t in targeted):
+                return False
+
+        tech_stack = filters.get("techStack", [])
+        if tech_stack:
+            article_tech = [t.lower() for t in article.get("mentioned_technologies", [])]
+            article_cats = [c.lower() for c in article.get("categories", [])]
+            has_match = any(t.lower() in article_tech or t.lower() in article_cats for t in tech_stack)
+            if not has_match and article_priority != "CRITICAL":
+                return False
+
+        return True
+    except Exception:
+        return False
+
+
+def legacy_match_all(subscriptions: list[dict], articles: list[dict]) -> list[tuple[dict, list[dict]]]:
+    result = []
+    for sub in subscriptions:
+        matches = [a for a in articles if legacy_match_subscription(a, sub.get("filters", {}))]
+        if matches:
+            result.append((sub, matches))
+    return result
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark subscription matching")
+    parser.add_argument("--subscriptions", "-s", type=int, default=DEFAULT_SUBSCRIPTIONS, help=f"Synthetic subscriptions (default: {DEFAULT_SUBSCRIPTIONS})")
+    parser.add_argument("--articles", "-a", type=int, default=DEFAULT_ARTICLES, help=f"Articles in the burst (default: {DEFAULT_ARTICLES})")
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    subscriptions = [synthetic_subscription(rng, i) for i in range(args.subscriptions)]
+    articles = [synthetic_article(rng, i) for i in range(args.articles)]
+    # One critical story - every tech-stack subscription becomes a candidate for it
+    articles[0]["priority"] = "critical"
+
+    start = time.perf_counter()
+    legacy = legacy_match_all(subscriptions, articles)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = SubscriptionMatcher(subscriptions)
+    compile_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = matcher.match_all(articles)
+    match_seconds = time.perf_counter() - start
+
+    same = [(s["id"], [a["id"] for a in m]) for s, m in legacy] == [(s["id"], [a["id"] for a in m]) for s, m in compiled]
+    pairs = args.subscriptions * args.articles
+    deliveries = sum(len(m) for _, m in compiled)
+
+    print(f"\n📊 {args.subscriptions:,} subscriptions x {args.articles} articles = {pairs:,} pairs, {deliveries:,} matches")
+    print(f"   legacy loop      {legacy_seconds * 1000:9.1f} ms")
+    print(f"   compile + index  {compile_seconds * 1000:9.1f} ms (once per run)")
+    print(f"   indexed match    {match_seconds * 1000:9.1f} ms")
+    print(f"\n{'✅' if same else '❌'} Results {'identical' if same else 'DIFFER'}; "
+          f"matching is {legacy_seconds / max(match_seconds, 1e-9):.0f}x faster "
+          f"({legacy_seconds / max(compile_seconds + match_seconds, 1e-9):.1f}x including compile)")
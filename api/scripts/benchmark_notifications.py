@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Notification Fan-out Benchmark
+Delivers one alert to many synthetic subscribers through a throwaway outbox,
+comparing a sequential send loop with the NotificationDispatcher, which fans out
+in parallel, batches same-template emails into one Brevo request and merges a
+channel's Slack alerts into one digest post. Providers are simulated with a fixed per-request latency; the dispatcher's token buckets
+must still hold every Slack channel to its rate.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import tempfile
+import threading
+from collections import defaultdict
+
+from api.config import BREVO_RATE_LIMIT, BREVO_BATCH_SIZE, SLACK_CHANNEL_RATE
+from api.services.outbox import Outbox, delivery_key
+from api.services.notifier import NotificationDispatcher
+from api.services.slack import alert_summary
+
+# Configure logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_SUBSCRIBERS = 1000
+DEFAULT_SLACK_SHARE = 0.3  # Subscribers who also get Slack
+DEFAULT_WORKSPACES = 20
+DEFAULT_LATENCY_MS = 150  # Simulated provider round trip
+DEFAULT_ARTICLES = 3  # Slack sends one message per article
+DEFAULT_TEMPLATES = 5  # Distinct alert emails (subscribers matching the same articles share one)
+SEED = 42
+
+# ============================================================================
+# SIMULATED PROVIDERS
+# ============================================================================
+
+class SimulatedProviders:
+    """Blocking senders that sleep for `latency` and record when each channel got a message"""
+
+    def __init__(self, latency: float, workspaces: int):
+        self.latency = latency
+        self.workspaces = workspaces
+        self.sent = 0
+        self.email_calls = 0
+        self.slack_posts = 0
+        self.channel_sends = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def email(self, payload: dict):
+        time.sleep(self.latency)
+        with self._lock:
+            self.sent += 1
+            self.email_calls += 1
+
+    def email_batch(self, subject: str, html: str, recipients: list, rate=None, batch_size: int = BREVO_BATCH_SIZE):
+        """send_email_batch's contract: one call per `batch_size` recipients"""
+        calls = 0
+        for _ in range(0, len(recipients), batch_size):
+            if rate is not None:
+                time.sleep(rate.reserve())
+            time.sleep(self.latency)
+            calls += 1
+        with self._lock:
+            self.sent += len(recipients)
+            self.email_calls += calls
+        return [None] * len(recipients), calls
+
+    def slack_connection(self, user_id: str) -> dict:
+        n = int(user_id.split("-")[1])
+        return {"access_token": f"xoxb-{n}", "channel_id": f"C{n}", "team_id": f"T{n % self.workspaces}"}
+
+    def slack(self, payload: dict, connection: dict = None):
+        connection = connection or self.slack_connection(payload["user_id"])
+        started = time.monotonic()
+        time.sleep(self.latency)
+        with self._lock:
+            self.sent += 1
+            self.slack_posts += 1
+            self.channel_sends[connection["channel_id"]].append(started)
+
+    def fastest_channel_rate(self) -> float:
+        """Highest messages/second any channel saw between consecutive messages"""
+        gaps = [b - a for sends in self.channel_sends.values() for a, b in zip(sends, sends[1:])]
+        return 1 / min(gaps) if gaps else 0.0
+
+
+def fill_outbox(outbox: Outbox, subscribers: int, slack_share: float, articles: int, templates: int) -> int:
+    """Subscribers split across `templates` distinct alert emails (different match sets)"""
+    rng = random.Random(SEED)
+    queued = 0
+    for i in range(subscribers):
+        template = rng.randrange(templates)
+        queued += outbox.enqueue(delivery_key("email", i), "email", {
+            "to": f"user{i}@example.com",
+            "subject": f"Alert {template}",
+            "html": f"<p>alert {template}</p><p>{{{{ params.subtitle }}}}</p>",
+            "params": {"subtitle": f"Matching subscription {i}"},
+        })
+        if rng.random() < slack_share:
+            for a in range(articles):
+                article = alert_summary({"id": a, "headline": f"Story {a}", "relevance_score": 7})
+                queued += outbox.enqueue(delivery_key("slack", i, a), "slack", {"user_id": f"user-{i}", "blocks": [], "text": "Alert", "article": article})
+    return queued
+
+
+# ============================================================================
+# CANDIDATES
+# ============================================================================
+
+def run_sequential(outbox: Outbox, providers: SimulatedProviders) -> float:
+    """The old loop: one blocking send after another"""
+    start = time.perf_counter()
+    while batch := outbox.claim(100):
+        for delivery in batch:
+            if delivery["channel"] == "email":
+                providers.email(delivery["payload"])
+            else:
+                providers.slack(delivery["payload"])
+            outbox.complete(delivery)
+    return time.perf_counter() - start
+
+
+def run_dispatcher(outbox: Outbox, providers: SimulatedProviders) -> float:
+    dispatcher = NotificationDispatcher(
+        send_email_batch=providers.email_batch,
+        send_slack=providers.slack,
+        slack_connection=providers.slack_connection,
+        slack_connections=lambda user_ids: {u: providers.slack_connection(u) for u in user_ids},
+    )
+    start = time.perf_counter()
+    asyncio.run(dispatcher.drain(outbox))
+    return time.perf_counter() - start
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark notification fan-out")
+    parser.add_argument("--subscribers", "-s", type=int, default=DEFAULT_SUBSCRIBERS, help=f"Subscribers to alert (default: {DEFAULT_SUBSCRIBERS})")
+    parser.add_argument("--slack-share", type=float, default=DEFAULT_SLACK_SHARE, help=f"Share of subscribers with Slack (default: {DEFAULT_SLACK_SHARE})")
+    parser.add_argument("--workspaces", type=int, default=DEFAULT_WORKSPACES, help=f"Slack workspaces (default: {DEFAULT_WORKSPACES})")
+    parser.add_argument("--articles", "-a", type=int, default=DEFAULT_ARTICLES, help=f"Articles in the alert (default: {DEFAULT_ARTICLES})")
+    parser.add_argument("--templates", "-t", type=int, default=DEFAULT_TEMPLATES, help=f"Distinct alert emails (default: {DEFAULT_TEMPLATES})")
+    parser.add_argument("--latency", type=int, default=DEFAULT_LATENCY_MS, help=f"Simulated provider latency in ms (default: {DEFAULT_LATENCY_MS})")
+    parser.add_argument("--skip-sequential", action="store_true", help="Only run the dispatcher")
+    args = parser.parse_args()
+
+    results = {}
+    for name, run in [("sequential", run_sequential), ("dispatcher", run_dispatcher)]:
+        if name == "sequential" and args.skip_sequential:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            outbox = Outbox(os.path.join(tmp, "outbox.sqlite3"))
+            deliveries = fill_outbox(outbox, args.subscribers, args.slack_share, args.articles, args.templates)
+            providers = SimulatedProviders(args.latency / 1000, args.workspaces)
+            seconds = run(outbox, providers)
+            results[name] = (seconds, providers, outbox.stats())
+
+    print(f"\n📊 {deliveries:,} deliveries, {args.latency} ms per request, "
+          f"Brevo {BREVO_RATE_LIMIT:g}/s, Slack {SLACK_CHANNEL_RATE:g}/s per channel")
+    for name, (seconds, providers, stats) in results.items():
+        print(f"   {name:<11} {seconds:8.1f} s  {stats['delivered_since_start'] / seconds:7.1f} deliveries/s  "
+              f"p95 latency {stats['latency_p95_seconds']:.1f} s  "
+              f"fastest channel {providers.fastest_channel_rate():.2f} msg/s  "
+              f"{providers.email_calls:,} Brevo calls  {providers.slack_posts:,} Slack posts")
+
+    if "sequential" in results:
+        print(f"\n✅ Dispatcher is {results['sequential'][0] / results['dispatcher'][0]:.1f}x faster")
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Parser Benchmark & Golden Check
+Checks every HTML parser backend against the expected output of the saved
+pages in fixtures/parser/ (article pages from the original clone-and-reparse
+extraction, plus listing pages), then reports per-page parse time.
+A corpus of live pages can be snapshotted and checked the same way.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import statistics
+from typing import Optional
+
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
+from api.config import CACHE_DIR, HACKERNEWS_URL
+from api.services.fetcher import Fetcher
+from api.services.parser import PARSERS, get_parser
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "parser")
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "parser_corpus")
+GOLDEN_FILE = "expected.json"  # Expected outputs, next to the pages they describe
+LISTING_PREFIX = "listing-"  # Homepage/archive pages, checked with parse_listing
+DEFAULT_ROUNDS = 5
+
+# ============================================================================
+# REFERENCE IMPLEMENTATION
+# ============================================================================
+
+def legacy_parse_article(html: str, article_url: str) -> dict:
+    """
+    The original extract_article_data parsing (html.parser + body clone/reparse).
+    Kept verbatim as the golden reference.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    article_data = {}
+
+    title_link = soup.select_one('.story-title a')
+    if title_link:
+        article_data["title"] = title_link.get_text(strip=True)
+        article_data["url"] = title_link.get("href", article_url)
+    else:
+        h1 = soup.select_one("h1.story-title")
+        article_data["title"] = h1.get_text(strip=True) if h1 else "N/A"
+        article_data["url"] = article_url
+
+    thumbnail_meta = soup.select_one('div[itemprop="image"] meta[itemprop="url"]')
+    if thumbnail_meta:
+        article_data["thumbnail"] = thumbnail_meta.get("content", "")
+    else:
+        article_body_img = soup.select_one("#articlebody img")
+        article_data["thumbnail"] = article_body_img["src"] if article_body_img and article_body_img.has_attr("src") else ""
+
+    postmeta_element = soup.select_one('.postmeta')
+    post_head_tags = []
+    if postmeta_element:
+        date_element = postmeta_element.select_one('.p-author .author')
+        article_data["timestamp"] = date_element.get_text(strip=True) if date_element else None
+
+        author_meta = soup.select_one('div[itemprop="author"] meta[itemprop="name"]')
+        if author_meta and author_meta.has_attr("content"):
+            article_data["author"] = author_meta["content"]
+        else:
+            authors = postmeta_element.select('.author')
+            article_data["author"] = authors[1].get_text(strip=True) if len(authors) > 1 else None
+
+        tags_meta = postmeta_element.select_one('.p-tags')
+        if tags_meta:
+            post_head_tags = [t.strip() for t in tags_meta.text.strip().split(' / ') if t.strip()]
+
+    article_body = soup.find(id="articlebody")
+    if article_body:
+        body_clone = BeautifulSoup(str(article_body), "html.parser")
+        for selector in ['.separator', '.dog_two', '.cf.note-b']:
+            for el in body_clone.select(selector):
+                el.decompose()
+        full_text = body_clone.get_text("\n", strip=True)
+        full_text = re.sub(r"\n\s*\n", "\n\n", full_text).strip()
+        article_data["text"] = full_text
+    else:
+        article_data["text"] = ""
+
+    detailed_tags_element = soup.select_one('.tags .categ')
+    if detailed_tags_element:
+        section_spans = detailed_tags_element.select('a span[itemprop="articleSection"]')
+        article_data["tags"] = " / ".join([span.get_text(strip=True) for span in section_spans])
+    else:
+        article_data["tags"] = " / ".join(post_head_tags)
+
+    article_data["is_sponsored"] = "sponsored" in article_data.get("tags", "").lower()
+
+    return article_data
+
+
+# ============================================================================
+# CORPUS
+# ============================================================================
+
+async def snapshot_corpus(corpus_dir: str, limit: int) -> int:
+    """Save the homepage's latest article pages into the corpus directory."""
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    async with Fetcher() as fetcher:
+        homepage = await fetcher.get_text(HACKERNEWS_URL)
+        urls, _ = get_parser("bs4").parse_listing(homepage)
+        urls = urls[:limit]
+        pages = await asyncio.gather(*(fetcher.get_text(url) for url in urls), return_exceptions=True)
+
+    saved = 0
+    for url, html in zip(urls, pages):
+        if isinstance(html, Exception):
+            logger.error(f"Failed to fetch {url}: {html}")
+            continue
+        slug = re.sub(r"[^a-z0-9]+", "-", url.lower()).strip("-")[-80:]
+        with open(os.path.join(corpus_dir, f"{slug}.html"), "w", encoding="utf-8") as f:
+            f.write(f"<!-- url: {url} -->\n{html}")
+        saved += 1
+
+    logger.info(f"Saved {saved} pages to {corpus_dir}")
+    return saved
+
+
+def load_corpus(corpus_dir: str) -> list[tuple[str, str, str]]:
+    """Load (name, url, html) for every saved page."""
+    pages = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(corpus_dir, name), encoding="utf-8") as f:
+            html = f.read()
+        match = re.match(r"<!-- url: (\S+) -->", html)
+        pages.append((name, match.group(1) if match else name, html))
+    return pages
+
+
+# ============================================================================
+# CHECKS
+# ============================================================================
+
+def is_listing(name: str) -> bool:
+    return name.startswith(LISTING_PREFIX)
+
+
+def check_golden(pages: list[tuple[str, str, str]], golden_path: Optional[str]) -> int:
+    """
+    Compare every backend against the expected output in `golden_path`.
+    Article pages missing from it are taken from the reference parser and
+    added to the file; listing pages must be listed.
+    Returns the number of mismatching (page, backend) pairs.
+    """
+    golden = {}
+    if golden_path and os.path.exists(golden_path):
+        with open(golden_path, encoding="utf-8") as f:
+            golden = json.load(f)
+
+    mismatches = 0
+    added = False
+    for name, url, html in pages:
+        expected = golden.get(name)
+        if expected is None:
+            if is_listing(name):
+                mismatches += 1
+                logger.error(f"❌ No expected output for listing page {name}")
+                continue
+            expected = golden[name] = legacy_parse_article(html, url)
+            added = True
+
+        for backend in PARSERS:
+            parser = get_parser(backend)
+            if is_listing(name):
+                urls, next_page_url = parser.parse_listing(html)
+                actual = {"urls": urls, "next_page_url": next_page_url}
+            else:
+                actual = parser.parse_article(html, url)
+            diff = sorted(key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key))
+            if diff:
+                mismatches += 1
+                logger.error(f"❌ {backend} differs on {name}: {', '.join(diff)}")
+
+    if golden_path and added:
+        with open(golden_path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(golden.items())), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    return mismatches
+
+
+def benchmark(pages: list[tuple[str, str, str]], rounds: int) -> dict[str, float]:
+    """Median milliseconds per article page for the reference and each backend."""
+    candidates = {"legacy": legacy_parse_article}
+    for backend in PARSERS:
+        candidates[backend] = get_parser(backend).parse_article
+
+    results = {}
+    for label, parse in candidates.items():
+        timings = []
+        for _ in range(rounds):
+            for _, url, html in pages:
+                start = time.perf_counter()
+                parse(html, url)
+                timings.append((time.perf_counter() - start) * 1000)
+        results[label] = statistics.median(timings)
+    return results
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check and benchmark HTML parser backends")
+    parser.add_argument(
+        "--corpus", "-c",
+        type=str,
+        help=f"Directory of saved pages (default: {FIXTURES_DIR}, or {SNAPSHOT_DIR} with --snapshot)"
+    )
+    parser.add_argument(
+        "--snapshot", "-s",
+        type=int,
+        metavar="N",
+        help="Fetch the N latest articles into the corpus before running"
+    )
+    parser.add_argument(
+        "--golden", "-g",
+        type=str,
+        help=f"JSON file of expected outputs (default: {GOLDEN_FILE} in the corpus; missing articles are added from the reference parser)"
+    )
+    parser.add_argument(
+        "--rounds", "-r",
+        type=int,
+        default=DEFAULT_ROUNDS,
+        help=f"Benchmark rounds over the corpus (default: {DEFAULT_ROUNDS})"
+    )
+
+    args = parser.parse_args()
+
+    if args.snapshot:
+        args.corpus = args.corpus or SNAPSHOT_DIR
+        asyncio.run(snapshot_corpus(args.corpus, args.snapshot))
+    args.corpus = args.corpus or FIXTURES_DIR
+
+    if not os.path.isdir(args.corpus):
+        print(f"❌ Corpus directory not found: {args.corpus} (use --snapshot N to create it)")
+        exit(1)
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"❌ No .html pages in {args.corpus}")
+        exit(1)
+
+    mismatches = check_golden(pages, args.golden or os.path.join(args.corpus, GOLDEN_FILE))
+    articles = [page for page in pages if not is_listing(page[0])]
+    timings = benchmark(articles, args.rounds) if articles else {}
+
+    print(f"\n📊 {len(pages)} pages ({len(articles)} articles), {args.rounds} rounds")
+    for label, ms in timings.items():
+        speedup = timings["legacy"] / ms if ms else 0
+        print(f"   {label:<8} {ms:8.2f} ms/page  ({speedup:.1f}x)")
+
+    if mismatches:
+        print(f"\n❌ {mismatches} backend/page combinations differ from the golden output")
+        exit(1)
+    print("\n✅ All backends match the golden output")
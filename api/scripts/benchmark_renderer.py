@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Email Rendering Benchmark
+Composes alert emails for many recipients whose subscriptions match overlapping
+articles, rendering every email per recipient (as before) versus assembling
+them from cached cards and reusing whole bodies from the ArticleRenderer cache.
+All must produce identical emails.
+"""
+
+import time
+import random
+import logging
+
+from api.services.renderer import ArticleRenderer, format_article_html, format_email_wrapper
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_RECIPIENTS = 10_000
+DEFAULT_ARTICLES = 20
+DEFAULT_PROFILES = 200  # Distinct match sets - subscriptions with similar filters match the same articles
+MAX_MATCHES = 5  # Articles per recipient's email
+SEED = 42
+
+PRIORITIES = ["critical", "high", "medium", "low", "info"]
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def synthetic_article(rng: random.Random, i: int) -> dict:
+    return {
+        "id": f"analysis-{i}",
+        "analyzed_at": "2025-11-29T12:30:00Z",
+        "headline": f"Critical flaw {i} exploited in the wild " * 2,
+        "short_summary": "Attackers are chaining two bugs to gain remote code execution. " * 4,
+        "priority": rng.choice(PRIORITIES),
+        "relevance_score": rng.randint(1, 10),
+        "key_takeaways": [{"point": f"Takeaway {j}: patch affected versions immediately."} for j in range(4)],
+        "mentioned_technologies": [f"Tech{rng.randrange(100)}" for _ in range(5)],
+        "article_url": f"https://example.com/articles/{i}",
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def compose_per_recipient(renderer: ArticleRenderer, inboxes: list[list[dict]]) -> list[str]:
+    """The old path: every card and wrapper rendered for every recipient"""
+    return [
+        format_email_wrapper(f"🚨 {len(matches)} New Security Alerts", "".join(format_article_html(a) for a in matches), "{{ params.subtitle }}")
+        for matches in inboxes
+    ]
+
+
+def compose_from_cards(renderer: ArticleRenderer, inboxes: list[list[dict]]) -> list[str]:
+    """Cached cards, wrapper per recipient - what the weekly digest does"""
+    return [
+        format_email_wrapper(f"🚨 {len(matches)} New Security Alerts", renderer.cards(matches), "{{ params.subtitle }}")
+        for matches in inboxes
+    ]
+
+
+def compose_cached(renderer: ArticleRenderer, inboxes: list[list[dict]]) -> list[str]:
+    return [renderer.email(f"🚨 {len(matches)} New Security Alerts", matches, "{{ params.subtitle }}") for matches in inboxes]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark alert email rendering")
+    parser.add_argument("--recipients", "-r", type=int, default=DEFAULT_RECIPIENTS, help=f"Recipients to compose emails for (default: {DEFAULT_RECIPIENTS})")
+    parser.add_argument("--articles", "-a", type=int, default=DEFAULT_ARTICLES, help=f"Distinct articles in the run (default: {DEFAULT_ARTICLES})")
+    parser.add_argument("--profiles", "-p", type=int, default=DEFAULT_PROFILES, help=f"Distinct match sets across recipients (default: {DEFAULT_PROFILES})")
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    articles = [synthetic_article(rng, i) for i in range(args.articles)]
+    profiles = [rng.sample(articles, rng.randint(1, min(MAX_MATCHES, len(articles)))) for _ in range(args.profiles)]
+    inboxes = [rng.choice(profiles) for _ in range(args.recipients)]
+    cards = sum(len(m) for m in inboxes)
+
+    results = {}
+    for name, renderer, compose in [
+        ("render every email", ArticleRenderer(maxsize=0), compose_per_recipient),
+        ("cached cards", ArticleRenderer(), compose_from_cards),
+        ("cached emails", ArticleRenderer(), compose_cached),
+    ]:
+        start = time.perf_counter()
+        emails = compose(renderer, inboxes)
+        results[name] = (time.perf_counter() - start, emails, renderer.stats())
+
+    baseline_seconds, baseline, _ = results["render every email"]
+    same = all(emails == baseline for _, emails, _ in results.values())
+    print(f"\n📊 {args.recipients:,} emails, {cards:,} cards from {args.articles} articles in {args.profiles} match sets")
+    for name, (seconds, _, stats) in results.items():
+        print(f"   {name:<18} {seconds * 1000:9.1f} ms  {baseline_seconds / max(seconds, 1e-9):5.1f}x  "
+              f"({stats['cards']:,} cards, card hit rate {stats['card_hit_rate']:.1%}; "
+              f"{stats['emails']:,} bodies, hit rate {stats['hit_rate']:.1%})")
+    print(f"\n{'✅' if same else '❌'} Emails {'identical' if same else 'DIFFER'}")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Slack Client Benchmark
+Posts messages to a local HTTPS stand-in for the Slack API and compares the
+old per-message WebClient (new client, new SSL context, new connection) with
+the pooled clients from services/slack.py. The sync pool shares one SSL
+context; the async pool also keeps its connections open between messages.
+The last two candidates time the dispatcher's delivery step: deliver_slack
+in a worker thread (as before) and adeliver_slack on the event loop.
+Needs the openssl binary to make a throwaway certificate.
+"""
+
+import os
+import ssl
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from slack_sdk import WebClient
+
+from api.services import slack
+from api.services.notifier import adeliver_slack, deliver_slack
+from api.services.slack import SlackClientPool
+
+# Configure logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_MESSAGES = 200
+DEFAULT_WORKSPACES = 5  # Tokens the messages rotate through
+BLOCKS = [{"type": "section", "text": {"type": "mrkdwn", "text": "*New security alert*"}}]
+
+# ============================================================================
+# LOCAL SLACK API
+# ============================================================================
+
+class SlackHandler(BaseHTTPRequestHandler):
+    """Answers every API method with ok=true, over HTTP/1.1 keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes; don't stall kept-alive sockets
+    connections = set()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        SlackHandler.connections.add(self.client_address)
+        body = json.dumps({"ok": True, "channel": "C1", "ts": "1.0"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(tmp: str) -> tuple[ThreadingHTTPServer, str, str]:
+    """HTTPS server on a free port with a self-signed certificate. Returns (server, base_url, cert path)"""
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlackHandler)
+    server.daemon_threads = True
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"https://localhost:{server.server_port}/api/", cert
+
+
+# ============================================================================
+# CANDIDATES
+# ============================================================================
+
+def run_fresh(base_url: str, cert: str, messages: int, workspaces: int) -> list[float]:
+    """The old post_slack_message: a new client (and default SSL context) per message"""
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        context = ssl.create_default_context()
+        context.load_verify_locations(cert)
+        client = WebClient(token=f"xoxb-{i % workspaces}", base_url=base_url, ssl=context)
+        client.chat_postMessage(channel="C1", blocks=BLOCKS, text="Alert")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_pooled(base_url: str, cert: str, messages: int, workspaces: int) -> list[float]:
+    pool = SlackClientPool(base_url=base_url)
+    pool.ssl_context.load_verify_locations(cert)
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        pool.get(f"xoxb-{i % workspaces}").chat_postMessage(channel="C1", blocks=BLOCKS, text="Alert")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_pooled_async(base_url: str, cert: str, messages: int, workspaces: int) -> list[float]:
+    pool = SlackClientPool(base_url=base_url)
+    pool.ssl_context.load_verify_locations(cert)
+
+    async def post_all() -> list[float]:
+        latencies = []
+        try:
+            for i in range(messages):
+                start = time.perf_counter()
+                await pool.get_async(f"xoxb-{i % workspaces}").chat_postMessage(channel="C1", blocks=BLOCKS, text="Alert")
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await pool.aclose()
+        return latencies
+
+    return asyncio.run(post_all())
+
+
+def run_notifier(base_url: str, cert: str, messages: int, workspaces: int, in_thread: bool) -> list[float]:
+    """Deliveries as NotificationDispatcher.post makes them, through the shared pool"""
+    slack._client_pool = SlackClientPool(base_url=base_url)
+    slack._client_pool.ssl_context.load_verify_locations(cert)
+
+    async def deliver_all() -> list[float]:
+        latencies = []
+        try:
+            for i in range(messages):
+                payload = {"user_id": f"user-{i}", "blocks": BLOCKS, "text": "Alert"}
+                connection = {"access_token": f"xoxb-{i % workspaces}", "channel_id": "C1"}
+                start = time.perf_counter()
+                if in_thread:
+                    await asyncio.to_thread(deliver_slack, payload, connection)
+                else:
+                    await adeliver_slack(payload, connection)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await slack.close_slack_clients()
+        return latencies
+
+    return asyncio.run(deliver_all())
+
+
+def run_notifier_thread(base_url: str, cert: str, messages: int, workspaces: int) -> list[float]:
+    return run_notifier(base_url, cert, messages, workspaces, in_thread=True)
+
+
+def run_notifier_async(base_url: str, cert: str, messages: int, workspaces: int) -> list[float]:
+    return run_notifier(base_url, cert, messages, workspaces, in_thread=False)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark pooled Slack clients")
+    parser.add_argument("--messages", "-m", type=int, default=DEFAULT_MESSAGES, help=f"Messages per candidate (default: {DEFAULT_MESSAGES})")
+    parser.add_argument("--workspaces", "-w", type=int, default=DEFAULT_WORKSPACES, help=f"Distinct bot tokens (default: {DEFAULT_WORKSPACES})")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        server, base_url, cert = start_server(tmp)
+        for name, run in [
+            ("per-message", run_fresh),
+            ("pooled", run_pooled),
+            ("pooled async", run_pooled_async),
+            ("deliver thread", run_notifier_thread),
+            ("deliver async", run_notifier_async),
+        ]:
+            SlackHandler.connections = set()
+            latencies = sorted(run(base_url, cert, args.messages, args.workspaces))
+            results[name] = (latencies, len(SlackHandler.connections))
+        server.shutdown()
+
+    print(f"\n📊 {args.messages:,} messages across {args.workspaces} tokens, local HTTPS")
+    for name, (latencies, connections) in results.items():
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"   {name:<14} avg {statistics.fmean(latencies) * 1000:6.2f} ms  "
+              f"p95 {p95 * 1000:6.2f} ms  {connections:,} connections")
+
+    baseline = statistics.fmean(results["per-message"][0])
+    for name in ("pooled", "pooled async", "deliver thread", "deliver async"):
+        saved = baseline - statistics.fmean(results[name][0])
+        print(f"✅ {name}: {saved * 1000:.2f} ms saved per message ({baseline / (baseline - saved):.1f}x)")
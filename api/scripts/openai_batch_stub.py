@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+OpenAI Batch API Stub
+Minimal local stand-in for the Files and Batches endpoints so the batch
+analysis flow can be run end to end offline:
+
+    python -m api.scripts.openai_batch_stub --port 8787
+    OPENAI_BASE_URL=http://localhost:8787/v1 python -m api.scripts.batch_analyze --mode batch
+
+Batches move validating -> in_progress -> completed one step per status poll
+and answer every request with a canned ArticleAnalysis. Requests whose
+response_format is not a strict JSON schema (the rules OpenAI enforces for
+structured outputs) fail the way the real API fails them.
+"""
+
+import json
+import time
+import uuid
+import logging
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_PORT = 8787
+STATUS_STEPS = ["validating", "in_progress", "finalizing", "completed"]
+
+CANNED_ANALYSIS = {
+    "tldr": "Stub analysis produced by the local Batch API server.",
+    "priority": "medium",
+    "categories": ["security"],
+    "content_type": "news",
+    "key_takeaways": [
+        {"point": "Generated offline", "is_technical": False, "highlight": False},
+        {"point": "No OpenAI call was made", "is_technical": False, "highlight": False},
+    ],
+    "affected_entities": [],
+    "action_items": [],
+    "short_summary": "Stub summary.",
+    "long_summary": "Stub summary produced by the local Batch API server for offline testing.",
+    "relevance_score": 5,
+    "confidence_score": 5,
+    "is_breaking_news": False,
+    "is_sponsored": False,
+    "worth_full_read": False,
+    "read_time_minutes": 3,
+    "related_topics": [],
+    "mentioned_technologies": [],
+    "mentioned_companies": [],
+    "regions": [],
+}
+
+# ============================================================================
+# STATE
+# ============================================================================
+
+app = FastAPI(title="OpenAI Batch API stub")
+files: dict[str, dict] = {}
+batches: dict[str, dict] = {}
+fail_every = 0  # Make every Nth request fail (0 = never)
+
+
+def _file_object(file_id: str) -> dict:
+    f = files[file_id]
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(f["content"]),
+        "created_at": f["created_at"],
+        "filename": f["filename"],
+        "purpose": f["purpose"],
+        "status": "processed",
+    }
+
+
+def _store_file(content: bytes, filename: str, purpose: str) -> str:
+    file_id = f"file-{uuid.uuid4().hex[:24]}"
+    files[file_id] = {"content": content, "filename": filename, "purpose": purpose, "created_at": int(time.time())}
+    return file_id
+
+
+def _title_from(body: dict) -> str:
+    for message in body.get("messages", []):
+        if message.get("role") == "user":
+            for line in message.get("content", "").splitlines():
+                if line.startswith("Title: "):
+                    return line[len("Title: "):]
+    return "Untitled"
+
+
+def _strict_schema_error(node, path: str = "schema") -> Optional[str]:
+    """Why a JSON schema would be rejected in strict mode, or None"""
+    if not isinstance(node, dict):
+        return None
+    if "$ref" in node and len(node) > 1:
+        return f"{path}: $ref cannot have sibling keywords"
+    if node.get("type") == "object" and node.get("additionalProperties") is not False:
+        return f"{path}: additionalProperties must be false"
+    properties = node.get("properties")
+    if isinstance(properties, dict) and set(node.get("required", [])) != set(properties):
+        return f"{path}: every property must be required"
+    children = [(f"{path}.properties.{k}", v) for k, v in (properties or {}).items()]
+    children += [(f"{path}.$defs.{k}", v) for k, v in (node.get("$defs") or {}).items()]
+    children += [(f"{path}.anyOf[{i}]", v) for i, v in enumerate(node.get("anyOf") or [])]
+    if isinstance(node.get("items"), dict):
+        children.append((f"{path}.items", node["items"]))
+    for child_path, child in children:
+        error = _strict_schema_error(child, child_path)
+        if error:
+            return error
+    return None
+
+
+def _response_format_error(body: dict) -> Optional[str]:
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") != "json_schema":
+        return "response_format must be a json_schema"
+    json_schema = response_format.get("json_schema") or {}
+    if json_schema.get("strict") is not True or not json_schema.get("name"):
+        return "json_schema needs a name and strict: true"
+    schema = json_schema.get("schema") or {}
+    missing = set(schema.get("properties", {})) - set(CANNED_ANALYSIS) - {"headline"}
+    if missing:
+        return f"schema has fields the stub cannot answer: {sorted(missing)}"
+    return _strict_schema_error(schema)
+
+
+def _complete(batch: dict):
+    """Answer every request in the input file and attach output/error files"""
+    outputs, errors = [], []
+    lines = files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+
+    for i, raw in enumerate(line for line in lines if line.strip()):
+        request = json.loads(raw)
+        invalid = _response_format_error(request["body"])
+        if invalid:
+            errors.append({
+                "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+                "custom_id": request["custom_id"],
+                "response": None,
+                "error": {"code": "invalid_response_format", "message": invalid},
+            })
+            continue
+        if fail_every and (i + 1) % fail_every == 0:
+            errors.append({
+                "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+                "custom_id": request["custom_id"],
+                "response": None,
+                "error": {"code": "stub_failure", "message": "Failed on purpose by the stub server"},
+            })
+            continue
+
+        analysis = {"headline": _title_from(request["body"])[:100], **CANNED_ANALYSIS}
+        outputs.append({
+            "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "request_id": uuid.uuid4().hex,
+                "body": {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request["body"].get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": json.dumps(analysis), "refusal": None},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                },
+            },
+            "error": None,
+        })
+
+    if outputs:
+        batch["output_file_id"] = _store_file("\n".join(json.dumps(o) for o in outputs).encode("utf-8"), "output.jsonl", "batch_output")
+    if errors:
+        batch["error_file_id"] = _store_file("\n".join(json.dumps(e) for e in errors).encode("utf-8"), "errors.jsonl", "batch_output")
+    batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+    batch["completed_at"] = int(time.time())
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+@app.post("/v1/files")
+async def create_file(request: Request):
+    form = await request.form()
+    upload = form["file"]
+    file_id = _store_file(await upload.read(), upload.filename, form.get("purpose", "batch"))
+    logger.info(f"Stored {upload.filename} as {file_id}")
+    return _file_object(file_id)
+
+
+@app.get("/v1/files/{file_id}/content")
+async def get_file_content(file_id: str):
+    if file_id not in files:
+        raise HTTPException(status_code=404, detail="No such file")
+    return PlainTextResponse(files[file_id]["content"].decode("utf-8"))
+
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    params = await request.json()
+    if params.get("input_file_id") not in files:
+        raise HTTPException(status_code=400, detail="Unknown input_file_id")
+    batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+    batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": params["endpoint"],
+        "input_file_id": params["input_file_id"],
+        "completion_window": params.get("completion_window", "24h"),
+        "status": STATUS_STEPS[0],
+        "output_file_id": None,
+        "error_file_id": None,
+        "created_at": int(time.time()),
+        "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        "metadata": params.get("metadata"),
+    }
+    logger.info(f"Created {batch_id}")
+    return batches[batch_id]
+
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="No such batch")
+
+    step = STATUS_STEPS.index(batch["status"])
+    if step < len(STATUS_STEPS) - 1:
+        batch["status"] = STATUS_STEPS[step + 1]
+        if batch["status"] == "completed":
+            _complete(batch)
+    return batch
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OpenAI Batch API stub")
+    parser.add_argument("--port", "-p", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every Nth request (default: never)")
+    args = parser.parse_args()
+
+    fail_every = args.fail_every
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
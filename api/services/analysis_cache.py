@@ -0,0 +1,170 @@
+"""
+Analysis Cache Service
+On-disk cache of LLM analyses keyed by normalized content + model + prompt version
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from ..config import ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_ENTRIES
+from ..models.article import ArticleAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Written next to the entries so a prompt change can be detected on startup
+VERSION_FILE = "PROMPT_VERSION"
+
+# Writes between scans of the cache directory for entries over the limit
+PRUNE_EVERY = 50
+
+
+def normalize_content(text: str) -> str:
+    """Collapse whitespace and case so cosmetic re-renders of the same text hash equal"""
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+def prompt_version(*prompts: str) -> str:
+    """Short hash identifying a set of prompt templates"""
+    return hashlib.sha256("\0".join(prompts).encode("utf-8")).hexdigest()[:12]
+
+
+class AnalysisCache:
+    """
+    One JSON file per (content, model, prompt version) holding the ArticleAnalysis.
+    The article URL and title are deliberately not part of the key, so syndicated
+    copies and URL variants of the same text share one analysis even when they
+    run under a different headline. Blocking file I/O - async callers run it in
+    a thread.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        directory: str = ANALYSIS_CACHE_DIR,
+        max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+    ):
+        self.version = version
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._check_version()
+
+    def _check_version(self):
+        """Drop every entry if the prompts changed since they were written"""
+        path = os.path.join(self.directory, VERSION_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = f.read().strip()
+        except FileNotFoundError:
+            stored = None
+
+        if stored != self.version:
+            if stored:
+                removed = self.clear()
+                logger.info(f"Prompt changed ({stored} -> {self.version}), dropped {removed} cached analyses")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.version)
+
+    def key(self, title: str, content: str, is_sponsored: bool, model: str) -> str:
+        """
+        Cache key for one analysis request. The title only counts for pages
+        without body text, which would otherwise all share one analysis.
+        """
+        body = normalize_content(content)
+        parts = [body or normalize_content(title), str(bool(is_sponsored)), model, self.version]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[tuple[ArticleAnalysis, Optional[str]]]:
+        """Get a cached (analysis, model that produced it), counting the hit or miss"""
+        cached = None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+            cached = ArticleAnalysis.model_validate(entry["analysis"]), entry.get("model")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable cached analysis {key[:12]}: {e}")
+
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cached
+
+    def put(self, key: str, analysis: ArticleAnalysis, url: str = "", model: Optional[str] = None):
+        """Store an analysis and the model that produced it"""
+        entry = {
+            "url": url,
+            "model": model,
+            "version": self.version,
+            "analysis": analysis.model_dump(mode="json"),
+            "cached_at": datetime.now().isoformat(),
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % PRUNE_EVERY == 0
+            if prune:
+                self._prune()
+        except OSError as e:
+            logger.warning(f"Failed to cache analysis for {url}: {e}")
+
+    def invalidate(self, key: str):
+        """Forget one cached analysis"""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> int:
+        """Drop every cached analysis, returning how many were removed"""
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def _prune(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Hit/miss counters since process start"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "prompt_version": self.version,
+        }
@@ -4,15 +4,30 @@ Uses LangChain + OpenAI for structured analysis
 """
 
 import os
+import time
+import asyncio
 import logging
-from typing import Optional
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Optional
 
+import httpx
+import openai
+from pydantic import ValidationError
+from langchain_core.exceptions import OutputParserException
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 
-from ..config import OPENAI_API_KEY, OPENAI_MODEL
-from ..database import get_supabase
-from ..models.article import ArticleAnalysis
+from ..config import (
+    OPENAI_API_KEY, OPENAI_MODEL, OPENAI_FAST_MODEL, ROUTER_MIN_CONFIDENCE, MAX_CONCURRENT,
+    LLM_MIN_CONCURRENCY, LLM_MAX_CONCURRENCY, LLM_LATENCY_TARGET, LLM_RETRIES,
+    ANALYSIS_TOKEN_BUDGET, DB_IN_CHUNK_SIZE,
+)
+from ..database import get_supabase, round_trips
+from ..models.article import ArticleAnalysis, Priority
+from .analysis_cache import AnalysisCache, prompt_version
+from .concurrency import AdaptiveLimiter
+from .preprocess import prepare_content
 
 logger = logging.getLogger(__name__)
 
@@ -40,67 +55,491 @@ IMPORTANT for regions:
 - Example: {{"region": "south_korea", "flag": "🇰🇷"}}
 - Common flags: 🇺🇸 USA, 🇬🇧 UK, 🇨🇳 China, 🇷🇺 Russia, 🇰🇷 South Korea, 🇰🇵 North Korea, 🇺🇦 Ukraine, 🇮🇷 Iran, 🇮🇱 Israel, 🌍 Global"""
 
+HUMAN_PROMPT = """Analyze this article:
 
-def get_llm(model: str = None) -> ChatOpenAI:
+Title: {title}
+URL: {url}
+Is Sponsored: {is_sponsored}
+
+Content:
+{content}
+
+Provide a comprehensive structured analysis."""
+
+# Part of every analysis cache key - editing either prompt (or the content budget) invalidates cached analyses
+PROMPT_VERSION = prompt_version(SYSTEM_PROMPT, HUMAN_PROMPT, str(ANALYSIS_TOKEN_BUDGET))
+
+_analysis_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Get or create the analysis cache (singleton)"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache(version=PROMPT_VERSION)
+    return _analysis_cache
+
+
+# One keep-alive pool (per sync/async flavour) to the OpenAI API shared by every Analyzer
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_http_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_analyzers: dict[str, "Analyzer"] = {}
+_analyzers_lock = threading.Lock()
+
+
+def _strict_schema(node: Any, root: dict) -> Any:
+    """
+    Rewrite a pydantic JSON schema in place into the form OpenAI's strict
+    structured outputs accept: closed objects, every property required, no
+    `None` defaults, and no `$ref` with sibling keys.
+    """
+    if not isinstance(node, dict):
+        return node
+    for defs in ("$defs", "definitions"):
+        for sub in (node.get(defs) or {}).values():
+            _strict_schema(sub, root)
+
+    if node.get("type") == "object":
+        node.setdefault("additionalProperties", False)
+    if isinstance(node.get("properties"), dict):
+        node["required"] = list(node["properties"])
+        node["properties"] = {k: _strict_schema(v, root) for k, v in node["properties"].items()}
+    if isinstance(node.get("items"), dict):
+        node["items"] = _strict_schema(node["items"], root)
+    if isinstance(node.get("anyOf"), list):
+        node["anyOf"] = [_strict_schema(v, root) for v in node["anyOf"]]
+    if isinstance(node.get("allOf"), list):
+        if len(node["allOf"]) == 1:
+            node.update(_strict_schema(node.pop("allOf")[0], root))
+        else:
+            node["allOf"] = [_strict_schema(v, root) for v in node["allOf"]]
+    if "default" in node and node["default"] is None:
+        del node["default"]
+
+    ref = node.get("$ref")
+    if ref and len(node) > 1:
+        resolved = root
+        for key in ref.removeprefix("#/").split("/"):
+            resolved = resolved[key]
+        node.update({**resolved, **node})
+        del node["$ref"]
+        return _strict_schema(node, root)
+    return node
+
+
+def analysis_response_format() -> dict:
+    """The `response_format` for structured ArticleAnalysis output (strict JSON schema)"""
+    schema = ArticleAnalysis.model_json_schema()
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": ArticleAnalysis.__name__, "strict": True, "schema": _strict_schema(schema, schema)},
+    }
+
+
+def _shared_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _http_client
+
+
+def _shared_http_async_client() -> httpx.AsyncClient:
+    global _http_async_client, _http_async_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_async_client is None or _http_async_client_loop is not loop:
+        # A client's pool belongs to its loop; scripts calling asyncio.run() again get a new one
+        _http_async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY * 2, max_keepalive_connections=LLM_MAX_CONCURRENCY),
+        )
+        _http_async_client_loop = loop
+    return _http_async_client
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Retry-After seconds from an OpenAI error response, if present"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class Analyzer:
+    """
+    Compiled prompt | structured-output chain for one model.
+    Building the ChatOpenAI client and deriving the ArticleAnalysis schema is
+    done once here - get one via get_analyzer() and reuse it for every article.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None
+    ):
+        self.model = model
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
+            ("human", HUMAN_PROMPT)
+        ])
+        self.llm = ChatOpenAI(
+            model=model,
+            temperature=0.3,
+            api_key=OPENAI_API_KEY,
+            http_client=http_client or _shared_http_client()
+        ).with_structured_output(ArticleAnalysis)
+        self.chain = self.prompt | self.llm
+        
+        # The async chain is built per event loop, on first use (see async_chain)
+        self._http_async_client = http_async_client
+        self._async_chain = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.limiter = AdaptiveLimiter(
+            initial=MAX_CONCURRENT,
+            min_limit=LLM_MIN_CONCURRENCY,
+            max_limit=LLM_MAX_CONCURRENCY,
+            latency_target=LLM_LATENCY_TARGET
+        )
+        self.input_tokens = 0
+        self.tokens_saved = 0
+
+    @property
+    def async_chain(self):
+        """The chain on the async client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_chain is None or self._async_loop is not loop:
+            # The async path retries itself so every 429 reaches the limiter
+            async_llm = ChatOpenAI(
+                model=self.model,
+                temperature=0.3,
+                api_key=OPENAI_API_KEY,
+                max_retries=0,
+                http_async_client=self._http_async_client or _shared_http_async_client()
+            ).with_structured_output(ArticleAnalysis)
+            self._async_chain = self.prompt | async_llm
+            self._async_loop = loop
+        return self._async_chain
+
+    def _inputs(self, title: str, content: str, url: str, is_sponsored: bool) -> dict:
+        """Prompt variables, with the article text fitted to ANALYSIS_TOKEN_BUDGET"""
+        prepared = prepare_content(content, self.model)
+        self.input_tokens += prepared.tokens
+        self.tokens_saved += prepared.tokens_saved
+        if prepared.tokens_saved:
+            logger.info(
+                f"Content for {url or title[:50]}: {prepared.original_tokens} -> {prepared.tokens} tokens "
+                f"({prepared.tokens_saved} saved)"
+            )
+        return {
+            "title": title,
+            "url": url,
+            "is_sponsored": is_sponsored,
+            "content": prepared.text
+        }
+
+    def request_body(self, title: str, content: str, url: str = "", is_sponsored: bool = False) -> dict:
+        """
+        The chat completions request the chain would send for one article,
+        as plain JSON (for OpenAI Batch API input files)
+        """
+        messages = self.prompt.format_messages(**self._inputs(title, content, url, is_sponsored))
+        roles = {"system": "system", "human": "user"}
+        return {
+            "model": self.model,
+            "temperature": 0.3,
+            "messages": [{"role": roles[m.type], "content": m.content} for m in messages],
+            "response_format": analysis_response_format(),
+        }
+
+    def invoke(self, title: str, content: str, url: str = "", is_sponsored: bool = False) -> ArticleAnalysis:
+        """Run the chain for one article (blocking)"""
+        result = self.chain.invoke(self._inputs(title, content, url, is_sponsored))
+        
+        # Set the is_sponsored flag from input
+        result.is_sponsored = is_sponsored
+        return result
+
+    async def ainvoke(self, title: str, content: str, url: str = "", is_sponsored: bool = False) -> ArticleAnalysis:
+        """
+        Run the chain for one article on the async client.
+        Calls go through this model's adaptive limiter; rate limits and timeouts
+        shrink the limit and are retried with jittered backoff.
+        """
+        inputs = self._inputs(title, content, url, is_sponsored)
+        
+        for attempt in range(LLM_RETRIES + 1):
+            await self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                result = await self.async_chain.ainvoke(inputs)
+            except (openai.RateLimitError, openai.APITimeoutError) as e:
+                await self.limiter.release(throttled=True)
+                if attempt >= LLM_RETRIES:
+                    raise
+                delay = self.limiter.backoff(attempt, _retry_after(e))
+                logger.warning(f"{e.__class__.__name__} from {self.model}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                await self.limiter.release()
+                raise
+            
+            await self.limiter.release(latency=time.monotonic() - start)
+            result.is_sponsored = is_sponsored
+            return result
+        
+        raise RuntimeError(f"Exhausted retries for {self.model}")
+
+
+def get_analyzer(model: str = None) -> Analyzer:
+    """Get the shared Analyzer for a model, building it on first use"""
+    model = model or OPENAI_MODEL
+    analyzer = _analyzers.get(model)
+    if analyzer is None:
+        with _analyzers_lock:
+            analyzer = _analyzers.get(model)
+            if analyzer is None:
+                analyzer = _analyzers[model] = Analyzer(model)
+    return analyzer
+
+
+def get_llm(model: str = None):
     """Get LangChain ChatOpenAI instance with structured output"""
-    return ChatOpenAI(
-        model=model or OPENAI_MODEL,
-        temperature=0.3,
-        api_key=OPENAI_API_KEY
-    ).with_structured_output(ArticleAnalysis)
+    return get_analyzer(model).llm
 
 
-def analyze_article(
+# Structured-output failures a stronger model may not repeat
+VALIDATION_ERRORS = (
+    ValidationError,
+    OutputParserException,
+    openai.LengthFinishReasonError,
+    openai.ContentFilterFinishReasonError,
+)
+
+
+@dataclass
+class RoutedAnalysis:
+    """An analysis and the model tier that answered it"""
+    analysis: ArticleAnalysis
+    model: str
+    escalations: list[str] = field(default_factory=list)  # Why each cheaper tier was passed over
+    cached: bool = False
+
+
+class ModelRouter:
+    """
+    Runs an article through model tiers, cheapest first. A tier's answer is kept
+    unless it fails validation, rates its own confidence below `min_confidence`,
+    or flags the story as critical - then the next tier analyzes it again.
+    The last tier's answer is always kept.
+    """
+
+    def __init__(self, tiers: list[str], min_confidence: int = ROUTER_MIN_CONFIDENCE):
+        self.tiers = list(dict.fromkeys(t for t in tiers if t))
+        self.min_confidence = min_confidence
+        self.answered = {model: 0 for model in self.tiers}
+        self.escalated: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        """Identifies the routing setup (part of analysis cache keys)"""
+        if len(self.tiers) == 1:
+            return self.tiers[0]
+        return ">".join(self.tiers) + f"@{self.min_confidence}"
+
+    def escalation_reason(self, analysis: ArticleAnalysis) -> Optional[str]:
+        """Why an answer from a non-final tier is not good enough, or None to keep it"""
+        if analysis.priority == Priority.CRITICAL:
+            return "critical"
+        if analysis.confidence_score < self.min_confidence:
+            return f"confidence {analysis.confidence_score}"
+        return None
+
+    def _accept(self, model: str, analysis: ArticleAnalysis, escalations: list[str]) -> RoutedAnalysis:
+        with self._lock:
+            self.answered[model] += 1
+        if escalations:
+            logger.info(f"Answered by {model} after escalation ({'; '.join(escalations)})")
+        return RoutedAnalysis(analysis=analysis, model=model, escalations=escalations)
+
+    def _escalate(self, model: str, reason: str, escalations: list[str], url: str):
+        with self._lock:
+            key = reason.split(" ")[0]
+            self.escalated[key] = self.escalated.get(key, 0) + 1
+        escalations.append(f"{model}: {reason}")
+        logger.info(f"Escalating {url[:60]} past {model} ({reason})")
+
+    def invoke(self, title: str, content: str, url: str = "", is_sponsored: bool = False) -> RoutedAnalysis:
+        """Route one article through the tiers (blocking)"""
+        escalations = []
+        for i, model in enumerate(self.tiers):
+            final = i == len(self.tiers) - 1
+            try:
+                analysis = get_analyzer(model).invoke(title, content, url, is_sponsored)
+            except VALIDATION_ERRORS as e:
+                if final:
+                    raise
+                self._escalate(model, f"invalid output: {e.__class__.__name__}", escalations, url or title)
+                continue
+            reason = None if final else self.escalation_reason(analysis)
+            if reason is None:
+                return self._accept(model, analysis, escalations)
+            self._escalate(model, reason, escalations, url or title)
+
+    async def ainvoke(self, title: str, content: str, url: str = "", is_sponsored: bool = False) -> RoutedAnalysis:
+        """Route one article through the tiers on the async clients"""
+        escalations = []
+        for i, model in enumerate(self.tiers):
+            final = i == len(self.tiers) - 1
+            try:
+                analysis = await get_analyzer(model).ainvoke(title, content, url, is_sponsored)
+            except VALIDATION_ERRORS as e:
+                if final:
+                    raise
+                self._escalate(model, f"invalid output: {e.__class__.__name__}", escalations, url or title)
+                continue
+            reason = None if final else self.escalation_reason(analysis)
+            if reason is None:
+                return self._accept(model, analysis, escalations)
+            self._escalate(model, reason, escalations, url or title)
+
+    def stats(self) -> dict:
+        total = sum(self.answered.values())
+        return {
+            "tiers": self.tiers,
+            "min_confidence": self.min_confidence,
+            "answered": dict(self.answered),
+            "escalated": dict(self.escalated),
+            "first_tier_rate": round(self.answered[self.tiers[0]] / total, 3) if total else 0.0,
+        }
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_router() -> ModelRouter:
+    """Get the default OPENAI_FAST_MODEL -> OPENAI_MODEL router (singleton)"""
+    global _router
+    if _router is None:
+        _router = ModelRouter([OPENAI_FAST_MODEL, OPENAI_MODEL])
+    return _router
+
+
+def _cached(cache_key: str, url: str, title: str, is_sponsored: bool) -> Optional[RoutedAnalysis]:
+    cached = get_analysis_cache().get(cache_key)
+    if cached is None:
+        return None
+    logger.info(f"Analysis cache hit for {url or title[:50]}")
+    analysis, model = cached
+    analysis.is_sponsored = is_sponsored
+    return RoutedAnalysis(analysis=analysis, model=model or OPENAI_MODEL, cached=True)
+
+
+async def _acached(cache_key: str, url: str, title: str, is_sponsored: bool) -> Optional[RoutedAnalysis]:
+    """_cached with the file read off the event loop"""
+    return await asyncio.to_thread(_cached, cache_key, url, title, is_sponsored)
+
+
+def route_article(
     title: str,
     content: str,
     url: str = "",
     is_sponsored: bool = False,
-    model: str = None
-) -> ArticleAnalysis:
+    model: str = None,
+    use_cache: bool = True
+) -> RoutedAnalysis:
     """
-    Analyze an article using LangChain structured outputs.
+    Analyze an article and report which model answered.
+    With no `model` the article goes through the tiered router; an explicit
+    `model` pins that one model. Identical content already analyzed with the
+    same routing and prompts is served from the analysis cache unless use_cache is False.
     """
-    llm = get_llm(model)
+    router = get_router()
+    cache_key = get_analysis_cache().key(title, content, is_sponsored, model or router.label)
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", SYSTEM_PROMPT),
-        ("human", """Analyze this article:
-
-Title: {title}
-URL: {url}
-Is Sponsored: {is_sponsored}
+    if use_cache and (cached := _cached(cache_key, url, title, is_sponsored)):
+        return cached
+    
+    if model:
+        routed = RoutedAnalysis(analysis=get_analyzer(model).invoke(title, content, url, is_sponsored), model=model)
+    else:
+        routed = router.invoke(title, content, url, is_sponsored)
+    
+    get_analysis_cache().put(cache_key, routed.analysis, url, model=routed.model)
+    
+    return routed
 
-Content:
-{content}
 
-Provide a comprehensive structured analysis.""")
-    ])
+async def aroute_article(
+    title: str,
+    content: str,
+    url: str = "",
+    is_sponsored: bool = False,
+    model: str = None,
+    use_cache: bool = True
+) -> RoutedAnalysis:
+    """Async route_article - uses the analysis cache and each tier's adaptive limiter"""
+    router = get_router()
+    cache_key = get_analysis_cache().key(title, content, is_sponsored, model or router.label)
     
-    chain = prompt | llm
+    if use_cache and (cached := await _acached(cache_key, url, title, is_sponsored)):
+        return cached
     
-    result = chain.invoke({
-        "title": title,
-        "url": url,
-        "is_sponsored": is_sponsored,
-        "content": content
-    })
+    if model:
+        analysis = await get_analyzer(model).ainvoke(title, content, url, is_sponsored)
+        routed = RoutedAnalysis(analysis=analysis, model=model)
+    else:
+        routed = await router.ainvoke(title, content, url, is_sponsored)
     
-    # Set the is_sponsored flag from input
-    result.is_sponsored = is_sponsored
+    await asyncio.to_thread(get_analysis_cache().put, cache_key, routed.analysis, url, model=routed.model)
     
-    return result
+    return routed
 
 
-def save_analysis(
+def analyze_article(
+    title: str,
+    content: str,
+    url: str = "",
+    is_sponsored: bool = False,
+    model: str = None,
+    use_cache: bool = True
+) -> ArticleAnalysis:
+    """
+    Analyze an article using LangChain structured outputs.
+    See route_article() for model selection and caching.
+    """
+    return route_article(title, content, url, is_sponsored, model, use_cache).analysis
+
+
+async def aanalyze_article(
+    title: str,
+    content: str,
+    url: str = "",
+    is_sponsored: bool = False,
+    model: str = None,
+    use_cache: bool = True
+) -> ArticleAnalysis:
+    """Async analyze_article"""
+    routed = await aroute_article(title, content, url, is_sponsored, model, use_cache)
+    return routed.analysis
+
+
+def analysis_row(
     analysis: ArticleAnalysis,
     article_url: str,
     article_title: str,
     article_id: Optional[int] = None,
-    model_used: str = None
+    model_used: str = None,
+    follow_up_of: Optional[str] = None
 ) -> dict:
-    """Save article analysis to Supabase."""
-    supabase = get_supabase()
-    
+    """article_analyses row for an analysis. `follow_up_of` is the URL of the earlier story it continues"""
     data = {
         "article_url": article_url,
         "article_title": article_title,
@@ -129,22 +568,87 @@ def save_analysis(
     
     if article_id:
         data["article_id"] = article_id
+    if follow_up_of:
+        data["follow_up_of"] = follow_up_of
+    
+    return data
+
+
+def save_analysis(
+    analysis: ArticleAnalysis,
+    article_url: str,
+    article_title: str,
+    article_id: Optional[int] = None,
+    model_used: str = None
+) -> dict:
+    """Save article analysis to Supabase."""
+    supabase = get_supabase()
     
     result = supabase.table("article_analyses").upsert(
-        data,
+        analysis_row(analysis, article_url, article_title, article_id, model_used),
         on_conflict="article_url"
     ).execute()
+    round_trips.write()
     
     return result.data[0] if result.data else None
 
 
+def save_analyses(rows: list[dict]) -> dict[str, dict]:
+    """
+    Upsert many analysis_row() dicts in one request.
+    Returns the stored rows by article_url.
+    """
+    if not rows:
+        return {}
+    supabase = get_supabase()
+    
+    # Rows without article_id keep the column default instead of being nulled
+    result = supabase.table("article_analyses").upsert(
+        rows,
+        on_conflict="article_url",
+        default_to_null=False
+    ).execute()
+    round_trips.write()
+    
+    return {row["article_url"]: row for row in result.data or []}
+
+
+def copy_analysis(
+    source: dict,
+    article_url: str,
+    article_title: str,
+    article_id: Optional[int] = None
+) -> dict:
+    """Store an existing analysis row for another article (near-duplicate text) without an LLM call"""
+    return save_analysis(
+        analysis=ArticleAnalysis.model_validate(source),
+        article_url=article_url,
+        article_title=article_title,
+        article_id=article_id,
+        model_used=source.get("model_used")
+    )
+
+
 def get_analysis_by_url(url: str) -> Optional[dict]:
     """Get existing analysis for an article URL"""
     supabase = get_supabase()
     result = supabase.table("article_analyses").select("*").eq("article_url", url).execute()
+    round_trips.read()
     return result.data[0] if result.data else None
 
 
+def get_analyses_by_urls(urls: list[str]) -> dict[str, dict]:
+    """Existing analyses for many article URLs, in chunked `in_` queries"""
+    supabase = get_supabase()
+    urls = list(dict.fromkeys(u for u in urls if u))
+    found = {}
+    for i in range(0, len(urls), DB_IN_CHUNK_SIZE):
+        result = supabase.table("article_analyses").select("*").in_("article_url", urls[i:i + DB_IN_CHUNK_SIZE]).execute()
+        round_trips.read()
+        found.update((row["article_url"], row) for row in result.data)
+    return found
+
+
 def get_all_analyses(limit: int = 50, priority: Optional[str] = None) -> list[dict]:
     """Get all analyses, optionally filtered by priority"""
     supabase = get_supabase()
@@ -176,22 +680,23 @@ def analyze_and_save(
             return None, existing
     
     # Analyze
-    analysis = analyze_article(
+    routed = route_article(
         title=title,
         content=content,
         url=url,
         is_sponsored=is_sponsored,
-        model=model
+        model=model,
+        use_cache=not force
     )
     
-    # Save
+    # Save - model_used records the tier that answered
     saved = save_analysis(
-        analysis=analysis,
+        analysis=routed.analysis,
         article_url=url,
         article_title=title,
         article_id=article_id,
-        model_used=model
+        model_used=routed.model
     )
     
-    return analysis, saved
+    return routed.analysis, saved
 
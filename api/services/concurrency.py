@@ -0,0 +1,185 @@
+"""
+Adaptive Concurrency Service
+AIMD concurrency limiter for calls against a rate-limited upstream (OpenAI),
+and token buckets for upstreams with a fixed send rate (Brevo, Slack)
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+    Every successful call within the latency target grows the limit by 1/limit
+    (about +1 per full window of calls). A rate-limit response or a call slower
+    than the target cuts it by `decrease_factor`, at most once per `cooldown`
+    seconds so a burst of 429s from one window counts as a single congestion event.
+    The limiter can outlive an event loop (shared analyzers, scripts calling
+    asyncio.run() more than once): its condition belongs to the running loop
+    and is replaced when a call comes from a new one.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_target: float = 30.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 5.0,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.completed = 0
+        self.throttled = 0
+        self.slow = 0
+        self.peak_limit = self.limit
+        self._last_decrease = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+        self._cond_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._cond_loop is not loop:
+            # Calls still counted on a previous loop can never release here
+            self._cond = asyncio.Condition()
+            self._cond_loop = loop
+            self.in_flight = 0
+        return self._cond
+
+    async def acquire(self):
+        """Wait for a free slot under the current limit"""
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float] = None, throttled: bool = False):
+        """Free a slot and adjust the limit from how the call went"""
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self._decrease("rate limited")
+            elif latency is not None and latency > self.latency_target:
+                self.slow += 1
+                self._decrease(f"latency {latency:.1f}s over target")
+            elif latency is not None:
+                self.completed += 1
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+            cond.notify_all()
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        old = self.limit
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        logger.warning(f"Concurrency {old:.1f} -> {self.limit:.1f} ({reason})")
+
+    @staticmethod
+    def backoff(attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retrying a throttled call: Retry-After if given, else exponential with jitter"""
+        if retry_after is not None:
+            return min(retry_after, MAX_BACKOFF_SECONDS) + random.uniform(0, 1)
+        return min(2 ** attempt, MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.5)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "peak_limit": round(self.peak_limit, 2),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "slow": self.slow,
+        }
+
+
+class TokenBucket:
+    """
+    `rate` calls per second with bursts of up to `burst`.
+    Callers reserve a token and sleep until it is theirs, so concurrent waiters
+    are spaced out instead of all retrying at once. Purely clock based - safe to
+    share between event loops and threads.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.waited = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += delay
+            return delay
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def delay(self) -> float:
+        """Seconds until a token is free, without taking it"""
+        with self._lock:
+            tokens = self.tokens + (time.monotonic() - self._updated) * self.rate
+            return max(0.0, (1 - tokens) / self.rate)
+
+    def idle(self) -> bool:
+        """True once the bucket has refilled - forgetting it changes nothing"""
+        with self._lock:
+            return self.tokens + (time.monotonic() - self._updated) * self.rate >= self.burst
+
+
+class KeyedTokenBuckets:
+    """One TokenBucket per key (Slack workspace, channel, ...), dropping idle ones past `max_keys`"""
+
+    def __init__(self, rate: float, burst: float = 1.0, max_keys: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    for old in [k for k, b in self._buckets.items() if b.idle()]:
+                        del self._buckets[old]
+            self._buckets.move_to_end(key)
+            return bucket
+
+    async def acquire(self, key: Hashable):
+        await self.get(key).acquire()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
@@ -0,0 +1,242 @@
+"""
+Near-Duplicate Service
+MinHash signatures over article text shingles, bucketed with LSH, so re-posted
+stories and follow-ups are spotted before they reach the LLM
+"""
+
+import os
+import re
+import json
+import random
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from ..config import (
+    DEDUP_INDEX_PATH, DEDUP_MAX_ENTRIES, DEDUP_DUPLICATE_THRESHOLD, DEDUP_FOLLOWUP_THRESHOLD,
+    DEDUP_SEED_DAYS, DEDUP_SEED_LIMIT,
+)
+from ..database import get_supabase, iter_rows, round_trips
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3  # Words per shingle
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows - pairs above ~0.5 similarity share a bucket
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[int]:
+    """32-bit hashes of every run of `size` words, ignoring case and punctuation"""
+    words = _WORD.findall((text or "").lower())
+    if len(words) < size:
+        words = words and [" ".join(words)]
+        size = 1
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=4).digest(), "big")
+        for i in range(len(words) - size + 1)
+    }
+
+
+@dataclass
+class Match:
+    """The closest indexed article to a query"""
+    url: str
+    article_id: Optional[int]
+    similarity: float
+
+    @property
+    def is_duplicate(self) -> bool:
+        return self.similarity >= DEDUP_DUPLICATE_THRESHOLD
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of recently saved articles, persisted as one JSON file.
+    add() is called as articles are saved; query() returns the most similar
+    indexed article above DEDUP_FOLLOWUP_THRESHOLD. Only the newest `max_entries`
+    articles are kept.
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, max_entries: int = DEDUP_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.rows = NUM_PERM // BANDS
+        # Fixed seed - signatures stay comparable across restarts
+        rng = random.Random(1)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+        self._entries: dict[str, dict] = {}  # url -> {"id", "sig"}, oldest first
+        self._buckets: dict[tuple, set[str]] = {}
+        self.seeded = False  # Set once seed_dedup_index ran, even if it found nothing
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, text: str) -> list[int]:
+        hashes = shingles(text)
+        if not hashes:
+            return []
+        return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in self._perms]
+
+    def _bands(self, sig: list[int]) -> list[tuple]:
+        return [(band, *sig[band * self.rows:(band + 1) * self.rows]) for band in range(BANDS)]
+
+    @staticmethod
+    def similarity(a: list[int], b: list[int]) -> float:
+        """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+        if not a or not b:
+            return 0.0
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def add(self, url: str, text: str, article_id: Optional[int] = None):
+        """Index (or re-index) an article"""
+        sig = self.signature(text)
+        if not sig:
+            return
+        with self._lock:
+            self._remove(url)
+            self._insert(url, {"id": article_id, "sig": sig})
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._dirty = True
+
+    def query(self, text: str, exclude: str = "") -> Optional[Match]:
+        """Most similar indexed article (other than `exclude`) at or above DEDUP_FOLLOWUP_THRESHOLD"""
+        sig = self.signature(text)
+        if not sig:
+            return None
+        with self._lock:
+            candidates = set()
+            for key in self._bands(sig):
+                candidates |= self._buckets.get(key, set())
+            candidates.discard(exclude)
+
+            best = None
+            for url in candidates:
+                entry = self._entries[url]
+                score = self.similarity(sig, entry["sig"])
+                if score >= DEDUP_FOLLOWUP_THRESHOLD and (best is None or score > best.similarity):
+                    best = Match(url=url, article_id=entry["id"], similarity=score)
+            return best
+
+    def _insert(self, url: str, entry: dict):
+        self._entries[url] = entry
+        for key in self._bands(entry["sig"]):
+            self._buckets.setdefault(key, set()).add(url)
+
+    def _remove(self, url: str):
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return
+        for key in self._bands(entry["sig"]):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(url)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable near-duplicate index {self.path}: {e}")
+            return
+
+        if data.get("num_perm") != NUM_PERM or data.get("bands") != BANDS or data.get("shingle_size") != SHINGLE_SIZE:
+            logger.info("Near-duplicate index parameters changed, starting empty")
+            return
+        for url, entry in data.get("entries", {}).items():
+            self._insert(url, entry)
+        self.seeded = data.get("seeded", bool(self._entries))
+
+    def mark_seeded(self):
+        with self._lock:
+            self.seeded = True
+            self._dirty = True
+
+    def save(self):
+        """Write the index to disk if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "num_perm": NUM_PERM,
+                "bands": BANDS,
+                "shingle_size": SHINGLE_SIZE,
+                "seeded": self.seeded,
+                "entries": dict(self._entries),
+            }
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save near-duplicate index: {e}")
+
+    def stats(self) -> dict:
+        return {"articles": len(self._entries), "buckets": len(self._buckets)}
+
+
+_index: Optional[NearDuplicateIndex] = None
+
+
+def get_dedup_index() -> NearDuplicateIndex:
+    """Get or create the near-duplicate index (singleton)"""
+    global _index
+    if _index is None:
+        _index = NearDuplicateIndex()
+    return _index
+
+
+def seed_dedup_index(page_size: int = 500, days: int = DEDUP_SEED_DAYS, limit: int = DEDUP_SEED_LIMIT) -> int:
+    """
+    Fill an empty index (first run, wiped cache) from the newest articles in
+    news_articles: at most `limit` of them, from the last `days` days, since
+    each costs a MinHash signature. Runs once per index file - an empty result
+    is remembered too. Returns how many articles were indexed.
+    """
+    index = get_dedup_index()
+    if index.seeded or len(index):
+        return 0
+
+    supabase = get_supabase()
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+    limit = min(limit, index.max_entries)
+    if limit <= 0:
+        return 0
+
+    # Oldest id among the newest `limit` articles - an id-only lookup, so the
+    # text is then streamed in keyset pages instead of offset scans
+    cutoff = supabase.table("news_articles").select("id") \
+        .gte("created_at", since).order("id", desc=True).range(limit - 1, limit - 1).execute().data
+    round_trips.read()
+
+    def window(query):
+        query = query.gte("created_at", since)
+        return query.gte("id", cutoff[0]["id"]) if cutoff else query
+
+    # Oldest first, so the newest stay when the index is trimmed
+    indexed = 0
+    for row in iter_rows("news_articles", "id, url, text", where=window, page_size=page_size, client=supabase):
+        if row.get("text"):
+            index.add(row["url"], row["text"], row["id"])
+            indexed += 1
+    index.mark_seeded()
+    index.save()
+    logger.info(f"Seeded near-duplicate index with {indexed} articles")
+    return indexed
@@ -0,0 +1,274 @@
+"""
+Weekly Digest Service
+Running top-K digests per weekly subscription, kept in a local SQLite file and
+updated as articles are analyzed. The Monday job only reads them back, so its
+memory no longer grows with the week's article volume. Weeks that got analyses
+outside the pipeline are flagged in the weekly_digest_stale table, where every
+host (scripts, Batch API ingest) can reach the job. Weeks are ISO weeks in UTC.
+"""
+
+import os
+import json
+import time
+import heapq
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config import DIGEST_PATH, WEEKLY_DIGEST_SIZE, DIGEST_RETENTION_WEEKS
+from ..database import get_supabase, round_trips
+
+logger = logging.getLogger(__name__)
+
+# What the digest email (article cards) and Slack digest show
+DIGEST_FIELDS = (
+    "id", "headline", "article_title", "article_url", "priority", "relevance_score",
+    "short_summary", "tldr", "read_time_minutes", "key_takeaways", "mentioned_technologies",
+    "analyzed_at",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS digest_matches (
+    subscription_id TEXT NOT NULL,
+    week TEXT NOT NULL,
+    article_key TEXT NOT NULL,
+    PRIMARY KEY (subscription_id, week, article_key)
+);
+CREATE TABLE IF NOT EXISTS digest_entries (
+    subscription_id TEXT NOT NULL,
+    week TEXT NOT NULL,
+    article_key TEXT NOT NULL,
+    score REAL NOT NULL,
+    article TEXT NOT NULL,
+    PRIMARY KEY (subscription_id, week, article_key)
+);
+CREATE TABLE IF NOT EXISTS digest_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def week_of(when: Optional[datetime] = None) -> str:
+    """ISO week label of a time in UTC, e.g. 2026-W07 (naive times are taken as UTC)"""
+    when = when or datetime.now(timezone.utc)
+    if when.tzinfo:
+        when = when.astimezone(timezone.utc)
+    year, week_number, _ = when.isocalendar()
+    return f"{year}-W{week_number:02d}"
+
+
+def week_start(week: str) -> datetime:
+    """Monday 00:00 UTC of an ISO week label"""
+    return datetime.strptime(f"{week}-1", "%G-W%V-%u").replace(tzinfo=timezone.utc)
+
+
+def article_week(article: Dict[str, Any]) -> str:
+    """The digest week an analysis row belongs to (by analyzed_at, else now)"""
+    analyzed_at = article.get("analyzed_at")
+    if analyzed_at:
+        try:
+            return week_of(datetime.fromisoformat(str(analyzed_at).replace("Z", "+00:00")))
+        except ValueError:
+            pass
+    return week_of()
+
+
+def _article_key(article: Dict[str, Any]) -> str:
+    return str(article.get("id") or article.get("article_url") or article.get("headline", ""))
+
+
+class DigestStore:
+    """
+    For every (weekly subscription, ISO week): the keys of all matched articles
+    (for the "and N more" count) and the `size` most relevant ones, in full.
+    The top entries are held in a min-heap per digest, loaded on first use, so
+    a new article costs one comparison against the digest's weakest entry.
+    Thread-safe.
+    """
+
+    def __init__(self, path: str = DIGEST_PATH, size: int = WEEKLY_DIGEST_SIZE):
+        self.path = path
+        self.size = size
+        self._heaps: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}  # Min-heaps of (score, article key)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO digest_meta (key, value) VALUES ('tracking_since', ?)", (str(time.time()),)
+            )
+
+    # ------------------------------------------------------------------ updates
+
+    def _heap(self, subscription_id: str, week: str) -> List[Tuple[float, str]]:
+        heap = self._heaps.get((subscription_id, week))
+        if heap is None:
+            heap = [
+                (row["score"], row["article_key"]) for row in self._conn.execute(
+                    "SELECT score, article_key FROM digest_entries WHERE subscription_id = ? AND week = ?",
+                    (subscription_id, week),
+                )
+            ]
+            heapq.heapify(heap)
+            self._heaps[(subscription_id, week)] = heap
+        return heap
+
+    def _add(self, subscription_id: str, week: str, article: Dict[str, Any]) -> bool:
+        """Count a match and keep the article if it is among the top `size`. Caller holds the lock"""
+        key = _article_key(article)
+        score = float(article.get("relevance_score") or 0)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO digest_matches (subscription_id, week, article_key) VALUES (?, ?, ?)",
+            (subscription_id, week, key),
+        )
+
+        heap = self._heap(subscription_id, week)
+        held = next((i for i, (_, k) in enumerate(heap) if k == key), None)
+        if held is not None:
+            # Re-analyzed: refresh the entry in place
+            heap[held] = (score, key)
+            heapq.heapify(heap)
+        elif len(heap) < self.size:
+            heapq.heappush(heap, (score, key))
+        elif (score, key) > heap[0]:
+            _, evicted = heapq.heapreplace(heap, (score, key))
+            self._conn.execute(
+                "DELETE FROM digest_entries WHERE subscription_id = ? AND week = ? AND article_key = ?",
+                (subscription_id, week, evicted),
+            )
+        else:
+            return False
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO digest_entries (subscription_id, week, article_key, score, article) VALUES (?, ?, ?, ?, ?)",
+            (subscription_id, week, key, score, json.dumps({f: article.get(f) for f in DIGEST_FIELDS if f in article})),
+        )
+        return True
+
+    def record(self, matched: Iterable[Tuple[Dict[str, Any], List[Dict[str, Any]]]], week: Optional[str] = None) -> int:
+        """
+        Add (subscription, matching articles) pairs, as from SubscriptionMatcher.match_all.
+        Articles go to the week they were analyzed in unless `week` is given.
+        Returns how many articles made it into a top-K.
+        """
+        kept = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for sub, articles in matched:
+                    for article in articles:
+                        kept += self._add(str(sub["id"]), week or article_week(article), article)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._heaps.clear()  # May hold entries that were rolled back
+                raise
+        return kept
+
+    # ------------------------------------------------------------------ reads
+
+    def digest(self, subscription_id: str, week: str) -> Tuple[List[Dict[str, Any]], int]:
+        """(top articles, most relevant first; number of matched articles) for one digest"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT article FROM digest_entries WHERE subscription_id = ? AND week = ? ORDER BY score DESC, article_key DESC",
+                (str(subscription_id), week),
+            ).fetchall()
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM digest_matches WHERE subscription_id = ? AND week = ?",
+                (str(subscription_id), week),
+            ).fetchone()[0]
+        return [json.loads(row["article"]) for row in rows], total
+
+    def covers(self, week: str) -> bool:
+        """
+        Whether every pipeline analysis of `week` was recorded: tracking started
+        before it, or it was rebuilt. Analyses saved elsewhere are flagged in
+        the database instead (see stale_since)
+        """
+        with self._lock:
+            meta = dict(self._conn.execute("SELECT key, value FROM digest_meta").fetchall())
+        return f"rebuilt:{week}" in meta or float(meta["tracking_since"]) <= week_start(week).timestamp()
+
+    def reset(self, week: str):
+        """Drop a week's digests, before rebuilding them from the database"""
+        with self._lock:
+            self._conn.execute("DELETE FROM digest_matches WHERE week = ?", (week,))
+            self._conn.execute("DELETE FROM digest_entries WHERE week = ?", (week,))
+            self._conn.execute("DELETE FROM digest_meta WHERE key = ?", (f"rebuilt:{week}",))
+            for key in [k for k in self._heaps if k[1] == week]:
+                del self._heaps[key]
+
+    def mark_rebuilt(self, week: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO digest_meta (key, value) VALUES (?, ?)", (f"rebuilt:{week}", str(time.time()))
+            )
+
+    def prune(self, keep_weeks: int = DIGEST_RETENTION_WEEKS) -> int:
+        """Forget digests of weeks that ended more than `keep_weeks` weeks ago"""
+        oldest = week_of(datetime.now(timezone.utc) - timedelta(weeks=keep_weeks))
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM digest_entries WHERE week < ?", (oldest,)).rowcount
+            self._conn.execute("DELETE FROM digest_matches WHERE week < ?", (oldest,))
+            self._conn.execute("DELETE FROM digest_meta WHERE key LIKE 'rebuilt:%' AND key < ?", (f"rebuilt:{oldest}",))
+            for key in [k for k in self._heaps if k[1] < oldest]:
+                del self._heaps[key]
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            digests = self._conn.execute("SELECT COUNT(DISTINCT subscription_id || week) FROM digest_entries").fetchone()[0]
+            entries = self._conn.execute("SELECT COUNT(*) FROM digest_entries").fetchone()[0]
+            matches = self._conn.execute("SELECT COUNT(*) FROM digest_matches").fetchone()[0]
+        return {"digests": digests, "entries": entries, "matches": matches, "heaps_loaded": len(self._heaps)}
+
+
+_store: Optional[DigestStore] = None
+
+
+def get_digest_store() -> DigestStore:
+    """Get or create the weekly digest store (singleton)"""
+    global _store
+    if _store is None:
+        _store = DigestStore()
+    return _store
+
+
+def mark_digests_stale(rows: Iterable[Optional[Dict[str, Any]]]):
+    """
+    Record that analysis rows were saved outside the pipeline, so the weekly
+    job rebuilds their weeks from the database instead of trusting the store.
+    The flag lives in the database, so a script on another host reaches the
+    job too. Never raises - a failure here must not fail the save.
+    """
+    try:
+        now = datetime.now(timezone.utc).isoformat()
+        weeks = {article_week(row or {}) for row in rows}
+        if weeks:
+            get_supabase().table("weekly_digest_stale").upsert(
+                [{"week": week, "marked_at": now} for week in sorted(weeks)], on_conflict="week"
+            ).execute()
+            round_trips.write()
+    except Exception as e:
+        logger.error(f"Error marking weekly digests stale: {e}")
+
+
+def stale_since(week: str) -> Optional[str]:
+    """When `week` was last flagged by mark_digests_stale, or None"""
+    result = get_supabase().table("weekly_digest_stale").select("marked_at").eq("week", week).limit(1).execute()
+    round_trips.read()
+    return result.data[0]["marked_at"] if result.data else None
+
+
+def clear_stale(week: str, rebuilt_from: datetime):
+    """Drop `week`'s flag unless it was set again after the rebuild started reading"""
+    get_supabase().table("weekly_digest_stale").delete().eq("week", week).lte("marked_at", rebuilt_from.isoformat()).execute()
+    round_trips.write()
@@ -0,0 +1,202 @@
+"""
+HTTP Fetch Service
+Shared async HTTP client with keep-alive, per-host politeness, timeouts and retries
+"""
+
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from ..config import REQUEST_DELAY, FETCH_TIMEOUT, FETCH_RETRIES, FETCH_CONCURRENCY_PER_HOST
+from .http_cache import HttpCache, body_hash
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying - everything else is returned to the caller as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 30.0
+
+
+@dataclass
+class FetchResult:
+    """Body of a cache-aware fetch"""
+    url: str
+    text: str
+    cache_hit: bool  # Served from cache (304) or body identical to the cached copy
+    changed: bool    # Body differs from what was cached before this fetch
+    not_modified: bool = False           # Answered 304 - the body is the cached copy
+    etag: Optional[str] = None           # Validators of the response, for store()
+    last_modified: Optional[str] = None
+
+
+class HostLimiter:
+    """
+    Politeness gate for a single host.
+    Allows at most `concurrency` requests in flight and spaces request starts
+    so each connection waits `delay` seconds between its own requests.
+    """
+
+    def __init__(self, concurrency: int, delay: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = delay / concurrency
+        self._next_start = 0.0
+
+    async def wait_turn(self):
+        """Sleep until this request is allowed to start."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class Fetcher:
+    """
+    Async HTTP fetcher backed by one pooled httpx client.
+    Use as an async context manager in scripts, or via get_fetcher() in the API.
+    Pass an HttpCache to enable conditional GETs through fetch().
+    """
+
+    def __init__(
+        self,
+        delay: float = REQUEST_DELAY,
+        concurrency_per_host: int = FETCH_CONCURRENCY_PER_HOST,
+        timeout: float = FETCH_TIMEOUT,
+        retries: int = FETCH_RETRIES,
+        cache: Optional[HttpCache] = None,
+    ):
+        self.delay = delay
+        self.cache = cache
+        self.concurrency_per_host = max(1, concurrency_per_host)
+        self.retries = retries
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=self.concurrency_per_host * 4,
+                max_keepalive_connections=self.concurrency_per_host * 4,
+            ),
+            follow_redirects=True,
+        )
+        self._hosts: dict[str, HostLimiter] = {}
+
+    async def __aenter__(self) -> "Fetcher":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying connection pool."""
+        await self._client.aclose()
+
+    def _limiter(self, url: str) -> HostLimiter:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = HostLimiter(self.concurrency_per_host, self.delay)
+        return self._hosts[host]
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Exponential backoff with jitter, honoring a numeric Retry-After header."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        return min(2 ** attempt, MAX_BACKOFF_SECONDS) + random.uniform(0, 0.5)
+
+    async def get(self, url: str, headers: Optional[dict] = None) -> httpx.Response:
+        """
+        GET a URL, retrying transport errors, timeouts and 429/5xx responses.
+        The final response is returned without raising on its status code.
+        """
+        limiter = self._limiter(url)
+
+        for attempt in range(self.retries + 1):
+            async with limiter.semaphore:
+                await limiter.wait_turn()
+                try:
+                    response = await self._client.get(url, headers=headers)
+                except httpx.TransportError as e:
+                    if attempt >= self.retries:
+                        raise
+                    logger.warning(f"Fetch error for {url} ({e.__class__.__name__}), retrying...")
+                    response = None
+
+            if response is not None:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                logger.warning(f"Got HTTP {response.status_code} for {url}, retrying...")
+
+            await asyncio.sleep(self._backoff(attempt, response))
+
+        raise RuntimeError(f"Exhausted retries for {url}")
+
+    async def get_text(self, url: str) -> str:
+        """GET a URL and return its body, raising on non-2xx responses."""
+        response = await self.get(url)
+        response.raise_for_status()
+        return response.text
+
+    async def fetch(self, url: str, store: bool = True) -> FetchResult:
+        """
+        Conditional GET through the HTTP cache.
+        Sends stored validators, reuses the cached body on 304 and flags
+        whether the body changed since the previous fetch. With store=False
+        a new body is not cached until `store()` is called with the result,
+        so a caller can wait until it has finished processing the page.
+        """
+        if self.cache is None:
+            return FetchResult(url=url, text=await self.get_text(url), cache_hit=False, changed=True)
+
+        entry = await asyncio.to_thread(self.cache.get, url)
+        response = await self.get(url, headers=HttpCache.conditional_headers(entry))
+
+        if response.status_code == 304 and entry:
+            self.cache.hits += 1
+            return FetchResult(url=url, text=entry["body"], cache_hit=True, changed=False, not_modified=True)
+
+        response.raise_for_status()
+        text = response.text
+        changed = entry is None or entry.get("hash") != body_hash(text)
+        if changed:
+            self.cache.misses += 1
+        else:
+            self.cache.hits += 1
+
+        result = FetchResult(
+            url=url, text=text, cache_hit=not changed, changed=changed,
+            etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"),
+        )
+        if store:
+            await self.store(result)
+        return result
+
+    async def store(self, result: FetchResult):
+        """Cache a fetched body and its validators (see fetch(store=False)). 304s are already cached"""
+        if self.cache is not None and not result.not_modified:
+            await asyncio.to_thread(self.cache.put, result.url, result.text, result.etag, result.last_modified)
+
+
+_fetcher: Optional[Fetcher] = None
+
+
+def get_fetcher() -> Fetcher:
+    """Get or create the shared Fetcher (singleton)"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher(cache=HttpCache())
+    return _fetcher
+
+
+async def close_fetcher():
+    """Close the shared Fetcher, if one was created"""
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.aclose()
+        _fetcher = None
@@ -0,0 +1,115 @@
+"""
+HTTP Cache Service
+On-disk store of ETag/Last-Modified validators and body hashes per URL
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from ..config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+# Writes between scans of the cache directory for entries over the limit
+PRUNE_EVERY = 50
+
+
+def body_hash(text: str) -> str:
+    """Stable hash of a response body"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """
+    One JSON file per URL holding validators, body hash and body.
+    Oldest entries are pruned once the directory exceeds `max_entries`,
+    checked every PRUNE_EVERY writes. Blocking file I/O - async callers
+    run it in a thread.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_entries: int = HTTP_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, url: str) -> Optional[dict]:
+        """Get the stored entry for a URL, if any"""
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+
+    def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> dict:
+        """Store a fresh response body and its validators"""
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": body_hash(text),
+            "body": text,
+            "fetched_at": datetime.now().isoformat(),
+        }
+        path = self._path(url)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % PRUNE_EVERY == 0
+            if prune:
+                self._prune()
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry for {url}: {e}")
+        return entry
+
+    def invalidate(self, url: str):
+        """Forget a URL so the next fetch is unconditional and counts as changed"""
+        try:
+            os.remove(self._path(url))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> dict:
+        """Build If-None-Match / If-Modified-Since headers from a stored entry"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def stats(self) -> dict:
+        """Hit/miss counters since process start"""
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,97 @@
+"""
+Background Job Service
+Runs scrape jobs as asyncio tasks and keeps their status for polling
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from ..utils import LRUCache
+from .scraper import scrape_and_save
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for status lookups
+MAX_JOB_HISTORY = 50
+
+_jobs = LRUCache(maxsize=MAX_JOB_HISTORY)
+_tasks: dict[str, asyncio.Task] = {}
+_active_job_id: Optional[str] = None
+
+
+def _new_job(trigger: str) -> dict:
+    return {
+        "job_id": uuid.uuid4().hex,
+        "status": "queued",
+        "trigger": trigger,
+        "created_at": datetime.now().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None,
+    }
+
+
+async def _run(job: dict):
+    global _active_job_id
+    job["status"] = "running"
+    job["started_at"] = datetime.now().isoformat()
+    try:
+        job["result"] = await scrape_and_save()
+        job["status"] = "succeeded"
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+        raise
+    except Exception as e:
+        logger.exception(f"Scrape job {job['job_id']} failed")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = datetime.now().isoformat()
+        _tasks.pop(job["job_id"], None)
+        if _active_job_id == job["job_id"]:
+            _active_job_id = None
+
+
+def start_scrape_job(trigger: str = "manual") -> dict:
+    """
+    Start a scrape in the background and return its job record.
+    Only one scrape runs at a time - if one is already running, that job is returned.
+    Must be called from the event loop.
+    """
+    global _active_job_id
+    if _active_job_id and _active_job_id in _tasks:
+        logger.info(f"Scrape job {_active_job_id} already running, not starting another ({trigger})")
+        return _jobs.get(_active_job_id)
+
+    job = _new_job(trigger)
+    _jobs.set(job["job_id"], job)
+    _active_job_id = job["job_id"]
+    _tasks[job["job_id"]] = asyncio.create_task(_run(job), name=f"scrape-{job['job_id']}")
+    logger.info(f"Started scrape job {job['job_id']} ({trigger})")
+    return job
+
+
+async def run_scrape_job(trigger: str = "scheduled") -> dict:
+    """Start (or join) a scrape job and wait for it to finish - used by the scheduler"""
+    job = start_scrape_job(trigger)
+    task = _tasks.get(job["job_id"])
+    if task:
+        await asyncio.shield(task)
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Get a job record by id"""
+    return _jobs.get(job_id)
+
+
+async def cancel_jobs():
+    """Cancel running jobs (on shutdown)"""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,191 @@
+"""
+Subscription Matching Service
+Subscription filters compiled once into normalized sets, plus an inverted index
+so matching articles against many subscriptions only checks candidate pairs
+"""
+
+import bisect
+import logging
+from dataclasses import dataclass
+from numbers import Real
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CompiledFilters:
+    """
+    A subscription's filters, normalized.
+    Filters schema:
+    {
+        "techStack": ["Python", "AI"],
+        "priority": ["CRITICAL", "HIGH"],
+        "alertThreshold": 50, # 0-100
+        "targetedEntities": ["Google", "Microsoft"]
+    }
+    """
+    threshold: float
+    priorities: frozenset
+    entities: frozenset
+    tech: frozenset
+
+
+@dataclass(frozen=True)
+class ArticleFeatures:
+    """The parts of an analysis row that filters look at, normalized"""
+    score: float  # relevance_score (1-10) on the 0-100 threshold scale
+    priority: str
+    entities: Optional[frozenset]  # None if the row's entity list is malformed
+    topics: Optional[frozenset]  # Mentioned technologies and categories
+
+
+def compile_filters(filters: Any) -> Optional[CompiledFilters]:
+    """Normalize subscription filters. Returns None for malformed filters, which never match"""
+    try:
+        threshold = filters.get("alertThreshold", 0)
+        if not isinstance(threshold, Real):
+            raise TypeError(f"alertThreshold {threshold!r} is not a number")
+        return CompiledFilters(
+            threshold=threshold,
+            priorities=frozenset(p.upper() for p in filters.get("priority", []) or []),
+            entities=frozenset(t.lower() for t in filters.get("targetedEntities", []) or []),
+            tech=frozenset(t.lower() for t in filters.get("techStack", []) or []),
+        )
+    except Exception as e:
+        logger.error(f"Error compiling subscription filters: {e}")
+        return None
+
+
+def article_features(article: dict) -> Optional[ArticleFeatures]:
+    """Normalize an analysis row for matching. Returns None for rows no subscription can match"""
+    try:
+        score = article.get("relevance_score", 0)
+        if not isinstance(score, Real):
+            raise TypeError(f"relevance_score {score!r} is not a number")
+        priority = article.get("priority", "").upper()
+    except Exception as e:
+        logger.error(f"Error reading article for matching: {e}")
+        return None
+
+    try:
+        entities = frozenset(e.get("name", "").lower() for e in article.get("affected_entities", []))
+    except Exception:
+        entities = None
+    try:
+        topics = frozenset(
+            [t.lower() for t in article.get("mentioned_technologies", [])]
+            + [c.lower() for c in article.get("categories", [])]
+        )
+    except Exception:
+        topics = None
+
+    return ArticleFeatures(score=score * 10, priority=priority, entities=entities, topics=topics)
+
+
+def matches(filters: CompiledFilters, article: ArticleFeatures) -> bool:
+    """Check compiled filters against a normalized article"""
+    # 1. Alert Threshold
+    if article.score < filters.threshold:
+        return False
+
+    # 2. Priority
+    if filters.priorities and article.priority not in filters.priorities:
+        return False
+
+    # 3. Targeted Entities
+    if filters.entities and (article.entities is None or filters.entities.isdisjoint(article.entities)):
+        return False
+
+    # 4. Tech Stack - critical articles go out regardless
+    if filters.tech:
+        if article.topics is None:
+            return False
+        if filters.tech.isdisjoint(article.topics) and article.priority != "CRITICAL":
+            return False
+
+    return True
+
+
+def match_subscription(article: dict, filters: dict) -> bool:
+    """Check if an article matches the subscription filters (see CompiledFilters for the schema)"""
+    compiled = compile_filters(filters)
+    features = article_features(article)
+    return compiled is not None and features is not None and matches(compiled, features)
+
+
+class SubscriptionMatcher:
+    """
+    Subscriptions compiled once and indexed by their most selective filter:
+    targeted entity, else tech stack, else priority, else only the alert
+    threshold (kept sorted so a bisect finds every subscription an article clears).
+    An article is only checked against subscriptions reachable from its own
+    entities, topics, priority and score.
+    """
+
+    def __init__(self, subscriptions: List[Dict[str, Any]]):
+        self.subscriptions = subscriptions
+        self._filters: List[Optional[CompiledFilters]] = []
+        self._by_entity: Dict[str, List[int]] = {}
+        self._by_tech: Dict[str, List[int]] = {}
+        self._tech_subs: List[int] = []  # Critical articles bypass the tech filter
+        self._by_priority: Dict[str, List[int]] = {}
+        self._thresholds: List[Tuple[float, int]] = []
+
+        for i, sub in enumerate(subscriptions):
+            compiled = compile_filters(sub.get("filters", {}))
+            self._filters.append(compiled)
+            if compiled is None:
+                continue
+            if compiled.entities:
+                for entity in compiled.entities:
+                    self._by_entity.setdefault(entity, []).append(i)
+            elif compiled.tech:
+                self._tech_subs.append(i)
+                for tech in compiled.tech:
+                    self._by_tech.setdefault(tech, []).append(i)
+            elif compiled.priorities:
+                for priority in compiled.priorities:
+                    self._by_priority.setdefault(priority, []).append(i)
+            else:
+                self._thresholds.append((compiled.threshold, i))
+        self._thresholds.sort()
+        self._threshold_keys = [threshold for threshold, _ in self._thresholds]
+
+    def candidates(self, article: ArticleFeatures) -> set[int]:
+        """Indexes of subscriptions that might match - a superset of the real matches"""
+        found = set()
+        for entity in article.entities or ():
+            found.update(self._by_entity.get(entity, ()))
+        if article.priority == "CRITICAL":
+            found.update(self._tech_subs)
+        else:
+            for topic in article.topics or ():
+                found.update(self._by_tech.get(topic, ()))
+        found.update(self._by_priority.get(article.priority, ()))
+        cleared = bisect.bisect_right(self._threshold_keys, article.score)
+        found.update(i for _, i in self._thresholds[:cleared])
+        return found
+
+    def match(self, article: dict) -> List[Dict[str, Any]]:
+        """Subscriptions matching one article"""
+        features = article_features(article)
+        if features is None:
+            return []
+        hits = sorted(i for i in self.candidates(features) if matches(self._filters[i], features))
+        return [self.subscriptions[i] for i in hits]
+
+    def match_all(self, articles: List[dict]) -> List[Tuple[Dict[str, Any], List[dict]]]:
+        """
+        (subscription, matching articles) for every subscription with at least one
+        match, in subscription order; articles keep their input order.
+        """
+        hits: Dict[int, List[dict]] = {}
+        for article in articles:
+            features = article_features(article)
+            if features is None:
+                continue
+            for i in self.candidates(features):
+                if matches(self._filters[i], features):
+                    hits.setdefault(i, []).append(article)
+        return [(self.subscriptions[i], hits[i]) for i in sorted(hits)]
@@ -3,16 +3,35 @@ Notification Service
 Handles sending notifications via Email and Slack based on user subscriptions.
 """
 
+import re
+import math
+import time
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
-from typing import List, Dict, Any
-
-from ..config import BREVO_API_KEY, EMAIL_FROM_ADDRESS, FRONTEND_URL
-from ..database import get_supabase
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple
+from slack_sdk.errors import SlackApiError
+from apscheduler.triggers.date import DateTrigger
+
+from ..config import (
+    BREVO_API_KEY, EMAIL_FROM_ADDRESS, BREVO_RATE_LIMIT, BREVO_BATCH_SIZE, BREVO_BATCH_LINGER,
+    EMAIL_CONCURRENCY, SLACK_CONCURRENCY, SLACK_CHANNEL_RATE, SLACK_WORKSPACE_RATE,
+    SLACK_DIGEST_WINDOW, SLACK_BATCH_LINGER,
+    SLACK_CONNECTION_TTL, SLACK_CONNECTION_CACHE_SIZE, DB_IN_CHUNK_SIZE,
+)
+from ..database import get_supabase, iter_pages, round_trips
+from ..utils.cache import TTLCache
 from ..models.article import ArticleAnalysis
-from .slack import send_slack_message, format_notification_blocks
+from .matching import SubscriptionMatcher, match_subscription
+from .renderer import format_article_html, format_email_wrapper, get_priority_color, get_renderer
+from .concurrency import TokenBucket, KeyedTokenBuckets
+from .outbox import DeliveryError, Outbox, delivery_key, get_outbox
+from .digests import DIGEST_FIELDS, clear_stale, get_digest_store, stale_since, week_of, week_start
+from .slack import post_slack_message, apost_slack_message, format_notification_blocks, format_alert_digest, alert_summary
 
 logger = logging.getLogger(__name__)
 
@@ -25,316 +44,702 @@ else:
     api_instance = None
 
 
-def match_subscription(article: dict, filters: dict) -> bool:
-    """
-    Check if an article matches the subscription filters.
-    Filters schema:
-    {
-        "techStack": ["Python", "AI"],
-        "priority": ["CRITICAL", "HIGH"],
-        "alertThreshold": 50, # 0-100
-        "targetedEntities": ["Google", "Microsoft"]
-    }
-    """
-    try:
-        # 1. Alert Threshold (relevance_score is 1-10, threshold is 0-100)
-        threshold = filters.get("alertThreshold", 0)
-        if (article.get("relevance_score", 0) * 10) < threshold:
-            return False
-
-        # 2. Priority
-        priorities = filters.get("priority", [])
-        article_priority = article.get("priority", "").upper()
-        if priorities:
-            normalized_priorities = [p.upper() for p in priorities]
-            if article_priority not in normalized_priorities:
-                return False
-
-        # 3. Targeted Entities
-        targeted = filters.get("targetedEntities", [])
-        if targeted:
-            article_entities = [e.get("name", "").lower() for e in article.get("affected_entities", [])]
-            if not any(t.lower() in article_entities for t in targeted):
-                return False
-
-        # 4. Tech Stack
-        tech_stack = filters.get("techStack", [])
-        if tech_stack:
-            article_tech = [t.lower() for t in article.get("mentioned_technologies", [])]
-            article_cats = [c.lower() for c in article.get("categories", [])]
-            
-            has_match = False
-            for tech in tech_stack:
-                t_lower = tech.lower()
-                if t_lower in article_tech or t_lower in article_cats:
-                    has_match = True
-                    break
-            
-            if not has_match and article_priority != "CRITICAL":
-                return False
+# Slack errors that retrying will not fix
+SLACK_PERMANENT_ERRORS = {
+    "channel_not_found", "not_in_channel", "is_archived", "invalid_auth",
+    "account_inactive", "token_revoked", "no_permission", "invalid_blocks",
+}
 
-        return True
 
-    except Exception as e:
-        logger.error(f"Error matching subscription: {e}")
-        return False
+SENDER = {"name": "CyberShepherd News", "email": EMAIL_FROM_ADDRESS}
+TEMPLATE_PARAM = re.compile(r"\{\{\s*params\.(\w+)\s*\}\}")
+
+
+def render_template(html_content: str, params: Optional[Dict[str, Any]]) -> str:
+    """Fill {{ params.x }} placeholders locally, as Brevo would for a message version"""
+    if not params:
+        return html_content
+    return TEMPLATE_PARAM.sub(lambda m: str(params.get(m.group(1), "")), html_content)
 
 
-def send_email(to_email: str, subject: str, html_content: str):
-    """Send an email using Brevo"""
+def _brevo_send(email: sib_api_v3_sdk.SendSmtpEmail):
+    """One Brevo transactional API call. Raises DeliveryError on failure"""
     if not api_instance:
-        logger.warning("BREVO_API_KEY not set, skipping email")
-        return
+        raise DeliveryError("BREVO_API_KEY not set", permanent=True)
 
     try:
-        sender = {"name": "CyberShepherd News", "email": EMAIL_FROM_ADDRESS}
-        to = [{"email": to_email}]
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            to=to,
-            sender=sender,
-            subject=subject,
-            html_content=html_content
-        )
-        
-        api_instance.send_transac_email(send_smtp_email)
-        logger.info(f"Email sent to {to_email}: {subject}")
+        return api_instance.send_transac_email(email)
     except ApiException as e:
-        logger.error(f"Failed to send email to {to_email}: {e}")
+        # 429 and 5xx are worth retrying; other 4xx (bad address, bad payload) are not
+        status = e.status or 0
+        retry_after = (e.headers or {}).get("Retry-After")
+        raise DeliveryError(
+            f"Brevo {status}: {e.reason}",
+            permanent=400 <= status < 500 and status != 429,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        ) from e
+
+
+def _send_email(to_email: str, subject: str, html_content: str):
+    """Send an email using Brevo. Raises DeliveryError on failure"""
+    _brevo_send(sib_api_v3_sdk.SendSmtpEmail(
+        to=[{"email": to_email}],
+        sender=SENDER,
+        subject=subject,
+        html_content=html_content
+    ))
+    logger.info(f"Email sent to {to_email}: {subject}")
+
+
+def send_email_batch(
+    subject: str,
+    html_content: str,
+    recipients: List[Tuple[str, Optional[Dict[str, Any]]]],
+    rate: Optional[TokenBucket] = None,
+) -> Tuple[List[Optional[Exception]], int]:
+    """
+    Send one template to many recipients, BREVO_BATCH_SIZE per Brevo request,
+    each as its own message version (recipients never see each other).
+    `recipients` are (email, params) pairs; params fill {{ params.x }} in the
+    template. A request Brevo rejects outright (e.g. one malformed address) is
+    retried as single sends, so one bad recipient does not fail the rest.
+    `rate` is charged once per API call.
+
+    Returns (per-recipient error or None, API calls made).
+    """
+    errors: List[Optional[Exception]] = [None] * len(recipients)
+    calls = 0
+
+    def call(email: sib_api_v3_sdk.SendSmtpEmail):
+        nonlocal calls
+        if rate is not None:
+            time.sleep(rate.reserve())
+        calls += 1
+        return _brevo_send(email)
+
+    def send_single(i: int):
+        to_email, params = recipients[i]
+        try:
+            call(sib_api_v3_sdk.SendSmtpEmail(
+                to=[{"email": to_email}],
+                sender=SENDER,
+                subject=subject,
+                html_content=render_template(html_content, params),
+            ))
+        except Exception as e:
+            errors[i] = e
+
+    # Brevo would also template anything else in {{ }} / {% %} - keep such content out of batches
+    batchable = not re.search(r"\{\{|\{%", TEMPLATE_PARAM.sub("", html_content))
+
+    for start in range(0, len(recipients), BREVO_BATCH_SIZE if batchable else 1):
+        chunk = range(start, min(start + BREVO_BATCH_SIZE, len(recipients)) if batchable else start + 1)
+        if len(chunk) == 1:
+            send_single(chunk[0])
+            continue
+        try:
+            call(sib_api_v3_sdk.SendSmtpEmail(
+                sender=SENDER,
+                subject=subject,
+                html_content=html_content,
+                message_versions=[
+                    sib_api_v3_sdk.SendSmtpEmailMessageVersions(to=[{"email": recipients[i][0]}], params=recipients[i][1] or None)
+                    for i in chunk
+                ],
+            ))
+        except DeliveryError as e:
+            if not e.permanent:
+                for i in chunk:
+                    errors[i] = e
+                continue
+            logger.warning(f"Brevo rejected a batch of {len(chunk)} ({e}), falling back to single sends")
+            for i in chunk:
+                send_single(i)
+        except Exception as e:
+            for i in chunk:
+                errors[i] = e
+
+    sent = errors.count(None)
+    logger.info(f"📧 {sent}/{len(recipients)} emails sent in {calls} Brevo call(s): {subject}")
+    return errors, calls
+
+
+def send_email(to_email: str, subject: str, html_content: str) -> bool:
+    """Send an email using Brevo right away (no outbox). Returns True if it was accepted"""
+    try:
+        _send_email(to_email, subject, html_content)
+        return True
+    except DeliveryError as e:
+        if not api_instance:
+            logger.warning("BREVO_API_KEY not set, skipping email")
+        else:
+            logger.error(f"Failed to send email to {to_email}: {e}")
     except Exception as e:
         logger.error(f"Unexpected error sending email: {e}")
+    return False
 
 
-def get_priority_color(priority: str) -> str:
-    """Get color code for priority level."""
-    return {
-        "CRITICAL": "#ef4444",
-        "HIGH": "#f59e0b",
-        "MEDIUM": "#eab308",
-        "LOW": "#22c55e",
-        "INFO": "#3b82f6"
-    }.get(priority.upper(), "#3b82f6")
-
-
-def format_email_wrapper(title: str, content: str, subtitle: str = "") -> str:
-    """Wrap content in branded email template."""
-    return f"""
-    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; background-color: #ffffff;">
-        <div style="text-align: center; margin-bottom: 32px;">
-            <h1 style="color: #10b981; font-size: 24px; margin: 0; letter-spacing: -0.5px;">🐑 CyberShepherd</h1>
-            <p style="color: #6b7280; margin: 4px 0 0 0; font-size: 14px;">Security Intelligence Report</p>
-        </div>
-        
-        <div style="margin-bottom: 24px; text-align: center;">
-            <h2 style="color: #111827; font-size: 20px; margin: 0 0 8px 0;">{title}</h2>
-            {f'<p style="color: #4b5563; margin: 0; font-size: 15px;">{subtitle}</p>' if subtitle else ''}
-        </div>
-
-        {content}
-        
-        <div style="text-align: center; margin-top: 32px; padding-top: 24px; border-top: 1px solid #e5e7eb;">
-            <p style="color: #9ca3af; font-size: 12px; margin: 0;">
-                Manage your subscriptions in your dashboard.
-            </p>
-            <p style="color: #9ca3af; font-size: 12px; margin: 8px 0 0 0;">
-                © {datetime.now().year} CyberShepherd. All rights reserved.
-            </p>
-        </div>
-    </div>
-    """
+def get_immediate_subscriptions() -> List[Dict[str, Any]]:
+    """Active immediate subscriptions, with the subscriber's email"""
+    return _get_subscriptions("immediate")
 
 
-def format_article_html(article: dict) -> str:
-    """Format a single article for email using card style."""
-    priority = article.get("priority", "INFO").upper()
-    priority_color = get_priority_color(priority)
-    
-    # Format key takeaways
-    takeaways = article.get("key_takeaways", [])
-    takeaways_html = ""
-    if takeaways:
-        takeaways_html = "<ul style='margin: 0; padding-left: 20px; color: #374151;'>"
-        for t in takeaways[:3]:
-            point = t.get("point", "") if isinstance(t, dict) else str(t)
-            takeaways_html += f"<li style='margin-bottom: 6px; font-size: 14px;'>{point}</li>"
-        takeaways_html += "</ul>"
-    
-    # Format technologies
-    technologies = article.get("mentioned_technologies", [])[:5]
-    tech_html = ""
-    if technologies:
-        tech_items = [
-            f'<span style="display: inline-block; background: #e0f2fe; color: #0369a1; padding: 2px 8px; border-radius: 12px; font-size: 11px; margin-right: 4px; margin-bottom: 4px; font-weight: 500;">{t}</span>'
-            for t in technologies
-        ]
-        tech_html = f"""
-        <div style="margin-top: 16px; padding-top: 16px; border-top: 1px solid #f3f4f6;">
-            <div style="margin-bottom: 8px; font-size: 11px; text-transform: uppercase; color: #6b7280; letter-spacing: 0.05em; font-weight: 600;">Technologies</div>
-            <div>{''.join(tech_items)}</div>
-        </div>
-        """
-
-    internal_url = f"{FRONTEND_URL}/article/{article.get('id')}"
-
-    return f"""
-    <div style="margin-bottom: 24px; border: 1px solid #e5e7eb; border-radius: 12px; overflow: hidden; box-shadow: 0 1px 2px rgba(0,0,0,0.05);">
-        <div style="padding: 20px; border-bottom: 1px solid #f3f4f6; background-color: #ffffff;">
-            <div style="display: flex; align-items: center; margin-bottom: 12px;">
-                <span style="background-color: {priority_color}15; color: {priority_color}; padding: 4px 10px; border-radius: 6px; font-size: 11px; font-weight: 700; letter-spacing: 0.05em;">
-                    {priority}
-                </span>
-                <span style="margin-left: auto; color: #6b7280; font-size: 12px; font-weight: 500;">
-                    Relevance: {article.get('relevance_score', 0)}/10
-                </span>
-            </div>
-            
-            <h3 style="margin: 0 0 8px 0; color: #111827; font-size: 18px; line-height: 1.4;">
-                <a href="{internal_url}" style="color: #111827; text-decoration: none;">
-                    {article.get('headline', 'No Headline')}
-                </a>
-            </h3>
-            
-            <p style="margin: 0; color: #4b5563; font-size: 14px; line-height: 1.6;">
-                {article.get('short_summary', '')}
-            </p>
-        </div>
-        
-        <div style="padding: 20px; background-color: #f9fafb;">
-            <div style="margin-bottom: 8px; font-size: 11px; text-transform: uppercase; color: #6b7280; letter-spacing: 0.05em; font-weight: 600;">
-                Key Takeaways
-            </div>
-            {takeaways_html}
-            {tech_html}
-        </div>
-        
-        <div style="padding: 12px 20px; background-color: #f0fdf4; border-top: 1px solid #dcfce7; text-align: center;">
-            <a href="{internal_url}" 
-               style="display: inline-block; background-color: #10b981; color: white; padding: 8px 16px; text-decoration: none; border-radius: 6px; font-size: 13px; font-weight: 600; margin-right: 12px;">
-               View Analysis
-            </a>
-            <a href="{article.get('article_url', '#')}" 
-               style="display: inline-block; color: #6b7280; text-decoration: none; font-size: 13px; font-weight: 500;">
-               Read Source →
-            </a>
-        </div>
-    </div>
-    """
+def get_weekly_subscriptions() -> List[Dict[str, Any]]:
+    """Active weekly subscriptions, with the subscriber's email"""
+    return _get_subscriptions("weekly")
 
 
-def process_notifications(articles: List[Dict[str, Any]]):
+def _get_subscriptions(frequency: str) -> List[Dict[str, Any]]:
+    supabase = get_supabase()
+    subs_response = supabase.table("subscriptions") \
+        .select("*, users:user_id(email)") \
+        .eq("is_active", True) \
+        .eq("frequency", frequency) \
+        .execute()
+    round_trips.read()
+    return subs_response.data
+
+
+def process_notifications(
+    articles: List[Dict[str, Any]],
+    matcher: Optional[SubscriptionMatcher] = None
+):
     """
     Process immediate notifications for new articles.
+    `articles` are the stored analysis rows. Pass a `matcher` built from
+    get_immediate_subscriptions() to reuse one load across several calls.
+    Follow-ups of a story subscribers were already alerted about (follow_up_of)
+    don't get an alert of their own; they reach the weekly digest instead.
     """
+    follow_ups = sum(1 for a in articles if a.get("follow_up_of"))
+    if follow_ups:
+        logger.info(f"🔗 Skipping {follow_ups} follow-up(s) of earlier alerts")
+        articles = [a for a in articles if not a.get("follow_up_of")]
     if not articles:
         return
 
     logger.info(f"Processing notifications for {len(articles)} new articles...")
-    supabase = get_supabase()
 
-    try:
-        subs_response = supabase.table("subscriptions") \
-            .select("*, users:user_id(email)") \
-            .eq("is_active", True) \
-            .eq("frequency", "immediate") \
-            .execute()
-        
-        subscriptions = subs_response.data
-    except Exception as e:
-        logger.error(f"Error fetching subscriptions: {e}")
-        return
+    if matcher is None:
+        try:
+            matcher = SubscriptionMatcher(get_immediate_subscriptions())
+        except Exception as e:
+            logger.error(f"Error fetching subscriptions: {e}")
+            return
 
-    if not subscriptions:
+    if not matcher.subscriptions:
         logger.info("No active immediate subscriptions found.")
         return
 
-    for sub in subscriptions:
-        matches = []
-        for article in articles:
-            if match_subscription(article, sub.get("filters", {})):
-                matches.append(article)
-        
-        if not matches:
-            continue
+    matched = matcher.match_all(articles)
+    slack_users = _known_slack_users(sub.get("user_id") for sub, _ in matched if "slack" in sub.get("channels", []))
 
+    queued = 0
+    for sub, matches in matched:
         channels = sub.get("channels", [])
         user_email = sub.get("users", {}).get("email")
         user_id = sub.get("user_id")
 
-        # Send Email notifications
+        # Queue Email notifications
         if "email" in channels and user_email:
             title = f"🚨 {len(matches)} New Security Alert{'s' if len(matches) > 1 else ''}"
-            content = "".join([format_article_html(a) for a in matches])
             subtitle = f"Found {len(matches)} article(s) matching \"{sub.get('name')}\""
             
-            html_body = format_email_wrapper(title, content, subtitle)
-            send_email(user_email, title, html_body)
+            # The subtitle is the only per-subscriber text, so subscribers alerted
+            # about the same articles share one template (and one Brevo request)
+            html_body = get_renderer().email(title, matches, "{{ params.subtitle }}")
+            key = delivery_key("email", sub.get("id"), *sorted(str(_article_key(a)) for a in matches))
+            queued += enqueue_email(key, user_email, title, html_body, {"subtitle": subtitle})
 
-        # Send Slack notifications
-        if "slack" in channels and user_id:
-            send_slack_notifications(user_id, matches)
+        # Queue Slack notifications
+        if "slack" in channels and user_id and (slack_users is None or user_id in slack_users):
+            window = sub.get("slack_digest_window")
+            queued += send_slack_notifications(user_id, matches, SLACK_DIGEST_WINDOW if window is None else window)
 
+    logger.info(f"📥 Queued {queued} notification deliveries")
 
-def send_slack_notifications(user_id: str, articles: List[Dict[str, Any]]):
+
+def _article_key(article: Dict[str, Any]) -> str:
+    """Stable identity of an analysis row for idempotency keys"""
+    return article.get("id") or article.get("article_url") or article.get("headline", "")
+
+
+def enqueue_email(key: str, to_email: str, subject: str, html_content: str, params: Optional[Dict[str, Any]] = None) -> bool:
     """
-    Send Slack notifications for matching articles.
-    Looks up user's Slack connection and sends messages.
+    Queue an email in the outbox. Returns False if `key` was already queued.
+    Put per-recipient text in `params` ({{ params.x }} in the html) so emails
+    that share the rest of the template go out in one Brevo request.
     """
-    supabase = get_supabase()
-    
+    return get_outbox().enqueue(key, "email", {"to": to_email, "subject": subject, "html": html_content, "params": params})
+
+
+def enqueue_slack(
+    key: str,
+    user_id: str,
+    blocks: List[Dict[str, Any]],
+    text: str,
+    article: Optional[Dict[str, Any]] = None,
+    delay: float = 0.0,
+) -> bool:
+    """
+    Queue a Slack message in the outbox. The user's connection is looked up at
+    delivery time, so tokens never sit in the queue.
+    Messages carrying an `article` (alert_summary) are alerts: ones due at the
+    same time for the same channel are posted as one digest.
+    """
+    payload = {"user_id": user_id, "blocks": blocks, "text": text}
+    if article is not None:
+        payload["article"] = article
+    return get_outbox().enqueue(key, "slack", payload, delay=delay)
+
+
+# user_id -> when the user's open Slack digest window closes
+_slack_windows: Dict[str, float] = {}
+_slack_windows_lock = threading.Lock()
+
+# Scheduler used to drain the outbox as soon as a digest window closes
+_scheduler = None
+
+
+def set_scheduler(scheduler):
+    """Set the scheduler instance"""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def _schedule_window_drain(closes: float):
+    """Drain the outbox when a digest window closes instead of at the next interval tick"""
+    if _scheduler is None:
+        return
     try:
-        # Get user's Slack connection
+        # Windows closing within the same second share one drain
+        _scheduler.add_job(
+            drain_notifications,
+            DateTrigger(run_date=datetime.fromtimestamp(math.ceil(closes))),
+            id=f"drain_slack_window_{math.ceil(closes)}",
+            name="Deliver Slack Digest",
+            replace_existing=True,
+        )
+    except Exception as e:
+        logger.error(f"Error scheduling Slack digest drain: {e}")
+
+
+def _slack_window_delay(user_id: str, window: float) -> float:
+    """
+    Seconds until `user_id`'s digest window closes, opening one if none is open.
+    Alerts queued while a window is open become due together, and a drain is
+    scheduled for when it closes. Windows live in this process only; after a
+    restart alerts just start a new one.
+    """
+    now = time.time()
+    with _slack_windows_lock:
+        closes = _slack_windows.get(user_id)
+        if closes is None or closes <= now:
+            if len(_slack_windows) >= SLACK_CONNECTION_CACHE_SIZE:
+                for u in [u for u, t in _slack_windows.items() if t <= now]:
+                    del _slack_windows[u]
+            closes = _slack_windows[user_id] = now + window
+            _schedule_window_drain(closes)
+    return closes - now
+
+
+# user_id -> connection, or None for users without a usable one
+_slack_connections = TTLCache(maxsize=SLACK_CONNECTION_CACHE_SIZE, ttl=SLACK_CONNECTION_TTL)
+
+# Errors after which the cached connection is stale
+SLACK_CONNECTION_ERRORS = {"invalid_auth", "account_inactive", "token_revoked", "channel_not_found", "not_in_channel", "is_archived"}
+
+
+def get_slack_connections(user_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Slack connections for many users at once: cached ones from memory (for
+    SLACK_CONNECTION_TTL seconds), the rest in one query per DB_IN_CHUNK_SIZE
+    users. Users who have not (fully) connected Slack map to None.
+    """
+    user_ids = {u for u in user_ids if u}
+    connections = _slack_connections.get_many(user_ids)
+    missing = sorted(user_ids - connections.keys())
+    if not missing:
+        return connections
+
+    supabase = get_supabase()
+    for start in range(0, len(missing), DB_IN_CHUNK_SIZE):
+        chunk = missing[start:start + DB_IN_CHUNK_SIZE]
         result = supabase.table("slack_connections") \
-            .select("access_token, channel_id, channel_name") \
-            .eq("user_id", user_id) \
-            .single() \
+            .select("user_id, access_token, channel_id, channel_name, team_id") \
+            .in_("user_id", chunk) \
             .execute()
-        
-        if not result.data:
-            logger.debug(f"No Slack connection for user {user_id}")
-            return
-        
-        slack_data = result.data
-        access_token = slack_data.get("access_token")
-        channel_id = slack_data.get("channel_id")
-        
-        if not access_token or not channel_id:
-            logger.debug(f"Slack not fully configured for user {user_id}")
-            return
-        
-        # Send each article as a separate message
-        for article in articles:
-            blocks = format_notification_blocks(article)
-            fallback_text = f"🚨 {article.get('headline', 'New Alert')}"
-            
-            success = send_slack_message(
-                access_token=access_token,
-                channel_id=channel_id,
-                blocks=blocks,
-                text=fallback_text,
-            )
-            
-            if success:
-                logger.info(f"Slack notification sent for article: {article.get('headline', 'Unknown')[:50]}")
-            else:
-                logger.warning(f"Failed to send Slack notification for article: {article.get('headline', 'Unknown')[:50]}")
-                
+        round_trips.read()
+        rows = {row["user_id"]: row for row in result.data or []}
+        for user_id in chunk:
+            connection = rows.get(user_id)
+            if not connection or not connection.get("access_token") or not connection.get("channel_id"):
+                connection = None
+            _slack_connections.set(user_id, connection)
+            connections[user_id] = connection
+    return connections
+
+
+def get_slack_connection(user_id: str) -> Optional[Dict[str, Any]]:
+    """The user's Slack connection, or None if they have not (fully) connected Slack"""
+    return get_slack_connections([user_id]).get(user_id)
+
+
+def invalidate_slack_connection(user_id: str):
+    """Forget a cached connection after the user connects, changes channel or disconnects"""
+    _slack_connections.discard(user_id)
+
+
+def _known_slack_users(user_ids: Iterable[str]) -> Optional[set]:
+    """
+    Users among `user_ids` with a usable Slack connection, loaded in one go so
+    nothing is queued for users without one. None if the lookup failed - then
+    everything is queued and resolved at delivery time.
+    """
+    try:
+        return {u for u, connection in get_slack_connections(user_ids).items() if connection}
+    except Exception as e:
+        logger.error(f"Error loading Slack connections: {e}")
+        return None
+
+
+def _slack_delivery_error(user_id: str, e: SlackApiError) -> DeliveryError:
+    """Map a Slack API error to the outbox's retry decision"""
+    error = e.response.get("error", "unknown_error")
+    if error in SLACK_CONNECTION_ERRORS:
+        invalidate_slack_connection(user_id)
+    retry_after = e.response.headers.get("Retry-After") if error == "ratelimited" else None
+    return DeliveryError(
+        f"Slack {error}",
+        permanent=error in SLACK_PERMANENT_ERRORS,
+        retry_after=float(retry_after) if retry_after else None,
+    )
+
+
+def deliver_slack(payload: Dict[str, Any], connection: Optional[Dict[str, Any]] = None):
+    """Send one queued Slack message through the user's connection"""
+    user_id = payload["user_id"]
+    connection = connection or get_slack_connection(user_id)
+    if connection is None:
+        raise DeliveryError(f"Slack not configured for user {user_id}", permanent=True)
+
+    try:
+        post_slack_message(
+            access_token=connection["access_token"],
+            channel_id=connection["channel_id"],
+            blocks=payload["blocks"],
+            text=payload.get("text"),
+        )
+    except SlackApiError as e:
+        raise _slack_delivery_error(user_id, e) from e
+
+
+async def adeliver_slack(payload: Dict[str, Any], connection: Optional[Dict[str, Any]] = None):
+    """deliver_slack for the dispatcher: posts on the event loop over a kept-alive session"""
+    user_id = payload["user_id"]
+    connection = connection or await asyncio.to_thread(get_slack_connection, user_id)
+    if connection is None:
+        raise DeliveryError(f"Slack not configured for user {user_id}", permanent=True)
+
+    try:
+        await apost_slack_message(
+            access_token=connection["access_token"],
+            channel_id=connection["channel_id"],
+            blocks=payload["blocks"],
+            text=payload.get("text"),
+        )
+    except SlackApiError as e:
+        raise _slack_delivery_error(user_id, e) from e
+
+
+def coalesce_slack(payloads: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], List[int]]]:
+    """
+    Merge Slack deliveries bound for one channel into the messages to post.
+    Alerts (payloads with an `article`) become digest messages, split to stay
+    under Slack's block limit, and the same article queued for two users of the
+    channel is posted once. Other payloads go out unchanged.
+    Returns (message payload, indexes of the deliveries it covers) pairs.
+    """
+    messages = [(payload, [i]) for i, payload in enumerate(payloads) if "article" not in payload]
+
+    articles: Dict[str, Tuple[int, List[int]]] = {}  # Article key -> (first payload, covered deliveries)
+    for i, payload in enumerate(payloads):
+        if "article" in payload:
+            articles.setdefault(str(_article_key(payload["article"])), (i, []))[1].append(i)
+    if len(articles) == 1:
+        first, covered = next(iter(articles.values()))
+        messages.append((payloads[first], covered))
+    elif articles:
+        user_id = payloads[next(iter(articles.values()))[0]]["user_id"]
+        for digest in format_alert_digest([payloads[first]["article"] for first, _ in articles.values()]):
+            covered = [i for article in digest["articles"] for i in articles[str(_article_key(article))][1]]
+            messages.append(({"user_id": user_id, "blocks": digest["blocks"], "text": digest["text"]}, covered))
+    return messages
+
+
+class NotificationDispatcher:
+    """
+    Async fan-out of outbox deliveries. Email and Slack go out in parallel, each
+    with its own request concurrency and token bucket; Slack messages are also
+    spaced per workspace and per channel (Slack allows about 1 message/sec/channel),
+    and alerts due together for a channel are posted as one digest.
+    Rate buckets persist across drains, request slots are per drain.
+    """
+
+    def __init__(
+        self,
+        send_email_batch: Callable[..., Tuple[List[Optional[Exception]], int]] = send_email_batch,
+        send_slack: Callable[[Dict[str, Any], Dict[str, Any]], Any] = adeliver_slack,
+        slack_connection: Callable[[str], Optional[Dict[str, Any]]] = get_slack_connection,
+        slack_connections: Callable[[Iterable[str]], Dict[str, Any]] = get_slack_connections,
+    ):
+        self.send_email_batch = send_email_batch
+        self.send_slack = send_slack
+        self.slack_connection = slack_connection
+        self.slack_connections = slack_connections
+        self.email_rate = TokenBucket(BREVO_RATE_LIMIT, burst=BREVO_RATE_LIMIT)
+        self.slack_workspaces = KeyedTokenBuckets(SLACK_WORKSPACE_RATE, burst=SLACK_WORKSPACE_RATE)
+        self.slack_channels = KeyedTokenBuckets(SLACK_CHANNEL_RATE)
+        self.emails = 0
+        self.email_api_calls = 0
+        self.slack_deliveries = 0
+        self.slack_posts = 0
+
+    async def drain(self, outbox: Optional[Outbox] = None) -> Dict[str, int]:
+        """
+        Send every queued notification that is due, then forget old finished ones.
+        Emails sharing a subject and template are collected for BREVO_BATCH_LINGER
+        seconds and sent as message versions of one Brevo request.
+        """
+        outbox = outbox or get_outbox()
+
+        # Warm the connection cache for every due Slack delivery in one go, so
+        # per-delivery lookups below are memory hits
+        slack_payloads = await asyncio.to_thread(outbox.due_payloads, "slack")
+        if slack_payloads:
+            try:
+                await asyncio.to_thread(self.slack_connections, {p["user_id"] for p in slack_payloads})
+            except Exception as e:
+                logger.error(f"Error loading Slack connections: {e}")
+
+        email_slots = asyncio.Semaphore(EMAIL_CONCURRENCY)
+        slack_slots = asyncio.Semaphore(SLACK_CONCURRENCY)
+        channel_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        email_groups: Dict[Tuple[str, str], List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        slack_groups: Dict[str, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        flushes: set[asyncio.Task] = set()
+        run = {"emails": 0, "calls": 0, "slack": 0, "posts": 0}
+
+        async def flush(key: Tuple[str, str]):
+            await asyncio.sleep(BREVO_BATCH_LINGER)
+            group = email_groups.pop(key)
+            try:
+                recipients = [(payload["to"], payload.get("params")) for payload, _ in group]
+                async with email_slots:
+                    errors, calls = await asyncio.to_thread(self.send_email_batch, key[0], key[1], recipients, self.email_rate)
+                run["emails"] += len(group)
+                run["calls"] += calls
+                for (_, future), error in zip(group, errors):
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+            except Exception as e:
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+
+        async def email(payload: Dict[str, Any]):
+            key = (payload["subject"], payload["html"])
+            if key not in email_groups:
+                email_groups[key] = []
+                task = asyncio.create_task(flush(key))
+                flushes.add(task)
+                task.add_done_callback(flushes.discard)
+            future = asyncio.get_running_loop().create_future()
+            email_groups[key].append((payload, future))
+            await future
+
+        async def post(payload: Dict[str, Any], connection: Dict[str, Any]):
+            # One message at a time per channel. The channel token is taken once a
+            # request slot is free, so waiting for a slot cannot bunch messages up;
+            # the wait beforehand keeps that slot from being held while paced.
+            channel = connection["channel_id"]
+            async with channel_locks[channel]:
+                channel_rate = self.slack_channels.get(channel)
+                await asyncio.sleep(channel_rate.delay())
+                await self.slack_workspaces.acquire(connection.get("team_id") or connection["access_token"])
+                async with slack_slots:
+                    await channel_rate.acquire()
+                    if asyncio.iscoroutinefunction(self.send_slack):
+                        await self.send_slack(payload, connection)
+                    else:
+                        await asyncio.to_thread(self.send_slack, payload, connection)
+
+        async def flush_slack(channel: str, connection: Dict[str, Any]):
+            await asyncio.sleep(SLACK_BATCH_LINGER)
+            group = slack_groups.pop(channel)
+            try:
+                for payload, covered in coalesce_slack([payload for payload, _ in group]):
+                    try:
+                        await post(payload, connection)
+                        run["posts"] += 1
+                    except Exception as e:
+                        for i in covered:
+                            group[i][1].set_exception(e)
+                    else:
+                        for i in covered:
+                            group[i][1].set_result(None)
+                run["slack"] += len(group)
+            except Exception as e:
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+
+        async def slack(payload: Dict[str, Any]):
+            async with slack_slots:
+                connection = await asyncio.to_thread(self.slack_connection, payload["user_id"])
+            if connection is None:
+                raise DeliveryError(f"Slack not configured for user {payload['user_id']}", permanent=True)
+            channel = connection["channel_id"]
+            if channel not in slack_groups:
+                slack_groups[channel] = []
+                task = asyncio.create_task(flush_slack(channel, connection))
+                flushes.add(task)
+                task.add_done_callback(flushes.discard)
+            future = asyncio.get_running_loop().create_future()
+            slack_groups[channel].append((payload, future))
+            await future
+
+        result = await outbox.drain({"email": email, "slack": slack})
+        await asyncio.to_thread(outbox.prune)
+
+        self.emails += run["emails"]
+        self.email_api_calls += run["calls"]
+        result["email_api_calls"] = run["calls"]
+        result["email_api_calls_saved"] = run["emails"] - run["calls"]
+        self.slack_deliveries += run["slack"]
+        self.slack_posts += run["posts"]
+        result["slack_posts"] = run["posts"]
+        if run["emails"]:
+            logger.info(f"📧 {run['emails']} emails in {run['calls']} Brevo calls ({result['email_api_calls_saved']} saved by batching)")
+        if run["slack"]:
+            logger.info(f"💬 {run['slack']} Slack deliveries in {run['posts']} posts")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "emails": self.emails,
+            "email_api_calls": self.email_api_calls,
+            "email_api_calls_saved": self.emails - self.email_api_calls,
+            "email_rate": BREVO_RATE_LIMIT,
+            "email_wait_seconds": round(self.email_rate.waited, 1),
+            "slack_deliveries": self.slack_deliveries,
+            "slack_posts": self.slack_posts,
+            "slack_channel_rate": SLACK_CHANNEL_RATE,
+            "slack_workspace_rate": SLACK_WORKSPACE_RATE,
+            "slack_channels_tracked": len(self.slack_channels),
+            "slack_workspaces_tracked": len(self.slack_workspaces),
+        }
+
+
+dispatcher = NotificationDispatcher()
+
+
+async def drain_notifications() -> Dict[str, int]:
+    """Send every queued notification that is due (see NotificationDispatcher)"""
+    return await dispatcher.drain()
+
+
+def send_slack_notifications(user_id: str, articles: List[Dict[str, Any]], window: float = SLACK_DIGEST_WINDOW) -> int:
+    """
+    Queue Slack notifications for matching articles, one delivery per article.
+    With a `window` (seconds), the alerts wait for the user's digest window to
+    close and go out merged with the others queued for the channel meanwhile;
+    an article that ends up alone is posted as its full card. With window 0
+    every article is posted straight away as its own message.
+    A user with several matching subscriptions still gets each article once.
+    Returns the number of newly queued messages.
+    """
+    delay = _slack_window_delay(user_id, window) if window > 0 else 0.0
+    queued = 0
+    for article in articles:
+        blocks = format_notification_blocks(article)
+        fallback_text = f"🚨 {article.get('headline', 'New Alert')}"
+        queued += enqueue_slack(
+            delivery_key("slack", user_id, _article_key(article)), user_id, blocks, fallback_text,
+            article=alert_summary(article) if window > 0 else None,
+            delay=delay,
+        )
+    return queued
+
+
+def track_weekly_digests(articles: List[Dict[str, Any]], matcher: Optional[SubscriptionMatcher] = None) -> int:
+    """
+    Add newly analyzed articles to the running weekly digests of the weekly
+    subscriptions they match. `matcher` is built from get_weekly_subscriptions()
+    (pass one to reuse it across calls). Returns how many made a digest's top list.
+    """
+    if not articles:
+        return 0
+    if matcher is None:
+        try:
+            matcher = SubscriptionMatcher(get_weekly_subscriptions())
+        except Exception as e:
+            logger.error(f"Error fetching weekly subscriptions: {e}")
+            return 0
+    if not matcher.subscriptions:
+        return 0
+    return get_digest_store().record(matcher.match_all(articles))
+
+
+# Columns the weekly matcher and the digest need
+WEEKLY_DIGEST_COLUMNS = ", ".join(DIGEST_FIELDS + ("affected_entities", "categories"))
+
+
+def rebuild_weekly_digests(week: str, matcher: SubscriptionMatcher) -> int:
+    """
+    Recompute a week's digests from the database, for weeks the store did not
+    see in full (e.g. right after it was introduced, or flagged stale by
+    mark_digests_stale). Reads a page at a time between UTC week bounds, then
+    clears the week's stale flag. Returns the number of analyses read.
+    """
+    store = get_digest_store()
+    store.reset(week)
+    started = datetime.now(timezone.utc)
+    start = week_start(week)
+    end = start + timedelta(days=7)
+
+    read = 0
+    for rows in iter_pages(
+        "article_analyses",
+        WEEKLY_DIGEST_COLUMNS,
+        where=lambda q: q.gte("analyzed_at", start.isoformat()).lt("analyzed_at", end.isoformat()),
+    ):
+        store.record(matcher.match_all(rows), week)
+        read += len(rows)
+
+    store.mark_rebuilt(week)
+    try:
+        clear_stale(week, started)
     except Exception as e:
-        logger.error(f"Error sending Slack notifications: {e}")
+        logger.error(f"Error clearing stale flag for {week}: {e}")  # Next run just rebuilds again
+    logger.info(f"📅 Rebuilt weekly digests for {week} from {read} analyses")
+    return read
 
 
 def send_weekly_summaries():
     """
-    Send weekly summaries to subscribed users.
+    Send last week's digests to weekly subscribers.
+    The digests are kept up to date as articles are analyzed (see
+    track_weekly_digests), so this only renders and queues them - unless the
+    week is flagged stale in the database or predates the store, in which
+    case it is rebuilt first.
     """
     logger.info("Sending weekly summaries...")
-    supabase = get_supabase()
-    
+
     try:
-        subs_response = supabase.table("subscriptions") \
-            .select("*, users:user_id(email)") \
-            .eq("is_active", True) \
-            .eq("frequency", "weekly") \
-            .execute()
-        subscriptions = subs_response.data
+        subscriptions = get_weekly_subscriptions()
     except Exception as e:
         logger.error(f"Error fetching weekly subscriptions: {e}")
         return
@@ -342,33 +747,34 @@ def send_weekly_summaries():
     if not subscriptions:
         return
 
-    seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
+    # The digest of the ISO week that just ended, once per subscription however often this runs
+    week = week_of(datetime.now(timezone.utc) - timedelta(days=7))
+    store = get_digest_store()
     try:
-        articles_response = supabase.table("article_analyses") \
-            .select("*") \
-            .gte("analyzed_at", seven_days_ago) \
-            .execute()
-        recent_articles = articles_response.data
+        stale = stale_since(week)
     except Exception as e:
-        logger.error(f"Error fetching recent articles: {e}")
-        return
-
-    if not recent_articles:
-        logger.info("No articles from last 7 days.")
-        return
+        logger.error(f"Error checking weekly digests for outside saves: {e}")
+        stale = "unknown"  # Can't tell - rebuilding is always correct
+    if stale or not store.covers(week):
+        try:
+            rebuild_weekly_digests(week, SubscriptionMatcher(subscriptions))
+        except Exception as e:
+            logger.error(f"Error rebuilding weekly digests: {e}")
+            return
 
+    digests = []
     for sub in subscriptions:
-        matches = []
-        for article in recent_articles:
-            if match_subscription(article, sub.get("filters", {})):
-                matches.append(article)
-        
-        if not matches:
-            continue
+        top_matches, total = store.digest(sub.get("id"), week)
+        if top_matches:
+            digests.append((sub, top_matches, total))
+
+    if not digests:
+        logger.info(f"No articles matched weekly subscriptions in {week}.")
+        return
 
-        matches.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
-        top_matches = matches[:10]
+    slack_users = _known_slack_users(sub.get("user_id") for sub, _, _ in digests if "slack" in sub.get("channels", []))
 
+    for sub, top_matches, total in digests:
         user_email = sub.get("users", {}).get("email")
         user_id = sub.get("user_id")
         channels = sub.get("channels", [])
@@ -378,10 +784,10 @@ def send_weekly_summaries():
             title = f"📅 Weekly Security Digest"
             subtitle = f"Top stories for \"{sub.get('name')}\""
             
-            content = "".join([format_article_html(a) for a in top_matches])
+            content = get_renderer().cards(top_matches)
             
-            if len(matches) > len(top_matches):
-                remaining = len(matches) - len(top_matches)
+            if total > len(top_matches):
+                remaining = total - len(top_matches)
                 content += f"""
                 <div style="text-align: center; padding: 20px; background-color: #f9fafb; border-radius: 8px; color: #6b7280; font-size: 14px;">
                     And {remaining} more articles... <br>
@@ -389,38 +795,22 @@ def send_weekly_summaries():
                 </div>
                 """
                 
-            html_body = format_email_wrapper(title, content, subtitle)
-            send_email(user_email, f"{title}: {len(matches)} Articles", html_body)
+            html_body = format_email_wrapper(title, content, "{{ params.subtitle }}")
+            enqueue_email(delivery_key("weekly-email", sub.get("id"), week), user_email, f"{title}: {total} Articles", html_body, {"subtitle": subtitle})
         
-        # Send Slack digest
-        if "slack" in channels and user_id:
-            send_slack_weekly_digest(user_id, sub.get('name', 'Weekly Digest'), top_matches, len(matches))
+        # Queue Slack digest
+        if "slack" in channels and user_id and (slack_users is None or user_id in slack_users):
+            send_slack_weekly_digest(user_id, sub.get('name', 'Weekly Digest'), top_matches, total, key=delivery_key("weekly-slack", sub.get("id"), week))
 
-    logger.info("Weekly summaries sent.")
+    store.prune()
+    logger.info(f"Weekly summaries for {week} queued.")
 
 
-def send_slack_weekly_digest(user_id: str, sub_name: str, articles: List[Dict[str, Any]], total_count: int):
+def send_slack_weekly_digest(user_id: str, sub_name: str, articles: List[Dict[str, Any]], total_count: int, key: Optional[str] = None):
     """
-    Send weekly Slack digest with top articles.
+    Queue a weekly Slack digest with top articles.
     """
-    supabase = get_supabase()
-    
     try:
-        result = supabase.table("slack_connections") \
-            .select("access_token, channel_id") \
-            .eq("user_id", user_id) \
-            .single() \
-            .execute()
-        
-        if not result.data:
-            return
-        
-        access_token = result.data.get("access_token")
-        channel_id = result.data.get("channel_id")
-        
-        if not access_token or not channel_id:
-            return
-        
         # Build digest blocks
         blocks = [
             {
@@ -469,12 +859,12 @@ def send_slack_weekly_digest(user_id: str, sub_name: str, articles: List[Dict[st
             "elements": [{"type": "mrkdwn", "text": "📰 _CyberShepherd Weekly Digest_"}]
         })
         
-        send_slack_message(
-            access_token=access_token,
-            channel_id=channel_id,
-            blocks=blocks,
-            text=f"📅 Weekly Digest: {len(articles)} articles matching '{sub_name}'",
+        enqueue_slack(
+            key or delivery_key("weekly-slack", user_id, sub_name, datetime.now().date().isoformat()),
+            user_id,
+            blocks,
+            f"📅 Weekly Digest: {len(articles)} articles matching '{sub_name}'",
         )
         
     except Exception as e:
-        logger.error(f"Error sending Slack weekly digest: {e}")
+        logger.error(f"Error queueing Slack weekly digest: {e}")
@@ -0,0 +1,274 @@
+"""
+OpenAI Batch Service
+Submits article analyses through the Batch API (half price, no rate-limit fights)
+and ingests the results. Run state is kept on disk so an interrupted run resumes
+where it stopped instead of paying for the same requests twice.
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Optional
+
+from openai import AsyncOpenAI
+
+from ..config import OPENAI_API_KEY, OPENAI_MODEL, BATCH_DIR, BATCH_MAX_REQUESTS, BATCH_POLL_INTERVAL
+from ..models.article import ArticleAnalysis
+from .analyzer import get_analyzer, save_analysis
+from .digests import mark_digests_stale
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def get_batch_client() -> AsyncOpenAI:
+    """OpenAI client for the Batch API - honours OPENAI_BASE_URL, e.g. the local stub server"""
+    return AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+
+def parse_result_line(line: dict) -> tuple[str, Optional[ArticleAnalysis], Optional[str]]:
+    """
+    One line of a batch output/error file.
+    Returns (custom_id, analysis, error)
+    """
+    custom_id = line.get("custom_id", "")
+    if line.get("error"):
+        return custom_id, None, str(line["error"].get("message") or line["error"])
+
+    response = line.get("response") or {}
+    if response.get("status_code") != 200:
+        return custom_id, None, f"HTTP {response.get('status_code')}"
+
+    try:
+        message = response["body"]["choices"][0]["message"]
+        if message.get("refusal"):
+            return custom_id, None, f"Refused: {message['refusal']}"
+        return custom_id, ArticleAnalysis.model_validate_json(message["content"]), None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return custom_id, None, f"Unparseable response: {e}"
+
+
+class BatchRun:
+    """
+    One backfill submitted as one or more Batch API jobs.
+    State lives in BATCH_DIR/<run_id>/state.json and is rewritten after every step.
+    """
+
+    def __init__(self, run_id: str, directory: str = BATCH_DIR):
+        self.run_id = run_id
+        self.directory = os.path.join(directory, run_id)
+        self.state_path = os.path.join(self.directory, "state.json")
+        self.state: dict = {}
+
+    # ------------------------------------------------------------------ state
+
+    @classmethod
+    def create(
+        cls,
+        articles: list[dict],
+        model: str = OPENAI_MODEL,
+        max_requests: int = BATCH_MAX_REQUESTS,
+        directory: str = BATCH_DIR,
+    ) -> "BatchRun":
+        """
+        Write JSONL input files for `articles` (dicts with id, url, title, text, is_sponsored).
+        Nothing is sent until submit().
+        """
+        run = cls(datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6], directory)
+        os.makedirs(run.directory, exist_ok=True)
+        analyzer = get_analyzer(model)
+
+        run.state = {
+            "run_id": run.run_id,
+            "model": model,
+            "created_at": datetime.now().isoformat(),
+            "articles": {},
+            "parts": [],
+            "ingested_ids": [],
+            "failed": {},
+        }
+
+        for start in range(0, len(articles), max_requests):
+            path = os.path.join(run.directory, f"part-{len(run.state['parts']):03d}.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for article in articles[start:start + max_requests]:
+                    custom_id = f"article-{article['id']}"
+                    body = analyzer.request_body(
+                        title=article.get("title", ""),
+                        content=article.get("text", ""),
+                        url=article.get("url", ""),
+                        is_sponsored=article.get("is_sponsored", False)
+                    )
+                    f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}) + "\n")
+                    run.state["articles"][custom_id] = {
+                        "id": article["id"],
+                        "url": article.get("url"),
+                        "title": article.get("title"),
+                        "is_sponsored": article.get("is_sponsored", False),
+                    }
+            run.state["parts"].append({"file": os.path.basename(path), "batch_id": None, "status": "pending"})
+
+        run.save()
+        logger.info(f"Batch run {run.run_id}: {len(articles)} requests in {len(run.state['parts'])} file(s), {analyzer.tokens_saved} tokens saved by preprocessing")
+        return run
+
+    @classmethod
+    def load(cls, run_id: str, directory: str = BATCH_DIR) -> "BatchRun":
+        run = cls(run_id, directory)
+        with open(run.state_path, encoding="utf-8") as f:
+            run.state = json.load(f)
+        return run
+
+    @classmethod
+    def latest_unfinished(cls, directory: str = BATCH_DIR) -> Optional["BatchRun"]:
+        """Most recent run with batches that are not yet ingested"""
+        if not os.path.isdir(directory):
+            return None
+        for run_id in sorted(os.listdir(directory), reverse=True):
+            if os.path.exists(os.path.join(directory, run_id, "state.json")):
+                run = cls.load(run_id, directory)
+                if not run.finished:
+                    return run
+        return None
+
+    def save(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def finished(self) -> bool:
+        return all(part.get("ingested") for part in self.state["parts"])
+
+    # ------------------------------------------------------------------ steps
+
+    async def submit(self, client: AsyncOpenAI):
+        """Upload and create a batch for every part that has none yet"""
+        for part in self.state["parts"]:
+            if part["batch_id"]:
+                continue
+            with open(os.path.join(self.directory, part["file"]), "rb") as f:
+                uploaded = await client.files.create(file=(part["file"], f.read()), purpose="batch")
+            batch = await client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window="24h",
+                metadata={"run_id": self.run_id, "part": part["file"]},
+            )
+            part.update(input_file_id=uploaded.id, batch_id=batch.id, status=batch.status)
+            self.save()  # Persist the id before anything else can fail
+            logger.info(f"Submitted {part['file']} as batch {batch.id}")
+
+    async def poll(self, client: AsyncOpenAI, interval: float = BATCH_POLL_INTERVAL):
+        """Wait until every submitted batch reaches a final status"""
+        while True:
+            waiting = 0
+            for part in self.state["parts"]:
+                if not part["batch_id"] or part["status"] in FINAL_STATUSES:
+                    continue
+                batch = await client.batches.retrieve(part["batch_id"])
+                if batch.status != part["status"]:
+                    counts = batch.request_counts
+                    progress = f" ({counts.completed}/{counts.total})" if counts else ""
+                    logger.info(f"Batch {batch.id}: {part['status']} -> {batch.status}{progress}")
+                part.update(status=batch.status, output_file_id=batch.output_file_id, error_file_id=batch.error_file_id)
+                if batch.status not in FINAL_STATUSES:
+                    waiting += 1
+            self.save()
+            if not waiting:
+                return
+            await asyncio.sleep(interval)
+
+    async def ingest(
+        self,
+        client: AsyncOpenAI,
+        save: Callable[..., Optional[dict]] = save_analysis,
+    ) -> tuple[int, int]:
+        """
+        Save results of finished batches into article_analyses.
+        Already-ingested requests are skipped, so this is safe to re-run.
+        The weeks they land in are flagged for a weekly digest rebuild.
+        Returns (saved, errors)
+        """
+        ingested = set(self.state["ingested_ids"])
+        saved = errors = 0
+
+        for part in self.state["parts"]:
+            if part.get("ingested") or part["status"] not in FINAL_STATUSES:
+                continue
+
+            rows = []
+            lines = []
+            for file_id in (part.get("output_file_id"), part.get("error_file_id")):
+                if file_id:
+                    content = await client.files.content(file_id)
+                    lines += [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+            for line in lines:
+                custom_id, analysis, error = parse_result_line(line)
+                if custom_id in ingested:
+                    continue
+                article = self.state["articles"].get(custom_id)
+                if article is None:
+                    continue
+
+                if analysis is None:
+                    errors += 1
+                    self.state["failed"][custom_id] = error
+                    logger.error(f"❌ {article['title'][:50]}: {error}")
+                    continue
+
+                analysis.is_sponsored = article["is_sponsored"]
+                try:
+                    row = await asyncio.to_thread(
+                        save,
+                        analysis=analysis,
+                        article_url=article["url"],
+                        article_title=article["title"],
+                        article_id=article["id"],
+                        model_used=self.state["model"]
+                    )
+                except Exception as e:
+                    errors += 1
+                    self.state["failed"][custom_id] = str(e)
+                    logger.error(f"❌ Save failed for {article['url']}: {e}")
+                    continue
+
+                saved += 1
+                rows.append(row)
+                ingested.add(custom_id)
+                self.state["ingested_ids"].append(custom_id)
+                self.state["failed"].pop(custom_id, None)
+
+            # Expired/cancelled batches still carry partial output - requests without
+            # a result stay unanalyzed and are picked up by the next run
+            part["ingested"] = True
+            self.save()
+            if rows:
+                await asyncio.to_thread(mark_digests_stale, rows)
+
+        return saved, errors
+
+    async def run(self, client: Optional[AsyncOpenAI] = None, poll_interval: float = BATCH_POLL_INTERVAL) -> tuple[int, int]:
+        """submit -> poll -> ingest; each step picks up wherever the saved state left off"""
+        client = client or get_batch_client()
+        await self.submit(client)
+        await self.poll(client, poll_interval)
+        return await self.ingest(client)
+
+
+async def resume_unfinished(client: Optional[AsyncOpenAI] = None, poll_interval: float = BATCH_POLL_INTERVAL) -> tuple[int, int]:
+    """Finish every run left behind by an interrupted process. Returns (saved, errors)"""
+    saved = errors = 0
+    while (run := BatchRun.latest_unfinished()) is not None:
+        logger.info(f"Resuming batch run {run.run_id}")
+        run_saved, run_errors = await run.run(client, poll_interval)
+        saved += run_saved
+        errors += run_errors
+    return saved, errors
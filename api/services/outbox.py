@@ -0,0 +1,268 @@
+"""
+Notification Outbox Service
+Durable queue of notification deliveries in a local SQLite file. Every delivery
+has an idempotency key, so enqueueing the same alert twice sends it once, and a
+crash mid fan-out leaves the remaining deliveries queued instead of lost.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import statistics
+import threading
+from collections import deque
+from typing import Any, Callable, Optional
+
+from ..config import OUTBOX_PATH, OUTBOX_CONCURRENCY, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 30.0
+RETRY_MAX_SECONDS = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    key TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt_at);
+"""
+
+
+class DeliveryError(Exception):
+    """
+    A delivery attempt failed.
+    `permanent` errors (bad address, revoked token) are not retried;
+    `retry_after` (seconds) overrides the exponential backoff.
+    """
+
+    def __init__(self, message: str, permanent: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.retry_after = retry_after
+
+
+def delivery_key(*parts) -> str:
+    """Idempotency key for one delivery, e.g. delivery_key("email", subscription_id, article_id)"""
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def retry_delay(attempts: int, retry_after: Optional[float] = None) -> float:
+    """Seconds before the next attempt: Retry-After if given, else exponential with jitter"""
+    if retry_after is not None:
+        return retry_after
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+
+
+class Outbox:
+    """
+    Deliveries move pending -> sending -> sent, or back to pending with a later
+    next_attempt_at after a failure, until max_attempts marks them failed.
+    Deliveries left in 'sending' by a crash are retried on the next start
+    (at-least-once for the one message that was in flight).
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._latencies = deque(maxlen=1000)  # Enqueue -> delivered, seconds
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        recovered = self.recover()
+        if recovered:
+            logger.warning(f"Outbox: {recovered} deliveries were in flight at shutdown, requeued")
+
+    # ------------------------------------------------------------------ queue
+
+    def enqueue(self, key: str, channel: str, payload: dict, delay: float = 0.0) -> bool:
+        """
+        Queue a delivery, due in `delay` seconds.
+        Returns False if one with the same key was already queued or sent.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO deliveries (key, channel, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, channel, json.dumps(payload), now + delay, now),
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, limit: int) -> list[dict]:
+        """Mark up to `limit` due deliveries as sending and return them"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT key, channel, payload, attempts, created_at FROM deliveries "
+                    "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE deliveries SET status = 'sending' WHERE key = ?",
+                    [(row["key"],) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def due_payloads(self, channel: str) -> list[dict]:
+        """Payloads of the pending deliveries on `channel` that are due now (without claiming them)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM deliveries WHERE status = 'pending' AND channel = ? AND next_attempt_at <= ?",
+                (channel, time.time()),
+            ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def complete(self, delivery: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE deliveries SET status = 'sent', attempts = attempts + 1, finished_at = ?, last_error = NULL WHERE key = ?",
+                (now, delivery["key"]),
+            )
+            self.sent += 1
+            self._latencies.append(now - delivery["created_at"])
+
+    def fail(self, delivery: dict, error: Exception) -> bool:
+        """Record a failed attempt. Returns True if the delivery will be retried"""
+        attempts = delivery["attempts"] + 1
+        permanent = isinstance(error, DeliveryError) and error.permanent
+        retry_after = error.retry_after if isinstance(error, DeliveryError) else None
+        now = time.time()
+
+        with self._lock:
+            if permanent or attempts >= self.max_attempts:
+                self._conn.execute(
+                    "UPDATE deliveries SET status = 'failed', attempts = ?, finished_at = ?, last_error = ? WHERE key = ?",
+                    (attempts, now, str(error)[:500], delivery["key"]),
+                )
+                self.failed += 1
+                return False
+            self._conn.execute(
+                "UPDATE deliveries SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? WHERE key = ?",
+                (attempts, now + retry_delay(attempts, retry_after), str(error)[:500], delivery["key"]),
+            )
+            self.retried += 1
+            return True
+
+    def recover(self) -> int:
+        """Requeue deliveries a previous process left in 'sending'"""
+        with self._lock:
+            return self._conn.execute("UPDATE deliveries SET status = 'pending' WHERE status = 'sending'").rowcount
+
+    def prune(self, retention_days: int = OUTBOX_RETENTION_DAYS) -> int:
+        """Forget finished deliveries older than `retention_days` (their keys stop deduplicating)"""
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM deliveries WHERE status IN ('sent', 'failed') AND finished_at < ?", (cutoff,)
+            ).rowcount
+
+    # ------------------------------------------------------------------ worker
+
+    async def drain(
+        self,
+        handlers: dict[str, Callable[[dict], Any]],
+        concurrency: int = OUTBOX_CONCURRENCY,
+    ) -> dict:
+        """
+        Deliver everything that is due, keeping up to `concurrency` deliveries in
+        progress and claiming more as each one finishes.
+        handlers[channel](payload) sends one delivery and raises on failure. Async
+        handlers are awaited (and do their own rate limiting); plain functions
+        run in a worker thread.
+        Returns counts of sent / retried / failed deliveries.
+        """
+        result = {"sent": 0, "retried": 0, "failed": 0}
+
+        async def deliver(delivery: dict):
+            handler = handlers.get(delivery["channel"])
+            try:
+                if handler is None:
+                    raise DeliveryError(f"No handler for channel {delivery['channel']}", permanent=True)
+                if asyncio.iscoroutinefunction(handler):
+                    await handler(delivery["payload"])
+                else:
+                    await asyncio.to_thread(handler, delivery["payload"])
+            except Exception as e:
+                retrying = await asyncio.to_thread(self.fail, delivery, e)
+                result["retried" if retrying else "failed"] += 1
+                logger.warning(
+                    f"Delivery {delivery['key'][:8]} ({delivery['channel']}) failed on attempt "
+                    f"{delivery['attempts'] + 1}: {e}{'' if retrying else ' - giving up'}"
+                )
+            else:
+                await asyncio.to_thread(self.complete, delivery)
+                result["sent"] += 1
+
+        in_progress: set[asyncio.Task] = set()
+        while True:
+            # Claim in chunks rather than one row per finished delivery
+            room = concurrency - len(in_progress)
+            if room >= max(1, concurrency // 8) or not in_progress:
+                batch = await asyncio.to_thread(self.claim, room)
+                in_progress.update(asyncio.create_task(deliver(d)) for d in batch)
+            if not in_progress:
+                break
+            _, in_progress = await asyncio.wait(in_progress, return_when=asyncio.FIRST_COMPLETED)
+
+        if any(result.values()):
+            logger.info(f"📬 Outbox drained: {result}")
+        return result
+
+    # ------------------------------------------------------------------ metrics
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM deliveries GROUP BY status").fetchall())
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM deliveries WHERE status = 'pending'").fetchone()[0]
+            latencies = sorted(self._latencies)
+
+        return {
+            "pending": counts.get("pending", 0),
+            "sending": counts.get("sending", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "delivered_since_start": self.sent,
+            "retried_since_start": self.retried,
+            "failed_since_start": self.failed,
+            "latency_avg_seconds": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "latency_p95_seconds": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3) if latencies else 0.0,
+        }
+
+
+_outbox: Optional[Outbox] = None
+
+
+def get_outbox() -> Outbox:
+    """Get or create the notification outbox (singleton)"""
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox()
+    return _outbox
@@ -0,0 +1,290 @@
+"""
+HTML Parser Service
+Pluggable parsers for The Hacker News listing and article pages
+"""
+
+import re
+import logging
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from ..config import HTML_PARSER
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:  # lxml/cssselect are optional - fall back to BeautifulSoup
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# Nodes inside #articlebody that are ads, image captions or newsletter boxes
+BODY_NOISE_SELECTORS = ['.separator', '.dog_two', '.cf.note-b']
+
+
+def _clean_body_text(text: str) -> str:
+    return re.sub(r"\n\s*\n", "\n\n", text).strip()
+
+
+class ArticleParser:
+    """Base class: turns raw HTML into the dicts the scraper saves."""
+
+    name = "base"
+
+    def parse_listing(self, html: str) -> tuple[list[str], Optional[str]]:
+        """
+        Parse a homepage/archive/category page.
+        Returns (article URLs, next page URL or None)
+        """
+        raise NotImplementedError
+
+    def parse_article(self, html: str, article_url: str) -> dict:
+        """Parse a single article page into title, thumbnail, metadata, body and tags."""
+        raise NotImplementedError
+
+
+class SoupParser(ArticleParser):
+    """BeautifulSoup + html.parser (pure Python, always available)."""
+
+    name = "bs4"
+
+    def parse_listing(self, html: str) -> tuple[list[str], Optional[str]]:
+        soup = BeautifulSoup(html, "html.parser")
+
+        urls = []
+        for container in soup.select(".blog-posts > .body-post"):
+            link_element = container.select_one(".story-link")
+            if link_element and link_element.has_attr("href"):
+                urls.append(link_element["href"])
+
+        # Mobile pager link first, desktop as fallback
+        next_page_url = None
+        for selector in ('a.blog-pager-older-link-mobile', 'a.blog-pager-older-link'):
+            next_link = soup.select_one(selector)
+            if next_link and next_link.has_attr("href"):
+                next_page_url = next_link["href"]
+                break
+
+        return urls, next_page_url
+
+    def parse_article(self, html: str, article_url: str) -> dict:
+        soup = BeautifulSoup(html, "html.parser")
+        article_data = {}
+
+        # 1. Title and URL
+        title_link = soup.select_one('.story-title a')
+        if title_link:
+            article_data["title"] = title_link.get_text(strip=True)
+            article_data["url"] = title_link.get("href", article_url)
+        else:
+            h1 = soup.select_one("h1.story-title")
+            article_data["title"] = h1.get_text(strip=True) if h1 else "N/A"
+            article_data["url"] = article_url
+
+        # 2. Thumbnail Image
+        thumbnail_meta = soup.select_one('div[itemprop="image"] meta[itemprop="url"]')
+        if thumbnail_meta:
+            article_data["thumbnail"] = thumbnail_meta.get("content", "")
+        else:
+            article_body_img = soup.select_one("#articlebody img")
+            article_data["thumbnail"] = article_body_img["src"] if article_body_img and article_body_img.has_attr("src") else ""
+
+        # 3. Metadata (Date, Author, Tags)
+        postmeta_element = soup.select_one('.postmeta')
+        post_head_tags = []
+        if postmeta_element:
+            date_element = postmeta_element.select_one('.p-author .author')
+            article_data["timestamp"] = date_element.get_text(strip=True) if date_element else None
+
+            author_meta = soup.select_one('div[itemprop="author"] meta[itemprop="name"]')
+            if author_meta and author_meta.has_attr("content"):
+                article_data["author"] = author_meta["content"]
+            else:
+                authors = postmeta_element.select('.author')
+                article_data["author"] = authors[1].get_text(strip=True) if len(authors) > 1 else None
+
+            tags_meta = postmeta_element.select_one('.p-tags')
+            if tags_meta:
+                post_head_tags = [t.strip() for t in tags_meta.text.strip().split(' / ') if t.strip()]
+
+        # 4. Full Article Body Text - noise is removed in place, the thumbnail was already read
+        article_body = soup.find(id="articlebody")
+        if article_body:
+            for selector in BODY_NOISE_SELECTORS:
+                for el in article_body.select(selector):
+                    el.decompose()
+            article_data["text"] = _clean_body_text(article_body.get_text("\n", strip=True))
+        else:
+            article_data["text"] = ""
+
+        # 5. Detailed Tags
+        detailed_tags_element = soup.select_one('.tags .categ')
+        if detailed_tags_element:
+            section_spans = detailed_tags_element.select('a span[itemprop="articleSection"]')
+            article_data["tags"] = " / ".join([span.get_text(strip=True) for span in section_spans])
+        else:
+            article_data["tags"] = " / ".join(post_head_tags)
+
+        article_data["is_sponsored"] = "sponsored" in article_data.get("tags", "").lower()
+
+        return article_data
+
+
+class LxmlParser(ArticleParser):
+    """lxml (libxml2) with precompiled CSS selectors - several times faster than html.parser."""
+
+    name = "lxml"
+
+    # Text under these tags is never part of the visible text (matches BeautifulSoup's get_text)
+    _INVISIBLE_TAGS = {"script", "style", "template"}
+
+    def __init__(self):
+        if lxml is None:
+            raise ImportError("lxml and cssselect must be installed for the lxml parser")
+        self._html_parser = lxml.html.HTMLParser(encoding="utf-8")
+        self._sel = {
+            css: CSSSelector(css)
+            for css in [
+                ".blog-posts > .body-post", ".story-link",
+                "a.blog-pager-older-link-mobile", "a.blog-pager-older-link",
+                ".story-title a", "h1.story-title",
+                'div[itemprop="image"] meta[itemprop="url"]', "#articlebody img",
+                ".postmeta", ".p-author .author", 'div[itemprop="author"] meta[itemprop="name"]',
+                ".author", ".p-tags", "#articlebody", ".tags .categ",
+                'a span[itemprop="articleSection"]',
+                *BODY_NOISE_SELECTORS,
+            ]
+        }
+
+    def _parse(self, html: str):
+        # Parse bytes so pages carrying an XML encoding declaration are accepted
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=self._html_parser)
+
+    def _all(self, el, css: str) -> list:
+        return self._sel[css](el)
+
+    def _one(self, el, css: str):
+        matches = self._sel[css](el)
+        return matches[0] if matches else None
+
+    def _strings(self, el):
+        """Text nodes under `el` in document order, skipping comments and invisible tags."""
+        if el.text and el.tag not in self._INVISIBLE_TAGS:
+            yield el.text
+        for child in el:
+            if isinstance(child.tag, str):  # Comments and processing instructions have callable tags
+                yield from self._strings(child)
+            if child.tail:
+                yield child.tail
+
+    def _text(self, el, separator: str = "", strip: bool = False) -> str:
+        strings = self._strings(el)
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+    def parse_listing(self, html: str) -> tuple[list[str], Optional[str]]:
+        doc = self._parse(html)
+
+        urls = []
+        for container in self._all(doc, ".blog-posts > .body-post"):
+            link_element = self._one(container, ".story-link")
+            if link_element is not None and link_element.get("href") is not None:
+                urls.append(link_element.get("href"))
+
+        next_page_url = None
+        for selector in ('a.blog-pager-older-link-mobile', 'a.blog-pager-older-link'):
+            next_link = self._one(doc, selector)
+            if next_link is not None and next_link.get("href") is not None:
+                next_page_url = next_link.get("href")
+                break
+
+        return urls, next_page_url
+
+    def parse_article(self, html: str, article_url: str) -> dict:
+        doc = self._parse(html)
+        article_data = {}
+
+        # 1. Title and URL
+        title_link = self._one(doc, '.story-title a')
+        if title_link is not None:
+            article_data["title"] = self._text(title_link, strip=True)
+            article_data["url"] = title_link.get("href", article_url)
+        else:
+            h1 = self._one(doc, "h1.story-title")
+            article_data["title"] = self._text(h1, strip=True) if h1 is not None else "N/A"
+            article_data["url"] = article_url
+
+        # 2. Thumbnail Image
+        thumbnail_meta = self._one(doc, 'div[itemprop="image"] meta[itemprop="url"]')
+        if thumbnail_meta is not None:
+            article_data["thumbnail"] = thumbnail_meta.get("content", "")
+        else:
+            article_body_img = self._one(doc, "#articlebody img")
+            article_data["thumbnail"] = article_body_img.get("src", "") if article_body_img is not None else ""
+
+        # 3. Metadata (Date, Author, Tags)
+        postmeta_element = self._one(doc, '.postmeta')
+        post_head_tags = []
+        if postmeta_element is not None:
+            date_element = self._one(postmeta_element, '.p-author .author')
+            article_data["timestamp"] = self._text(date_element, strip=True) if date_element is not None else None
+
+            author_meta = self._one(doc, 'div[itemprop="author"] meta[itemprop="name"]')
+            if author_meta is not None and author_meta.get("content") is not None:
+                article_data["author"] = author_meta.get("content")
+            else:
+                authors = self._all(postmeta_element, '.author')
+                article_data["author"] = self._text(authors[1], strip=True) if len(authors) > 1 else None
+
+            tags_meta = self._one(postmeta_element, '.p-tags')
+            if tags_meta is not None:
+                post_head_tags = [t.strip() for t in self._text(tags_meta).strip().split(' / ') if t.strip()]
+
+        # 4. Full Article Body Text
+        article_body = self._one(doc, "#articlebody")
+        if article_body is not None:
+            for selector in BODY_NOISE_SELECTORS:
+                for el in self._all(article_body, selector):
+                    el.drop_tree()
+            article_data["text"] = _clean_body_text(self._text(article_body, "\n", strip=True))
+        else:
+            article_data["text"] = ""
+
+        # 5. Detailed Tags
+        detailed_tags_element = self._one(doc, '.tags .categ')
+        if detailed_tags_element is not None:
+            section_spans = self._all(detailed_tags_element, 'a span[itemprop="articleSection"]')
+            article_data["tags"] = " / ".join([self._text(span, strip=True) for span in section_spans])
+        else:
+            article_data["tags"] = " / ".join(post_head_tags)
+
+        article_data["is_sponsored"] = "sponsored" in article_data.get("tags", "").lower()
+
+        return article_data
+
+
+PARSERS = {
+    SoupParser.name: SoupParser,
+    LxmlParser.name: LxmlParser,
+}
+
+_parsers: dict[str, ArticleParser] = {}
+
+
+def get_parser(backend: str = HTML_PARSER) -> ArticleParser:
+    """
+    Get a cached parser instance for a backend ("lxml" or "bs4").
+    Falls back to BeautifulSoup when lxml is not installed.
+    """
+    if backend not in _parsers:
+        if backend not in PARSERS:
+            raise ValueError(f"Unknown HTML parser backend: {backend}")
+        if backend == LxmlParser.name and lxml is None:
+            logger.warning("lxml not installed, falling back to BeautifulSoup parser")
+            _parsers[backend] = SoupParser()
+        else:
+            _parsers[backend] = PARSERS[backend]()
+    return _parsers[backend]
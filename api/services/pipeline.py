@@ -0,0 +1,136 @@
+"""
+Pipeline Service
+Staged async pipeline with bounded queues, per-stage concurrency and queue-depth metrics
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of input for a stage worker
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline.
+    `handler` gets an item and returns the item for the next stage, or None to drop it.
+    With batch_size > 1 it gets a list of up to `batch_size` waiting items and
+    returns a list with one result (or None) per item.
+    """
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+    batch_size: int = 1
+
+    # Metrics
+    processed: int = 0
+    failed: int = 0
+    max_queue_depth: int = 0
+    busy_seconds: float = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "max_queue_depth": self.max_queue_depth,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+@dataclass
+class Pipeline:
+    """
+    Items flow through the stages in order, each as soon as the previous stage
+    is done with it. Queues between stages hold at most `queue_size` items, so a
+    slow stage applies backpressure upstream instead of buffering everything.
+    """
+    stages: list[Stage]
+    queue_size: int = 10
+    started_at: float = field(default=0.0, init=False)
+    counters: dict[str, int] = field(default_factory=dict, init=False)  # Ad-hoc per-run counts bumped by handlers
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    async def run(self, items: Iterable[Any]) -> dict[str, dict]:
+        """Push items through every stage and return per-stage stats"""
+        self.started_at = time.monotonic()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+
+        workers = [
+            [asyncio.create_task(self._worker(i, queues)) for _ in range(max(1, stage.concurrency))]
+            for i, stage in enumerate(self.stages)
+        ]
+
+        for item in items:
+            await self._put(0, queues, item)
+        for _ in workers[0]:
+            await queues[0].put(_DONE)
+
+        # Close each stage once everything upstream of it has finished
+        for i, stage_workers in enumerate(workers):
+            await asyncio.gather(*stage_workers)
+            if i + 1 < len(self.stages):
+                for _ in workers[i + 1]:
+                    await queues[i + 1].put(_DONE)
+
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def elapsed(self) -> float:
+        """Seconds since run() started"""
+        return time.monotonic() - self.started_at
+
+    async def _put(self, index: int, queues: list[asyncio.Queue], item: Any):
+        await queues[index].put(item)
+        stage = self.stages[index]
+        stage.max_queue_depth = max(stage.max_queue_depth, queues[index].qsize())
+
+    async def _worker(self, index: int, queues: list[asyncio.Queue]):
+        stage = self.stages[index]
+        queue = queues[index]
+        done = False
+
+        while not done:
+            item = await queue.get()
+            if item is _DONE:
+                break
+
+            # Batching stages take whatever else is already waiting, never wait for more
+            if stage.batch_size > 1:
+                batch = [item]
+                while len(batch) < stage.batch_size and not queue.empty():
+                    extra = queue.get_nowait()
+                    if extra is _DONE:
+                        done = True
+                        break
+                    batch.append(extra)
+                item = batch
+
+            start = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                logger.error(f"Pipeline stage '{stage.name}' failed: {e}")
+                result = None
+            finally:
+                stage.busy_seconds += time.monotonic() - start
+
+            # Batch handlers return one result per item; a failed call drops the whole batch
+            if stage.batch_size > 1:
+                results = result if result is not None else [None] * len(item)
+            else:
+                results = [result]
+
+            for result in results:
+                if result is None:
+                    stage.failed += 1
+                    continue
+                stage.processed += 1
+                if index + 1 < len(self.stages):
+                    await self._put(index + 1, queues, result)
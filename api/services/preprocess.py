@@ -0,0 +1,171 @@
+"""
+Content Preprocessing Service
+Fits article text into a token budget before it is sent to the LLM
+"""
+
+import re
+import math
+import time
+import logging
+import threading
+from dataclasses import dataclass
+
+from ..config import ANALYSIS_TOKEN_BUDGET
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional - fall back to a character estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Lines that survive the scraper's BODY_NOISE_SELECTORS (ads, captions, newsletter
+# boxes are already dropped from the HTML) but carry nothing for the analysis
+BOILERPLATE_PATTERNS = [
+    re.compile(r"^found this article interesting\?", re.IGNORECASE),
+    re.compile(r"^follow us on (google news|twitter|linkedin|x)\b", re.IGNORECASE),
+    re.compile(r"^(image|photo) (source|credit)s?:", re.IGNORECASE),
+    re.compile(r"^(share|tweet|subscribe)( this| to our newsletter)?[.!:]?$", re.IGNORECASE),
+]
+
+# Paragraphs always kept (if they fit) - the lead carries the who/what/when
+LEAD_PARAGRAPHS = 3
+
+# Identifiers, numbers and proper nouns - what makes a paragraph worth its tokens
+_SIGNAL = re.compile(r"CVE-\d{4}-\d+|\b\d[\d.,%]*\b|\b[A-Z][A-Za-z0-9]*[A-Z0-9][A-Za-z0-9]*\b|\b[A-Z][a-z]{2,}\b")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Seconds before loading a tiktoken encoding is tried again after it failed
+ENCODING_RETRY_SECONDS = 300
+
+
+@dataclass
+class PreparedContent:
+    """Article text after boilerplate removal and budget fitting"""
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+_encodings: dict = {}
+_encoding_failures: dict[str, float] = {}  # model -> when loading last failed
+_encodings_lock = threading.Lock()
+
+
+def _encoding(model: str):
+    """
+    tiktoken encoding for a model, loaded once. A failed load (the BPE files
+    are downloaded on first use) is retried after ENCODING_RETRY_SECONDS
+    instead of pinning the length estimate for the life of the process.
+    """
+    if tiktoken is None:
+        return None
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+        failed_at = _encoding_failures.get(model)
+        if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+            return None
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:  # Model newer than this tiktoken release
+                encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            _encoding_failures[model] = time.monotonic()
+            logger.warning(f"tiktoken encoding unavailable for {model} ({e}), estimating tokens from length")
+            return None
+        _encoding_failures.pop(model, None)
+        _encodings[model] = encoding
+        return encoding
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens `text` costs for `model` (about 4 characters per token if tiktoken is unavailable)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _is_boilerplate(paragraph: str) -> bool:
+    return any(pattern.search(paragraph) for pattern in BOILERPLATE_PATTERNS)
+
+
+def _score(paragraph: str, tokens: int) -> float:
+    """Distinct identifiers/numbers/names per sqrt(token) - dense paragraphs first"""
+    return len(set(_SIGNAL.findall(paragraph))) / math.sqrt(max(tokens, 1))
+
+
+def _truncate(text: str, budget: int, model: str) -> str:
+    """The first `budget` tokens of `text`, cut back to a word boundary where there is one"""
+    if budget <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        clipped = text[:budget * 4]
+    else:
+        clipped = encoding.decode(encoding.encode(text, disallowed_special=())[:budget])
+    if len(clipped) < len(text) and " " in clipped.strip():
+        clipped = clipped.rsplit(" ", 1)[0]
+    return clipped.strip()
+
+
+def _clip_sentences(paragraph: str, budget: int, model: str) -> str:
+    """
+    Longest run of whole leading sentences that fits in `budget` tokens. If not
+    even the first one fits (or the text has no sentence punctuation), a hard
+    cut at the budget instead of nothing.
+    """
+    kept, used = [], 0
+    for sentence in _SENTENCE_END.split(paragraph):
+        cost = count_tokens(sentence, model) + 1
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    if not kept:
+        return _truncate(paragraph, budget - 1, model)
+    return " ".join(kept)
+
+
+def prepare_content(text: str, model: str, budget: int = ANALYSIS_TOKEN_BUDGET) -> PreparedContent:
+    """
+    Drop boilerplate lines, then keep the lead paragraphs and the most informative
+    of the rest until `budget` tokens are used. Kept paragraphs stay in article order
+    and are only cut mid-sentence when not even a lead paragraph's first sentence fits.
+    """
+    paragraphs = [p.strip() for p in (text or "").split("\n") if p.strip()]
+    original_tokens = count_tokens("\n".join(paragraphs), model)
+
+    paragraphs = [p for p in paragraphs if not _is_boilerplate(p)]
+    costs = [count_tokens(p, model) + 1 for p in paragraphs]  # +1 for the joining newline
+
+    if sum(costs) <= budget:
+        kept = paragraphs
+    else:
+        lead = range(min(LEAD_PARAGRAPHS, len(paragraphs)))
+        rest = sorted(range(len(lead), len(paragraphs)), key=lambda i: _score(paragraphs[i], costs[i]), reverse=True)
+
+        chosen: dict[int, str] = {}
+        used = 0
+        for i in [*lead, *rest]:
+            if used + costs[i] <= budget:
+                chosen[i] = paragraphs[i]
+                used += costs[i]
+            elif i in lead and used < budget:
+                clipped = _clip_sentences(paragraphs[i], budget - used, model)
+                if clipped:
+                    chosen[i] = clipped
+                    used += count_tokens(clipped, model) + 1
+        kept = [chosen[i] for i in sorted(chosen)]
+
+    prepared = "\n".join(kept)
+    return PreparedContent(text=prepared, original_tokens=original_tokens, tokens=count_tokens(prepared, model))
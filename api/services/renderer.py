@@ -0,0 +1,291 @@
+"""
+Email Rendering Service
+Branded email templates. Article cards are rendered once per analysis content
+into an LRU cache; alert, digest and share emails are assembled from them.
+"""
+
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional
+
+from ..config import FRONTEND_URL, EMAIL_FRAGMENT_CACHE_SIZE
+from ..utils.cache import LRUCache
+
+
+def get_priority_color(priority: str) -> str:
+    """Get color code for priority level."""
+    return {
+        "CRITICAL": "#ef4444",
+        "HIGH": "#f59e0b",
+        "MEDIUM": "#eab308",
+        "LOW": "#22c55e",
+        "INFO": "#3b82f6"
+    }.get(priority.upper(), "#3b82f6")
+
+
+def format_article_html(article: dict, detailed: bool = False) -> str:
+    """
+    Format a single article for email using card style.
+    `detailed` is the shared-article card: TL;DR, read time and more takeaways
+    and technologies.
+    """
+    priority = article.get("priority", "INFO").upper()
+    priority_color = get_priority_color(priority)
+
+    # Format key takeaways
+    takeaways = article.get("key_takeaways", [])
+    takeaways_html = ""
+    if takeaways:
+        takeaways_html = "<ul style='margin: 0; padding-left: 20px; color: #374151;'>"
+        for t in takeaways[:5 if detailed else 3]:
+            point = t.get("point", "") if isinstance(t, dict) else str(t)
+            takeaways_html += f"<li style='margin-bottom: 6px; font-size: 14px;'>{point}</li>"
+        takeaways_html += "</ul>"
+
+    # Format technologies
+    technologies = article.get("mentioned_technologies", [])[:6 if detailed else 5]
+    tech_html = ""
+    if technologies:
+        tech_items = [
+            f'<span style="display: inline-block; background: #e0f2fe; color: #0369a1; padding: 2px 8px; border-radius: 12px; font-size: 11px; margin-right: 4px; margin-bottom: 4px; font-weight: 500;">{t}</span>'
+            for t in technologies
+        ]
+        tech_html = f"""
+        <div style="margin-top: 16px; padding-top: 16px; border-top: 1px solid #f3f4f6;">
+            <div style="margin-bottom: 8px; font-size: 11px; text-transform: uppercase; color: #6b7280; letter-spacing: 0.05em; font-weight: 600;">Technologies</div>
+            <div>{''.join(tech_items)}</div>
+        </div>
+        """
+
+    internal_url = f"{FRONTEND_URL}/article/{article.get('id')}"
+    label = f"{priority} PRIORITY" if detailed else priority
+    meta = f"Relevance: {article.get('relevance_score', 0)}/10"
+    if detailed:
+        meta += f" • {article.get('read_time_minutes', 5)} min read"
+        headline = article.get('headline', article.get('article_title', 'No Headline'))
+        summary = article.get('tldr', article.get('short_summary', ''))
+    else:
+        headline = article.get('headline', 'No Headline')
+        summary = article.get('short_summary', '')
+
+    return f"""
+    <div style="margin-bottom: 24px; border: 1px solid #e5e7eb; border-radius: 12px; overflow: hidden; box-shadow: 0 1px 2px rgba(0,0,0,0.05);">
+        <div style="padding: 20px; border-bottom: 1px solid #f3f4f6; background-color: #ffffff;">
+            <div style="display: flex; align-items: center; margin-bottom: 12px;">
+                <span style="background-color: {priority_color}15; color: {priority_color}; padding: 4px 10px; border-radius: 6px; font-size: 11px; font-weight: 700; letter-spacing: 0.05em;">
+                    {label}
+                </span>
+                <span style="margin-left: auto; color: #6b7280; font-size: 12px; font-weight: 500;">
+                    {meta}
+                </span>
+            </div>
+
+            <h3 style="margin: 0 0 8px 0; color: #111827; font-size: 18px; line-height: 1.4;">
+                <a href="{internal_url}" style="color: #111827; text-decoration: none;">
+                    {headline}
+                </a>
+            </h3>
+
+            <p style="margin: 0; color: #4b5563; font-size: 14px; line-height: 1.6;">
+                {summary}
+            </p>
+        </div>
+
+        <div style="padding: 20px; background-color: #f9fafb;">
+            <div style="margin-bottom: 8px; font-size: 11px; text-transform: uppercase; color: #6b7280; letter-spacing: 0.05em; font-weight: 600;">
+                Key Takeaways
+            </div>
+            {takeaways_html}
+            {tech_html}
+        </div>
+
+        <div style="padding: 12px 20px; background-color: #f0fdf4; border-top: 1px solid #dcfce7; text-align: center;">
+            <a href="{internal_url}"
+               style="display: inline-block; background-color: #10b981; color: white; padding: 8px 16px; text-decoration: none; border-radius: 6px; font-size: 13px; font-weight: 600; margin-right: 12px;">
+               View Analysis
+            </a>
+            <a href="{article.get('article_url', '#')}"
+               style="display: inline-block; color: #6b7280; text-decoration: none; font-size: 13px; font-weight: 500;">
+               Read Source →
+            </a>
+        </div>
+    </div>
+    """
+
+
+# Fields a card shows - a change to any of them is a new card
+CARD_FIELDS = (
+    "headline", "article_title", "tldr", "short_summary", "priority", "relevance_score",
+    "read_time_minutes", "key_takeaways", "mentioned_technologies", "article_url",
+)
+
+
+class ArticleRenderer:
+    """
+    Article cards cached by analysis id and a hash of the fields they show, so
+    a card is rendered once however many alert, digest and share emails it
+    goes into, and a re-analysis that changes the text renders a new one.
+    Alert email bodies are assembled from those cards and cached too, keyed
+    by title, subtitle and their cards' keys, so subscribers whose filters
+    match the same stories share one body. Articles without an id are
+    rendered every time. Thread-safe - notifications are composed in worker
+    threads.
+    """
+
+    def __init__(self, maxsize: int = EMAIL_FRAGMENT_CACHE_SIZE):
+        self._cards = LRUCache(maxsize)
+        self._emails = LRUCache(maxsize)
+        self._keys = LRUCache(maxsize)  # id(row) -> (row, key)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.card_hits = 0
+        self.card_misses = 0
+
+    def key(self, article: dict) -> Optional[Hashable]:
+        """
+        (analysis id, content hash), or None without an id. Hashing costs about
+        as much as rendering, so it is done once per row object - a notification
+        batch passes the same stored rows to every subscriber they match (rows
+        are never edited in place; an update is a new row).
+        """
+        if article.get("id") is None:
+            return None
+        cached = self._keys.get(id(article))
+        if cached is not None and cached[0] is article:
+            return cached[1]
+        content = repr(tuple(article.get(f) for f in CARD_FIELDS)).encode()
+        key = (article["id"], hashlib.blake2b(content, digest_size=16).hexdigest())
+        # Holding the row keeps its id() from being reused while the entry lives
+        self._keys.set(id(article), (article, key))
+        return key
+
+    def card(self, article: dict, detailed: bool = False, key: Optional[Hashable] = None) -> str:
+        """format_article_html(), rendered once per analysis content. Pass `key` if already computed"""
+        key = key or self.key(article)
+        if key is None:
+            return format_article_html(article, detailed)
+        html = self._cards.get((detailed, key))
+        if html is not None:
+            with self._lock:
+                self.card_hits += 1
+            return html
+        html = format_article_html(article, detailed)
+        self._cards.set((detailed, key), html)
+        with self._lock:
+            self.card_misses += 1
+        return html
+
+    def cards(self, articles: List[dict]) -> str:
+        return "".join(self.card(a) for a in articles)
+
+    def email(self, title: str, articles: List[dict], subtitle: str = "") -> str:
+        """
+        A branded email of article cards. Keep per-recipient text out of `subtitle`
+        (use a {{ params.x }} placeholder) and every subscriber alerted about the
+        same articles gets the same body string.
+        """
+        keys = tuple(self.key(a) for a in articles)
+        cacheable = None not in keys
+        if cacheable:
+            body = self._emails.get((title, subtitle, keys))
+            if body is not None:
+                with self._lock:
+                    self.hits += 1
+                return body
+        content = "".join(self.card(a, key=k) for a, k in zip(articles, keys))
+        body = format_email_wrapper(title, content, subtitle)
+        with self._lock:
+            self.misses += 1
+        if cacheable:
+            self._emails.set((title, subtitle, keys), body)
+        return body
+
+    def clear(self):
+        self._cards.clear()
+        self._emails.clear()
+        self._keys.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        card_total = self.card_hits + self.card_misses
+        return {
+            "cards": len(self._cards),
+            "emails": len(self._emails),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "card_hits": self.card_hits,
+            "card_misses": self.card_misses,
+            "card_hit_rate": round(self.card_hits / card_total, 3) if card_total else 0.0,
+        }
+
+
+_renderer: Optional[ArticleRenderer] = None
+
+
+def get_renderer() -> ArticleRenderer:
+    """Get or create the shared alert email renderer (singleton)"""
+    global _renderer
+    if _renderer is None:
+        _renderer = ArticleRenderer()
+    return _renderer
+
+
+def format_email_wrapper(title: str, content: str, subtitle: str = "") -> str:
+    """Wrap content in branded email template."""
+    return f"""
+    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px; background-color: #ffffff;">
+        <div style="text-align: center; margin-bottom: 32px;">
+            <h1 style="color: #10b981; font-size: 24px; margin: 0; letter-spacing: -0.5px;">🐑 CyberShepherd</h1>
+            <p style="color: #6b7280; margin: 4px 0 0 0; font-size: 14px;">Security Intelligence Report</p>
+        </div>
+
+        <div style="margin-bottom: 24px; text-align: center;">
+            <h2 style="color: #111827; font-size: 20px; margin: 0 0 8px 0;">{title}</h2>
+            {f'<p style="color: #4b5563; margin: 0; font-size: 15px;">{subtitle}</p>' if subtitle else ''}
+        </div>
+
+        {content}
+
+        <div style="text-align: center; margin-top: 32px; padding-top: 24px; border-top: 1px solid #e5e7eb;">
+            <p style="color: #9ca3af; font-size: 12px; margin: 0;">
+                Manage your subscriptions in your dashboard.
+            </p>
+            <p style="color: #9ca3af; font-size: 12px; margin: 8px 0 0 0;">
+                © {datetime.now().year} CyberShepherd. All rights reserved.
+            </p>
+        </div>
+    </div>
+    """
+
+
+def format_share_email_html(article: dict, personal_message: Optional[str] = None) -> str:
+    """Format article for sharing via email - the detailed card, from the shared card cache."""
+    message_section = ""
+    if personal_message:
+        message_section = f"""
+        <div style="margin-bottom: 20px; padding: 15px; background-color: #f0fdf4; border-left: 4px solid #10b981; border-radius: 4px;">
+            <p style="margin: 0; color: #166534; font-style: italic;">"{personal_message}"</p>
+        </div>
+        """
+
+    return f"""
+    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+        <div style="text-align: center; margin-bottom: 24px;">
+            <h1 style="color: #10b981; font-size: 24px; margin: 0;">🐑 CyberShepherd</h1>
+            <p style="color: #6b7280; margin: 5px 0 0 0;">Security Intelligence Report</p>
+        </div>
+
+        {message_section}
+
+        {get_renderer().card(article, detailed=True)}
+
+        <div style="text-align: center; margin-top: 24px; padding-top: 24px; border-top: 1px solid #e5e7eb;">
+            <p style="color: #9ca3af; font-size: 12px; margin: 0;">
+                Shared via CyberShepherd • AI-Powered Security Intelligence
+            </p>
+        </div>
+    </div>
+    """
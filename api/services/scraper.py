@@ -3,349 +3,441 @@ Web Scraping Service
 Scrapes The Hacker News for articles
 """
 
-import re
 import asyncio
 import logging
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
-from concurrent.futures import ThreadPoolExecutor
 
-import requests
-from bs4 import BeautifulSoup
-
-from ..config import HACKERNEWS_URL, OPENAI_MODEL
-from ..database import get_supabase
-from .analyzer import analyze_article, save_analysis, get_analysis_by_url
-from .notifier import process_notifications
+from ..config import (
+    HACKERNEWS_URL, OPENAI_MODEL, LLM_MAX_CONCURRENCY,
+    SEEN_URL_CACHE_SIZE, DB_IN_CHUNK_SIZE, PIPELINE_QUEUE_SIZE,
+)
+from ..database import get_supabase, round_trips
+from ..models.article import ArticleAnalysis
+from ..utils import LRUCache
+from .analyzer import aroute_article, analysis_row, save_analyses, get_analysis_by_url, get_analyses_by_urls
+from .dedup import get_dedup_index, seed_dedup_index
+from .fetcher import get_fetcher, FetchResult
+from .parser import get_parser
+from .matching import SubscriptionMatcher
+from .notifier import (
+    process_notifications, get_immediate_subscriptions, drain_notifications,
+    track_weekly_digests, get_weekly_subscriptions,
+)
+from .pipeline import Pipeline, Stage
 
 logger = logging.getLogger(__name__)
 
-# Thread pool for running sync LLM calls concurrently
-_executor = ThreadPoolExecutor(max_workers=5)
+# URLs known to be in news_articles - kept across scheduler runs so repeat
+# homepage entries never reach the database
+_seen_urls = LRUCache(maxsize=SEEN_URL_CACHE_SIZE)
+
+
+def parse_article_urls(html: str) -> list[str]:
+    """Extract article URLs from a homepage/listing page."""
+    urls, _ = get_parser().parse_listing(html)
+    return urls
 
 
-def get_article_urls(url: str = HACKERNEWS_URL) -> list[str]:
+async def fetch_homepage(url: str = HACKERNEWS_URL, store: bool = True) -> Optional[FetchResult]:
+    """Conditionally fetch the homepage through the HTTP cache (see Fetcher.fetch for `store`)."""
+    try:
+        return await get_fetcher().fetch(url, store=store)
+    except Exception as e:
+        logger.error(f"Error fetching homepage: {e}")
+        return None
+
+
+async def get_article_urls(url: str = HACKERNEWS_URL) -> list[str]:
     """
     Scrape The Hacker News homepage for article URLs.
     Returns list of article URLs.
     """
-    try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        article_containers = soup.select(".blog-posts > .body-post")
-
-        urls = []
-        for container in article_containers:
-            link_element = container.select_one(".story-link")
-            if link_element and link_element.has_attr("href"):
-                urls.append(link_element["href"])
-        
-        logger.info(f"Found {len(urls)} article URLs on homepage")
-        return urls
-    except Exception as e:
-        logger.error(f"Error fetching article URLs: {e}")
+    page = await fetch_homepage(url)
+    if not page:
         return []
+    
+    urls = parse_article_urls(page.text)
+    logger.info(f"Found {len(urls)} article URLs on homepage")
+    return urls
 
 
-def extract_article_data(article_url: str) -> Optional[dict]:
+async def extract_article_data(article_url: str) -> Optional[dict]:
     """
     Extract full article data from a single article page.
     """
     try:
-        resp = requests.get(article_url, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        article_data = {}
-
-        # 1. Title and URL
-        title_link = soup.select_one('.story-title a')
-        if title_link:
-            article_data["title"] = title_link.get_text(strip=True)
-            article_data["url"] = title_link.get("href", article_url)
-        else:
-            h1 = soup.select_one("h1.story-title")
-            article_data["title"] = h1.get_text(strip=True) if h1 else "N/A"
-            article_data["url"] = article_url
-
-        # 2. Thumbnail Image
-        thumbnail_meta = soup.select_one('div[itemprop="image"] meta[itemprop="url"]')
-        if thumbnail_meta:
-            article_data["thumbnail"] = thumbnail_meta.get("content", "")
-        else:
-            article_body_img = soup.select_one("#articlebody img")
-            article_data["thumbnail"] = article_body_img["src"] if article_body_img and article_body_img.has_attr("src") else ""
-
-        # 3. Metadata (Date, Author, Tags)
-        postmeta_element = soup.select_one('.postmeta')
-        post_head_tags = []
-        if postmeta_element:
-            # Date
-            date_element = postmeta_element.select_one('.p-author .author')
-            article_data["timestamp"] = date_element.get_text(strip=True) if date_element else None
-            
-            # Author
-            author_meta = soup.select_one('div[itemprop="author"] meta[itemprop="name"]')
-            if author_meta and author_meta.has_attr("content"):
-                article_data["author"] = author_meta["content"]
-            else:
-                authors = postmeta_element.select('.author')
-                article_data["author"] = authors[1].get_text(strip=True) if len(authors) > 1 else None
-            
-            # Tags
-            tags_meta = postmeta_element.select_one('.p-tags')
-            if tags_meta:
-                post_head_tags = [t.strip() for t in tags_meta.text.strip().split(' / ') if t.strip()]
-
-        # 4. Full Article Body Text
-        article_body = soup.find(id="articlebody")
-        if article_body:
-            body_clone = BeautifulSoup(str(article_body), "html.parser")
-            for selector in ['.separator', '.dog_two', '.cf.note-b']:
-                for el in body_clone.select(selector):
-                    el.decompose()
-            full_text = body_clone.get_text("\n", strip=True)
-            full_text = re.sub(r"\n\s*\n", "\n\n", full_text).strip()
-            article_data["text"] = full_text
-        else:
-            article_data["text"] = ""
-
-        # 5. Detailed Tags
-        detailed_tags_element = soup.select_one('.tags .categ')
-        if detailed_tags_element:
-            section_spans = detailed_tags_element.select('a span[itemprop="articleSection"]')
-            article_data["tags"] = " / ".join([span.get_text(strip=True) for span in section_spans])
-        else:
-            article_data["tags"] = " / ".join(post_head_tags)
-
-        # Check if sponsored
-        article_data["is_sponsored"] = "sponsored" in article_data.get("tags", "").lower()
-        
-        return article_data
-        
+        page = await get_fetcher().fetch(article_url)
+        return get_parser().parse_article(page.text, article_url)
     except Exception as e:
         logger.error(f"Error extracting article data from {article_url}: {e}")
         return None
 
 
-def get_existing_urls() -> set[str]:
-    """Get all existing article URLs from database"""
+def get_existing_urls(candidate_urls: list[str]) -> set[str]:
+    """
+    Return which of the candidate URLs are already in the database.
+    Only unknown URLs hit the database, in chunked `in_` queries.
+    """
+    existing = {url for url in candidate_urls if _seen_urls.get(url)}
+    unknown = [url for url in dict.fromkeys(candidate_urls) if url not in existing]
+    
     try:
         supabase = get_supabase()
-        result = supabase.table("news_articles").select("url").execute()
-        return {row["url"] for row in result.data}
+        for i in range(0, len(unknown), DB_IN_CHUNK_SIZE):
+            chunk = unknown[i:i + DB_IN_CHUNK_SIZE]
+            result = supabase.table("news_articles").select("url").in_("url", chunk).execute()
+            round_trips.read()
+            for row in result.data:
+                existing.add(row["url"])
+                _seen_urls.set(row["url"])
     except Exception as e:
         logger.error(f"Error fetching existing URLs: {e}")
-        return set()
+    
+    return existing
 
 
-def save_article(article_data: dict) -> Optional[dict]:
-    """Save article to database"""
+def _article_row(article_data: dict) -> dict:
+    """news_articles row for scraped article data"""
+    return {
+        "url": article_data.get("url"),
+        "title": article_data.get("title"),
+        "thumbnail": article_data.get("thumbnail"),
+        "text": article_data.get("text"),
+        "tags": article_data.get("tags"),
+        "timestamp": article_data.get("timestamp"),
+        "source": article_data.get("author"),
+        "is_sponsored": article_data.get("is_sponsored", False),
+    }
+
+
+def save_articles(articles: list[dict]) -> list[Optional[dict]]:
+    """
+    Save articles to database in one multi-row upsert.
+    Returns the stored row (or None) for each input article.
+    """
+    # One row per URL - Postgres refuses to upsert the same key twice in one statement
+    db_rows = {row["url"]: row for row in map(_article_row, articles)}
+    
     try:
         supabase = get_supabase()
-        
-        db_data = {
-            "url": article_data.get("url"),
-            "title": article_data.get("title"),
-            "thumbnail": article_data.get("thumbnail"),
-            "text": article_data.get("text"),
-            "tags": article_data.get("tags"),
-            "timestamp": article_data.get("timestamp"),
-            "source": article_data.get("author"),
-            "is_sponsored": article_data.get("is_sponsored", False),
-        }
-        
         result = supabase.table("news_articles").upsert(
-            db_data,
+            list(db_rows.values()),
             on_conflict="url"
         ).execute()
-        
-        return result.data[0] if result.data else None
+        round_trips.write()
     except Exception as e:
-        logger.error(f"Error saving article: {e}")
-        return None
+        logger.error(f"Error saving {len(db_rows)} articles: {e}")
+        return [None] * len(articles)
+    
+    stored = {row["url"]: row for row in result.data or []}
+    for url, row in stored.items():
+        _seen_urls.set(url)
+        get_dedup_index().add(url, db_rows[url]["text"], row.get("id"))
+    return [stored.get(article.get("url")) for article in articles]
+
+
+def save_article(article_data: dict) -> Optional[dict]:
+    """Save article to database"""
+    return save_articles([article_data])[0]
+
+
+@dataclass
+class AnalyzedArticle:
+    """An article's analysis on its way into article_analyses"""
+    url: str
+    title: str
+    article_id: Optional[int]
+    analysis: Optional[ArticleAnalysis] = None
+    model: Optional[str] = None
+    row: Optional[dict] = None  # Already-stored analysis row - nothing to write
+    duplicate_of: Optional[str] = None
+    follow_up_of: Optional[str] = None
 
 
-async def analyze_article_async(article_data: dict, article_id: int) -> tuple[bool, str]:
+async def analyze_article_async(
+    article_data: dict,
+    article_id: int,
+    existing: Optional[dict] = None
+) -> Optional[AnalyzedArticle]:
     """
-    Analyze a single article asynchronously.
-    Returns (success, message)
+    Analyze a single saved article without blocking the event loop.
+    `existing` is the article's stored analysis, if any (prefetched for the whole run).
+    A near-duplicate of an analyzed article reuses that analysis (duplicate_of);
+    a looser match is analyzed and marked as a follow-up (follow_up_of).
+    Nothing is written here - see store_analyses(). Returns None on failure.
     """
     url = article_data.get("url", "")
     title = article_data.get("title", "Unknown")
+    article = AnalyzedArticle(url=url, title=title, article_id=article_id)
     
     try:
-        # Check if already analyzed
-        existing = get_analysis_by_url(url)
         if existing:
-            return (True, f"⏭️ Already analyzed: {title[:40]}...")
+            logger.info(f"⏭️ Already analyzed: {title[:40]}...")
+            article.row = existing
+            return article
         
-        # Run LLM analysis in thread pool (non-blocking)
-        loop = asyncio.get_event_loop()
-        analysis = await loop.run_in_executor(
-            _executor,
-            lambda: analyze_article(
-                title=title,
-                content=article_data.get("text", "")[:15000],
-                url=url,
-                is_sponsored=article_data.get("is_sponsored", False)
-            )
-        )
+        # Same story under another URL? Reuse its analysis instead of calling the LLM
+        match = await asyncio.to_thread(get_dedup_index().query, article_data.get("text", ""), url)
+        if match and match.is_duplicate:
+            original = await asyncio.to_thread(get_analysis_by_url, match.url)
+            if original:
+                logger.info(f"♻️ Near-duplicate ({match.similarity:.2f}) of {match.url}, reusing its analysis")
+                article.analysis = ArticleAnalysis.model_validate(original)
+                article.model = original.get("model_used")
+                article.duplicate_of = match.url
+                return article
         
-        # Save to database
-        save_analysis(
-            analysis=analysis,
-            article_url=url,
-            article_title=title,
-            article_id=article_id
+        # Async LLM call through the model tiers - concurrency is set by each tier's adaptive limiter
+        routed = await aroute_article(
+            title=title,
+            content=article_data.get("text", ""),
+            url=url,
+            is_sponsored=article_data.get("is_sponsored", False)
         )
+        article.analysis = routed.analysis
+        article.model = routed.model
         
-        return (True, f"✅ Analyzed: {analysis.headline[:40]}...")
+        logger.info(f"✅ Analyzed: {routed.analysis.headline[:40]}...")
+        if match:
+            logger.info(f"🔗 Follow-up ({match.similarity:.2f}) of {match.url}")
+            article.follow_up_of = match.url
+        return article
         
     except Exception as e:
-        return (False, f"❌ Failed: {title[:30]}... - {str(e)[:50]}")
+        logger.error(f"❌ Failed: {title[:30]}... - {str(e)[:50]}")
+        return None
 
 
-async def analyze_articles_batch(articles_to_analyze: list[tuple[dict, int]]) -> tuple[int, int]:
+def store_analyses(articles: list[AnalyzedArticle]) -> list[Optional[dict]]:
     """
-    Analyze multiple articles concurrently.
-    Returns (success_count, error_count)
+    Write new analyses in one multi-row upsert.
+    Returns the stored row for each article (what notifications match against),
+    tagged with duplicate_of, or None where the write failed. follow_up_of is
+    a column, so it is stored with the row.
     """
-    if not articles_to_analyze:
-        return 0, 0
+    pending = [a for a in articles if a.row is None]
+    try:
+        stored = save_analyses([
+            analysis_row(a.analysis, a.url, a.title, a.article_id, a.model, a.follow_up_of) for a in pending
+        ])
+    except Exception as e:
+        logger.error(f"Error saving {len(pending)} analyses: {e}")
+        stored = {}
     
-    logger.info(f"🤖 Starting async analysis of {len(articles_to_analyze)} articles...")
+    rows = []
+    for article in articles:
+        row = article.row or stored.get(article.url)
+        if row is None:
+            logger.error(f"❌ Failed to save analysis: {article.url}")
+        elif article.duplicate_of:
+            row = {**row, "duplicate_of": article.duplicate_of}
+        rows.append(row)
+    return rows
+
+
+def _cache_delta(before: dict) -> dict:
+    """HTTP cache hits/misses since `before` was snapshotted"""
+    cache = get_fetcher().cache
+    after = cache.stats() if cache else before
+    return {
+        "cache_hits": after["hits"] - before["hits"],
+        "cache_misses": after["misses"] - before["misses"],
+    }
+
+
+def _db_delta(before: dict) -> dict:
+    """Supabase round trips since `before` was snapshotted"""
+    after = round_trips.stats()
+    return {
+        "db_reads": after["reads"] - before["reads"],
+        "db_writes": after["writes"] - before["writes"],
+    }
+
+
+def build_scrape_pipeline(existing_analyses: Optional[dict[str, dict]] = None) -> Pipeline:
+    """
+    fetch → save → analyze → store → notify, each article moving on as soon as it is ready.
+    Save, store and notify take every article that is already waiting, so a burst
+    is written with one upsert per table and goes out as one alert per subscription.
+    `existing_analyses` (by URL) is prefetched for the whole run instead of
+    looked up per article.
+    """
+    existing_analyses = existing_analyses or {}
+    matcher = None  # Subscriptions are loaded and compiled once, on the first alert batch
+    weekly_matcher = None
+
+    async def fetch(url: str) -> Optional[dict]:
+        article_data = await extract_article_data(url)
+        if not article_data:
+            logger.error(f"❌ Failed to extract: {url}")
+        return article_data
     
-    # Create tasks for all articles
-    tasks = [
-        analyze_article_async(article_data, article_id)
-        for article_data, article_id in articles_to_analyze
-    ]
+    async def save(articles: list[dict]) -> list[Optional[tuple[dict, int]]]:
+        results = await asyncio.to_thread(save_articles, articles)
+        saved = []
+        for article_data, result in zip(articles, results):
+            if not result:
+                logger.error(f"❌ Failed to save: {article_data.get('url')}")
+                saved.append(None)
+                continue
+            logger.info(f"✅ Saved: {article_data.get('title', 'Unknown')[:50]}...")
+            saved.append((article_data, result.get("id")))
+        return saved
     
-    # Run all concurrently
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    async def analyze(item: tuple[dict, int]) -> Optional[AnalyzedArticle]:
+        article_data, article_id = item
+        article = await analyze_article_async(article_data, article_id, existing_analyses.get(article_data.get("url")))
+        if article and article.duplicate_of:
+            pipeline.count("duplicates")
+        elif article and article.follow_up_of:
+            pipeline.count("follow_ups")
+        return article
     
-    success_count = 0
-    error_count = 0
+    async def store(articles: list[AnalyzedArticle]) -> list[Optional[dict]]:
+        return await asyncio.to_thread(store_analyses, articles)
     
-    for i, result in enumerate(results):
-        if isinstance(result, Exception):
-            error_count += 1
-            logger.error(f"[{i+1}/{len(results)}] ❌ Exception: {result}")
-        else:
-            success, message = result
-            if success:
-                success_count += 1
-                logger.info(f"[{i+1}/{len(results)}] {message}")
-            else:
-                error_count += 1
-                logger.error(f"[{i+1}/{len(results)}] {message}")
+    async def notify(analyses: list[dict]) -> list[dict]:
+        nonlocal matcher, weekly_matcher
+        # Subscribers were already alerted about the original of a near-duplicate.
+        # Follow-ups still go into weekly digests but get no immediate alert
+        alerts = [a for a in analyses if not a.get("duplicate_of")]
+        if not alerts:
+            return analyses
+        if not pipeline.counters.get("alerted"):
+            logger.info(f"🔔 First alert batch ready {pipeline.elapsed():.1f}s into the run")
+        pipeline.count("alerted", sum(1 for a in alerts if not a.get("follow_up_of")))
+        
+        # Weekly digests are kept up to date here, so Monday's job only sends them
+        try:
+            if weekly_matcher is None:
+                weekly_matcher = SubscriptionMatcher(await asyncio.to_thread(get_weekly_subscriptions))
+            await asyncio.to_thread(track_weekly_digests, alerts, weekly_matcher)
+        except Exception as e:
+            logger.error(f"Error updating weekly digests: {e}")
+
+        # The rows come straight from the store stage - the only reads here are the
+        # subscription lists, once per run
+        if matcher is None:
+            try:
+                matcher = SubscriptionMatcher(await asyncio.to_thread(get_immediate_subscriptions))
+            except Exception as e:
+                logger.error(f"Error fetching subscriptions: {e}")
+                return None
+        # Deliveries go through the outbox: queued first, so a crash part-way
+        # through leaves the rest for the next drain instead of dropping them
+        await asyncio.to_thread(process_notifications, alerts, matcher)
+        await drain_notifications()
+        return analyses
     
-    return success_count, error_count
+    pipeline = Pipeline(
+        stages=[
+            Stage("fetch", fetch, concurrency=get_fetcher().concurrency_per_host),
+            Stage("save", save, concurrency=1, batch_size=PIPELINE_QUEUE_SIZE),
+            Stage("analyze", analyze, concurrency=LLM_MAX_CONCURRENCY),
+            Stage("store", store, concurrency=1, batch_size=PIPELINE_QUEUE_SIZE),
+            Stage("notify", notify, concurrency=1, batch_size=PIPELINE_QUEUE_SIZE),
+        ],
+        queue_size=PIPELINE_QUEUE_SIZE,
+    )
+    return pipeline
 
 
-def scrape_and_save() -> dict:
+async def scrape_and_save() -> dict:
     """
     Main scraping job:
-    1. Get article URLs from homepage
+    1. Get article URLs from homepage (short-circuit if unchanged since last run)
     2. Filter out duplicates (already in DB)
-    3. Fetch full details for new articles
-    4. Save to database
-    5. Analyze all new articles ASYNC
+    3. Prefetch stored analyses for the new URLs in one query
+    4. Stream new articles through fetch → save → analyze → store → notify
     """
     logger.info("=" * 50)
     logger.info("Starting scrape job...")
     
-    # Get URLs from homepage
-    urls = get_article_urls()
+    fetcher = get_fetcher()
+    cache = fetcher.cache
+    cache_before = cache.stats() if cache else {"hits": 0, "misses": 0}
+    db_before = round_trips.stats()
+    
+    # Get URLs from homepage. A changed homepage is only cached once its
+    # articles went through without errors - a failed, cancelled or crashed
+    # run leaves the old entry, so the next run processes the page again
+    homepage = await fetch_homepage(store=False)
+    if homepage and not homepage.changed:
+        await fetcher.store(homepage)
+        logger.info("Homepage unchanged since last run, nothing to do")
+        return {
+            "new_articles": 0, "analyzed": 0, "skipped": 0, "errors": 0,
+            "homepage_unchanged": True,
+            **_cache_delta(cache_before),
+            **_db_delta(db_before),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    urls = parse_article_urls(homepage.text) if homepage else []
     if not urls:
         logger.warning("No URLs found")
-        return {"new_articles": 0, "analyzed": 0, "skipped": 0, "errors": 0, "timestamp": datetime.now().isoformat()}
+        return {
+            "new_articles": 0, "analyzed": 0, "skipped": 0, "errors": 0,
+            **_cache_delta(cache_before),
+            **_db_delta(db_before),
+            "timestamp": datetime.now().isoformat()
+        }
+    logger.info(f"Found {len(urls)} article URLs on homepage")
     
-    # Get existing URLs from database
-    existing_urls = get_existing_urls()
-    logger.info(f"Found {len(existing_urls)} existing articles in database")
+    # Check which homepage URLs are already in the database
+    existing_urls = await asyncio.to_thread(get_existing_urls, urls)
+    logger.info(f"Found {len(existing_urls)} of {len(urls)} homepage articles already in database")
     
     # Filter new URLs
-    new_urls = [url for url in urls if url not in existing_urls]
+    new_urls = [url for url in dict.fromkeys(urls) if url not in existing_urls]
     skipped = len(urls) - len(new_urls)
     logger.info(f"Found {len(new_urls)} new articles to fetch ({skipped} duplicates skipped)")
     
-    # Phase 1: Fetch and save all articles (sequential - respects rate limits)
-    saved_articles = []  # List of (article_data, article_id) tuples
-    error_count = 0
+    # Near-duplicate index: seeded from the database on first run, then kept up to date by save_articles
+    try:
+        await asyncio.to_thread(seed_dedup_index)
+    except Exception as e:
+        logger.error(f"Error seeding near-duplicate index: {e}")
     
-    for url in new_urls:
-        logger.info(f"Fetching: {url}")
-        article_data = extract_article_data(url)
-        
-        if article_data:
-            result = save_article(article_data)
-            if result:
-                logger.info(f"✅ Saved: {article_data.get('title', 'Unknown')[:50]}...")
-                saved_articles.append((article_data, result.get("id")))
-            else:
-                error_count += 1
-                logger.error(f"❌ Failed to save: {url}")
-        else:
-            error_count += 1
-            logger.error(f"❌ Failed to extract: {url}")
+    # One query for every analysis the run could find already stored
+    try:
+        existing_analyses = await asyncio.to_thread(get_analyses_by_urls, new_urls)
+    except Exception as e:
+        logger.error(f"Error prefetching existing analyses: {e}")
+        existing_analyses = {}
     
-    # Phase 2: Analyze all saved articles ASYNC (concurrent LLM calls)
-    analyzed_count = 0
-    analysis_errors = 0
+    pipeline = build_scrape_pipeline(existing_analyses)
+    stages = await pipeline.run(new_urls)
+    await asyncio.to_thread(get_dedup_index().save)
     
-    if saved_articles:
-        # Run async analysis
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        analyzed_count, analysis_errors = loop.run_until_complete(
-            analyze_articles_batch(saved_articles)
-        )
-
-        # Phase 3: Trigger Notifications
-        # We need the full analysis result for notifications, not just the raw article data.
-        # We'll re-fetch the analyzed articles or modify analyze_articles_batch to return them.
-        # For now, let's just fetch the newly analyzed ones from DB or construct from memory if possible.
-        # Since analyze_article_async saves to DB, we can pass the 'saved_articles' (which has raw data)
-        # BUT we need the 'analysis' result (relevance score, priority etc).
-        # Let's assume we fetch the latest analyses for these IDs.
-        
-        # Ideally we should gather the analysis objects from analyze_articles_batch
-        # But to keep it simple, we will query the DB for the articles we just processed.
-        if analyzed_count > 0:
-            try:
-                new_article_ids = [aid for _, aid in saved_articles]
-                supabase = get_supabase()
-                # Fetch the full analysis for notification matching
-                # We need to cast IDs to string because `in_` expects it sometimes or int works depending on library version
-                # Using loop.run_in_executor to avoid blocking if needed, but supabase-py is sync usually
-                
-                analyses_response = supabase.table("article_analyses") \
-                    .select("*") \
-                    .in_("article_id", new_article_ids) \
-                    .execute()
-                
-                if analyses_response.data:
-                    process_notifications(analyses_response.data)
-                    
-            except Exception as e:
-                logger.error(f"Error triggering notifications: {e}")
+    saved_count = stages["save"]["processed"]
+    analyzed_count = stages["store"]["processed"]
+    error_count = stages["fetch"]["failed"] + stages["save"]["failed"]
+    total_errors = error_count + stages["analyze"]["failed"] + stages["store"]["failed"]
     
-    total_errors = error_count + analysis_errors
+    if homepage and not total_errors:
+        await fetcher.store(homepage)
     
-    logger.info(f"Scrape complete: {len(saved_articles)} saved, {analyzed_count} analyzed, {skipped} skipped, {total_errors} errors")
+    duplicates = pipeline.counters.get("duplicates", 0)
+    follow_ups = pipeline.counters.get("follow_ups", 0)
+    
+    logger.info(f"Scrape complete: {saved_count} saved, {analyzed_count} analyzed ({duplicates} near-duplicates, {follow_ups} follow-ups), {skipped} skipped, {total_errors} errors")
+    logger.info(f"Pipeline stages: {stages}")
+    db = _db_delta(db_before)
+    logger.info(f"Database round trips: {db['db_reads']} reads, {db['db_writes']} writes")
     logger.info("=" * 50)
     
     return {
-        "new_articles": len(saved_articles),
+        "new_articles": saved_count,
         "analyzed": analyzed_count,
         "skipped": skipped,
         "errors": total_errors,
+        "duplicates": duplicates,
+        "follow_ups": follow_ups,
+        **_cache_delta(cache_before),
+        **db,
+        "stages": stages,
         "timestamp": datetime.now().isoformat()
     }
-
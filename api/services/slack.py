@@ -3,15 +3,21 @@ Slack Message Formatting Service
 Handles OAuth, message formatting, and posting to Slack.
 """
 
+import ssl
+import asyncio
 import logging
+import threading
 from typing import Dict, List, Any, Optional
 
 import httpx
+import aiohttp
 from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
 
-from ..config import SLACK_CLIENT_ID, SLACK_CLIENT_SECRET, SLACK_REDIRECT_URI, FRONTEND_URL
+from ..config import SLACK_CLIENT_ID, SLACK_CLIENT_SECRET, SLACK_REDIRECT_URI, FRONTEND_URL, SLACK_CLIENT_POOL_SIZE
 from ..models.article import ArticleAnalysis, REGION_FLAGS
+from ..utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -268,6 +274,96 @@ def format_slack_text(analysis: ArticleAnalysis, article_url: str = "") -> str:
     return "\n".join(lines)
 
 
+# ============================================================================
+# Client Pool
+# ============================================================================
+
+class SlackClientPool:
+    """
+    Slack clients keyed by bot token, least recently used evicted past `maxsize`.
+    Sync clients share one SSL context, so a message no longer pays for loading
+    the CA bundle. Async clients share one aiohttp session per event loop, so
+    messages reuse open keep-alive connections instead of a TLS handshake each.
+    """
+
+    def __init__(self, maxsize: int = SLACK_CLIENT_POOL_SIZE, base_url: str = WebClient.BASE_URL):
+        self.maxsize = maxsize
+        self.base_url = base_url
+        self.ssl_context = ssl.create_default_context()
+        self.created = 0
+        self.reused = 0
+        self._clients = LRUCache(maxsize)
+        self._async_clients = LRUCache(maxsize)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def get(self, access_token: str) -> WebClient:
+        """WebClient for a token (thread-safe)"""
+        with self._lock:
+            client = self._clients.get(access_token)
+            if client is None:
+                client = WebClient(token=access_token, base_url=self.base_url, ssl=self.ssl_context)
+                self._clients.set(access_token, client)
+                self.created += 1
+            else:
+                self.reused += 1
+            return client
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # A session belongs to its loop; scripts calling asyncio.run() again get a new one
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=self.ssl_context))
+            self._session_loop = loop
+            self._async_clients.clear()
+        return self._session
+
+    def get_async(self, access_token: str) -> AsyncWebClient:
+        """AsyncWebClient for a token, on the shared session of the running loop"""
+        session = self._get_session()
+        client = self._async_clients.get(access_token)
+        if client is None:
+            client = AsyncWebClient(token=access_token, base_url=self.base_url, session=session)
+            self._async_clients.set(access_token, client)
+            self.created += 1
+        else:
+            self.reused += 1
+        return client
+
+    async def aclose(self):
+        """Close the shared session (clients stay usable - the next call opens a new one)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._async_clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "async_clients": len(self._async_clients),
+            "created": self.created,
+            "reused": self.reused,
+        }
+
+
+_client_pool: Optional[SlackClientPool] = None
+
+
+def get_client_pool() -> SlackClientPool:
+    """Get or create the Slack client pool (singleton)"""
+    global _client_pool
+    if _client_pool is None:
+        _client_pool = SlackClientPool()
+    return _client_pool
+
+
+async def close_slack_clients():
+    """Close the pool's HTTP session, if one was opened"""
+    if _client_pool is not None:
+        await _client_pool.aclose()
+
+
 # ============================================================================
 # OAuth Functions
 # ============================================================================
@@ -322,12 +418,12 @@ async def list_user_channels(access_token: str) -> List[Dict[str, str]]:
     Returns:
         List of channel dicts with id, name, is_private
     """
-    client = WebClient(token=access_token)
+    client = get_client_pool().get_async(access_token)
     channels = []
     
     try:
         # Get public channels
-        result = client.conversations_list(
+        result = await client.conversations_list(
             types="public_channel,private_channel",
             exclude_archived=True,
             limit=200,
@@ -350,6 +446,46 @@ async def list_user_channels(access_token: str) -> List[Dict[str, str]]:
     return channels
 
 
+def post_slack_message(
+    access_token: str,
+    channel_id: str,
+    blocks: List[Dict[str, Any]],
+    text: Optional[str] = None,
+):
+    """
+    Send a message to a Slack channel.
+    
+    Raises:
+        SlackApiError if Slack rejects the message
+    """
+    get_client_pool().get(access_token).chat_postMessage(
+        channel=channel_id,
+        blocks=blocks,
+        text=text or "New security alert from CyberShepherd",
+    )
+    logger.info(f"Slack message sent to channel {channel_id}")
+
+
+async def apost_slack_message(
+    access_token: str,
+    channel_id: str,
+    blocks: List[Dict[str, Any]],
+    text: Optional[str] = None,
+):
+    """
+    post_slack_message for async callers, over the pool's shared keep-alive session.
+    
+    Raises:
+        SlackApiError if Slack rejects the message
+    """
+    await get_client_pool().get_async(access_token).chat_postMessage(
+        channel=channel_id,
+        blocks=blocks,
+        text=text or "New security alert from CyberShepherd",
+    )
+    logger.info(f"Slack message sent to channel {channel_id}")
+
+
 def send_slack_message(
     access_token: str,
     channel_id: str,
@@ -368,15 +504,24 @@ def send_slack_message(
     Returns:
         True if successful, False otherwise
     """
-    client = WebClient(token=access_token)
-    
     try:
-        client.chat_postMessage(
-            channel=channel_id,
-            blocks=blocks,
-            text=text or "New security alert from CyberShepherd",
-        )
-        logger.info(f"Slack message sent to channel {channel_id}")
+        post_slack_message(access_token, channel_id, blocks, text)
+        return True
+        
+    except SlackApiError as e:
+        logger.error(f"Failed to send Slack message: {e.response['error']}")
+        return False
+
+
+async def asend_slack_message(
+    access_token: str,
+    channel_id: str,
+    blocks: List[Dict[str, Any]],
+    text: Optional[str] = None,
+) -> bool:
+    """send_slack_message for async callers (FastAPI handlers). Returns True if successful"""
+    try:
+        await apost_slack_message(access_token, channel_id, blocks, text)
         return True
         
     except SlackApiError as e:
@@ -503,3 +648,85 @@ def format_notification_blocks(article: Dict[str, Any]) -> List[Dict[str, Any]]:
     
     return blocks
 
+
+SLACK_MAX_BLOCKS = 50  # Slack rejects messages with more blocks
+
+
+def alert_summary(article: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of an analysis row that an alert digest shows"""
+    return {
+        "id": article.get("id"),
+        "headline": article.get("headline", "New Alert"),
+        "article_url": article.get("article_url", ""),
+        "priority": article.get("priority", "INFO"),
+        "relevance_score": article.get("relevance_score", 0),
+        "short_summary": article.get("short_summary", ""),
+    }
+
+
+def _digest_article_blocks(article: Dict[str, Any]) -> List[Dict[str, Any]]:
+    priority = article.get("priority", "INFO").upper()
+    priority_emoji = PRIORITY_META.get(priority.lower(), {}).get("emoji", "🔵")
+    headline = article.get("headline", "New Alert")
+    summary = article.get("short_summary", "")
+    if len(summary) > 280:
+        summary = summary[:277] + "..."
+
+    section = {
+        "type": "section",
+        "text": {"type": "mrkdwn", "text": f"*{priority_emoji} {headline}*\n{summary}"},
+        "accessory": {
+            "type": "button",
+            "text": {"type": "plain_text", "text": "🛡️ View", "emoji": True},
+            "url": f"{FRONTEND_URL}/article/{article.get('id')}",
+        },
+    }
+    meta = f"*Priority:* {priority}  •  *Relevance:* {article.get('relevance_score', 0)}/10"
+    if article.get("article_url"):
+        meta += f"  •  <{article['article_url']}|🔗 Source>"
+    return [section, {"type": "context", "elements": [{"type": "mrkdwn", "text": meta}]}]
+
+
+def format_alert_digest(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Several alerts for one channel as Block Kit messages, most relevant first.
+    Articles that would push a message past SLACK_MAX_BLOCKS start the next one.
+    
+    Args:
+        articles: alert_summary() dicts (or full analysis rows)
+        
+    Returns:
+        Messages as {"articles": [...], "blocks": [...], "text": fallback}
+    """
+    articles = sorted(articles, key=lambda a: a.get("relevance_score", 0), reverse=True)
+    footer = {"type": "context", "elements": [{"type": "mrkdwn", "text": "📰 _CyberShepherd Alerts_"}]}
+
+    chunks: List[List[Dict[str, Any]]] = [[]]
+    used = 3  # Header, divider, footer
+    for article in articles:
+        size = len(_digest_article_blocks(article))
+        if chunks[-1] and used + size > SLACK_MAX_BLOCKS:
+            chunks.append([])
+            used = 3
+        chunks[-1].append(article)
+        used += size
+
+    messages = []
+    for i, chunk in enumerate(chunks, 1):
+        title = f"🚨 {len(articles)} New Security Alerts"
+        if len(chunks) > 1:
+            title += f" ({i}/{len(chunks)})"
+        blocks = [
+            {"type": "header", "text": {"type": "plain_text", "text": title, "emoji": True}},
+            {"type": "divider"},
+        ]
+        for article in chunk:
+            blocks.extend(_digest_article_blocks(article))
+        blocks.append(footer)
+        messages.append({
+            "articles": chunk,
+            "blocks": blocks,
+            "text": f"{title}: " + ", ".join(a.get("headline", "New Alert") for a in chunk[:3]),
+        })
+    return messages
+
@@ -0,0 +1,28 @@
+"""Weekly digest weeks and rebuild triggers in services/digests.py"""
+
+from datetime import datetime, timezone
+
+from api.services import notifier
+from api.services.digests import DigestStore, article_week, week_of, week_start
+
+
+def test_weeks_are_utc():
+    assert week_start("2026-W02") == datetime(2026, 1, 5, tzinfo=timezone.utc)
+    # Sunday evening west of UTC is already Monday of the next week in UTC
+    assert article_week({"analyzed_at": "2026-01-04T23:30:00-02:00"}) == "2026-W02"
+    assert article_week({"analyzed_at": "2026-01-04T23:30:00Z"}) == "2026-W01"
+    assert week_of(datetime(2026, 1, 4, 23, 30)) == "2026-W01"
+
+
+def test_week_flagged_in_the_database_is_rebuilt(monkeypatch, tmp_path):
+    store = DigestStore(str(tmp_path / "digests.db"))
+
+    rebuilt = []
+    monkeypatch.setattr(notifier, "get_weekly_subscriptions", lambda: [{"id": "sub-1", "filters": {}, "channels": []}])
+    monkeypatch.setattr(notifier, "get_digest_store", lambda: store)
+    monkeypatch.setattr(notifier, "stale_since", lambda week: "2026-10-12T08:00:00+00:00")
+    monkeypatch.setattr(notifier, "rebuild_weekly_digests", lambda week, matcher: rebuilt.append(week))
+    monkeypatch.setattr(store, "covers", lambda week: True)  # The local store saw every pipeline analysis
+
+    notifier.send_weekly_summaries()
+    assert len(rebuilt) == 1
@@ -0,0 +1,59 @@
+"""Immediate alerts in services/notifier.py"""
+
+import pytest
+
+from api.services import notifier
+from api.services.matching import SubscriptionMatcher
+
+SUBSCRIPTION = {
+    "id": "sub-1",
+    "user_id": "user-1",
+    "name": "Python",
+    "channels": ["email", "slack"],
+    "filters": {"techStack": ["Python"], "priority": [], "alertThreshold": 0, "targetedEntities": []},
+    "users": {"email": "ciso@example.com"},
+}
+
+
+def analysis(id: str, **extra) -> dict:
+    return {
+        "id": id,
+        "article_url": f"https://thehackernews.com/{id}.html",
+        "headline": f"Headline {id}",
+        "priority": "high",
+        "relevance_score": 8,
+        "mentioned_technologies": ["Python"],
+        "categories": [],
+        "affected_entities": [],
+        **extra,
+    }
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Articles each channel was asked to alert about, instead of going through the outbox"""
+    sent = {"email": [], "slack": []}
+    monkeypatch.setattr(notifier, "_known_slack_users", lambda user_ids: None)
+    monkeypatch.setattr(notifier, "enqueue_email", lambda *args, **kwargs: True)
+    monkeypatch.setattr(notifier, "get_renderer", lambda: type("Renderer", (), {
+        "email": lambda self, title, articles, subtitle: sent["email"].extend(a["id"] for a in articles) or "",
+    })())
+    monkeypatch.setattr(notifier, "send_slack_notifications", lambda user_id, articles, window: sent["slack"].extend(a["id"] for a in articles) or len(articles))
+    return sent
+
+
+def test_follow_up_does_not_trigger_a_second_alert(queued):
+    matcher = SubscriptionMatcher([SUBSCRIPTION])
+    original = analysis("original")
+    notifier.process_notifications([original], matcher)
+
+    follow_up = analysis("follow-up", follow_up_of=original["article_url"])
+    notifier.process_notifications([follow_up], matcher)
+
+    assert queued == {"email": ["original"], "slack": ["original"]}
+
+
+def test_follow_up_is_dropped_from_a_mixed_batch(queued):
+    matcher = SubscriptionMatcher([SUBSCRIPTION])
+    notifier.process_notifications([analysis("a"), analysis("b", follow_up_of="https://thehackernews.com/x.html")], matcher)
+    assert queued == {"email": ["a"], "slack": ["a"]}
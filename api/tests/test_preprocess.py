@@ -0,0 +1,64 @@
+"""Token-budget fitting in services/preprocess.py"""
+
+import pytest
+
+from api.services import preprocess
+from api.services.preprocess import count_tokens, prepare_content
+
+MODEL = "gpt-4o-mini"
+
+
+@pytest.fixture(autouse=True)
+def length_estimate(monkeypatch):
+    """Count tokens with the length estimate, so results don't depend on downloaded BPE files"""
+    monkeypatch.setattr(preprocess, "_encoding", lambda model: None)
+
+
+def test_short_text_is_kept_whole():
+    text = "First paragraph.\nSecond paragraph."
+    prepared = prepare_content(text, MODEL, budget=100)
+    assert prepared.text == text
+    assert prepared.tokens_saved == 0
+
+
+def test_boilerplate_lines_are_dropped():
+    prepared = prepare_content("Real news.\nFound this article interesting? Follow us.", MODEL, budget=100)
+    assert prepared.text == "Real news."
+
+
+def test_lead_is_clipped_at_a_sentence_boundary():
+    text = "One short sentence. " + "Another sentence that goes on and on. " * 20
+    prepared = prepare_content(text, MODEL, budget=10)
+    assert prepared.text == "One short sentence."
+
+
+def test_unpunctuated_paragraph_over_budget_is_truncated_not_emptied():
+    text = " ".join(f"word{i}" for i in range(500))  # One paragraph, no sentence punctuation
+    prepared = prepare_content(text, MODEL, budget=50)
+    assert prepared.text
+    assert text.startswith(prepared.text)
+    assert prepared.tokens <= 50
+    assert not prepared.text.endswith("word")  # Cut back to a whole word
+
+
+def test_failed_encoding_load_is_retried(monkeypatch):
+    monkeypatch.undo()
+    calls = []
+
+    class FlakyTiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            calls.append(model)
+            if len(calls) == 1:
+                raise ConnectionError("offline")
+            return type("Encoding", (), {"encode": lambda self, text, disallowed_special=(): text.split()})()
+
+    monkeypatch.setattr(preprocess, "tiktoken", FlakyTiktoken)
+    monkeypatch.setattr(preprocess, "_encodings", {})
+    monkeypatch.setattr(preprocess, "_encoding_failures", {})
+
+    assert count_tokens("a b c d e f g h", MODEL) == 4  # Length estimate while the load fails
+    monkeypatch.setattr(preprocess, "ENCODING_RETRY_SECONDS", 0)
+    assert count_tokens("a b c d e f g h", MODEL) == 8  # Loaded on the next try
+    assert count_tokens("a b", MODEL) == 2
+    assert len(calls) == 2
@@ -0,0 +1,45 @@
+"""Card cache in services/renderer.py"""
+
+from api.services import renderer
+from api.services.renderer import ArticleRenderer, format_share_email_html
+
+
+def analysis(**extra) -> dict:
+    return {
+        "id": "analysis-1",
+        "headline": "Flaw exploited in the wild",
+        "short_summary": "Attackers chain two bugs.",
+        "priority": "high",
+        "relevance_score": 8,
+        "key_takeaways": [{"point": "Patch now."}],
+        "mentioned_technologies": ["Python"],
+        "article_url": "https://thehackernews.com/a.html",
+        **extra,
+    }
+
+
+def test_card_is_rendered_once_per_content():
+    r = ArticleRenderer()
+    first = r.card(analysis())
+    assert r.card(analysis()) == first
+    assert r.stats()["card_hits"] == 1
+
+    reanalyzed = r.card(analysis(headline="Flaw now exploited at scale"))
+    assert "exploited at scale" in reanalyzed
+    assert r.stats()["card_misses"] == 2
+
+
+def test_emails_and_digests_are_built_from_cached_cards():
+    r = ArticleRenderer()
+    card = r.card(analysis())
+    assert r.cards([analysis()]) == card
+    assert card in r.email("Alert", [analysis()], "{{ params.subtitle }}")
+    assert r.stats()["card_hits"] == 2
+
+
+def test_share_email_uses_the_detailed_card(monkeypatch):
+    r = ArticleRenderer()
+    monkeypatch.setattr(renderer, "_renderer", r)
+    html = format_share_email_html(analysis(tldr="Short version."), "Have a look")
+    assert r.card(analysis(tldr="Short version."), detailed=True) in html
+    assert "HIGH PRIORITY" in html and "Short version." in html and "Have a look" in html
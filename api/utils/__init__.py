@@ -2,3 +2,6 @@
 Utility functions
 """
 
+from .cache import LRUCache, TTLCache
+
+__all__ = ["LRUCache", "TTLCache"]
@@ -0,0 +1,110 @@
+"""
+In-process cache helpers
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used key once `maxsize` is reached.
+    Thread-safe (the scraper reads and fills it from worker threads).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Get a value and mark it as recently used"""
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any = True):
+        """Insert or refresh a key, evicting the oldest entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        """Remove a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache:
+    """
+    Bounded mapping whose entries expire `ttl` seconds after they were set,
+    evicting the oldest entry once `maxsize` is reached. `None` is a valid
+    value (e.g. a cached "not found"). Thread-safe.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _live(self, key: Hashable, now: float) -> bool:
+        entry = self._data.get(key)
+        if entry is None:
+            return False
+        if entry[0] <= now:
+            del self._data[key]
+            return False
+        return True
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Get a value if it has not expired"""
+        with self._lock:
+            return self._data[key][1] if self._live(key, time.monotonic()) else default
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """{key: value} for the keys that are cached and unexpired"""
+        now = time.monotonic()
+        with self._lock:
+            return {key: self._data[key][1] for key in keys if self._live(key, now)}
+
+    def set(self, key: Hashable, value: Any):
+        """Insert or refresh a key, evicting the oldest entry if full"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        """Remove a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._live(key, time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,8 @@
+-- Follow-ups: an analysis of a story similar to (but not a near-duplicate of)
+-- an earlier one records that article's URL, so notifications can skip it
+ALTER TABLE article_analyses
+    ADD COLUMN IF NOT EXISTS follow_up_of TEXT;
+
+CREATE INDEX IF NOT EXISTS article_analyses_follow_up_of_idx
+    ON article_analyses (follow_up_of)
+    WHERE follow_up_of IS NOT NULL;
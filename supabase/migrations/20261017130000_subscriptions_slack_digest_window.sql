@@ -0,0 +1,5 @@
+-- Seconds a subscription's Slack alerts are held and merged into one message.
+-- NULL falls back to the API's SLACK_DIGEST_WINDOW; 0 posts one message per article
+ALTER TABLE subscriptions
+    ADD COLUMN IF NOT EXISTS slack_digest_window REAL
+    CHECK (slack_digest_window IS NULL OR slack_digest_window >= 0);
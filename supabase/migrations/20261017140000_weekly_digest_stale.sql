@@ -0,0 +1,9 @@
+-- Weeks that got analyses outside the scrape pipeline (scripts, Batch API
+-- ingest). The weekly digest job rebuilds them from article_analyses and
+-- clears the row; it lives here so writers on any host can flag a week
+CREATE TABLE IF NOT EXISTS weekly_digest_stale (
+    week TEXT PRIMARY KEY,
+    marked_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE weekly_digest_stale ENABLE ROW LEVEL SECURITY;